@@ -0,0 +1,238 @@
+"""
+Horizon-aware confidence for suitability scores, calibrated from history.
+
+Every night in forecast history is revised by several runs at different
+lead times (days between the run and the night). Once a night has passed,
+its last revision is taken as the truth and each earlier revision's error
+(value - final) is folded into running per-(field, lead) statistics for
+cloud, wind and humidity.
+
+The update is incremental: calibration.json keeps a byte offset into the hot
+history file, so each run only reads the rows appended since the last one
+(after compact_history rewrites the file, rows newer than the last consumed
+run timestamp are picked up instead). Revisions of nights that have not
+happened yet are held in the state file until they finalise.
+
+attach_confidence() turns the error statistics for a night's lead time into
+a score interval by moving each field by its RMS error through the scoring
+curves: score_low / score_high on each scored record.
+
+    python -m src.calibration            # fold in new history, print the table
+    python -m src.calibration --rebuild  # recompute from hot history + archives
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import io
+import json
+import math
+import os
+from datetime import date, datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import config
+from src import curves
+from src import data_store
+
+CALIBRATION_PATH = data_store.DATA_DIR / "calibration.json"
+
+# calibrated history field -> process_weather_data fields it stands for
+CALIBRATED_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "avg_cloud": ("avg_cloud", "min_cloud", "max_cloud"),
+    "wind_speed_kph": ("wind_speed_kph",),
+    "humidity": ("humidity",),
+}
+MIN_SAMPLES = 5
+DEFAULT_Z = 1.28  # ~80% interval
+
+_cache: Optional[dict] = None
+
+
+def _empty_state() -> dict:
+    return {"offset": 0, "inode": None, "watermark": "", "pending": {}, "stats": {f: {} for f in CALIBRATED_FIELDS}}
+
+
+def load_state(path: Optional[Path] = None) -> dict:
+    try:
+        with Path(path or CALIBRATION_PATH).open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return _empty_state()
+
+
+def _save_state(state: dict, path: Optional[Path] = None) -> None:
+    path = Path(path or CALIBRATION_PATH)
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(state, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _num(value) -> Optional[float]:
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(v) else v
+
+
+def _fold(stat: List[float], x: float) -> None:
+    """Welford update of [n, mean, m2] in place"""
+    stat[0] += 1
+    d = x - stat[1]
+    stat[1] += d / stat[0]
+    stat[2] += d * (x - stat[1])
+
+
+def add_rows(state: dict, rows: Iterable[dict]) -> int:
+    """queue history rows as revisions of their night"""
+    added = 0
+    for row in rows:
+        ts, night = row.get("run_timestamp", ""), row.get("forecast_date", "")
+        try:
+            lead = (date.fromisoformat(night) - datetime.fromisoformat(ts).date()).days
+        except (TypeError, ValueError):
+            continue
+        key = f"{data_store._row_location(row)}|{night}"
+        state["pending"].setdefault(key, []).append([ts, lead] + [_num(row.get(f)) for f in CALIBRATED_FIELDS])
+        # runs carry their site's UTC offset: order them as instants, not strings
+        if data_store.run_epoch(ts) > data_store.run_epoch(state["watermark"]):
+            state["watermark"] = ts
+        added += 1
+    return added
+
+
+def finalise(state: dict, today: date) -> int:
+    """fold errors of every night before `today` into the stats; returns nights finalised"""
+    done = [k for k in state["pending"] if k.rsplit("|", 1)[1] < today.isoformat()]
+    for key in done:
+        revisions = sorted(state["pending"].pop(key), key=lambda r: data_store.run_epoch(r[0]))
+        final = revisions[-1]
+        for rev in revisions[:-1]:
+            lead = str(rev[1])
+            for i, field in enumerate(CALIBRATED_FIELDS, start=2):
+                if rev[i] is None or final[i] is None:
+                    continue
+                _fold(state["stats"][field].setdefault(lead, [0, 0.0, 0.0]), rev[i] - final[i])
+    return len(done)
+
+
+def _new_rows(state: dict) -> List[dict]:
+    """rows appended to the hot history since the last update (call under history_lock)"""
+    path = data_store.HISTORY_PATH
+    if not path.exists():
+        return []
+    st = path.stat()
+    rewritten = state.get("inode") != st.st_ino or st.st_size < state.get("offset", 0)
+    with path.open("rb") as f:
+        header = f.readline()
+        start = f.tell() if rewritten else max(state.get("offset", 0), f.tell())
+        f.seek(start)
+        body = f.read()
+    state["offset"], state["inode"] = start + len(body), st.st_ino
+    fieldnames = next(csv.reader([header.decode("utf-8")]), [])
+    rows = list(csv.DictReader(io.StringIO(body.decode("utf-8")), fieldnames=fieldnames))
+    if rewritten:
+        # compacted (or replaced) since last time: skip what was already consumed
+        watermark = data_store.run_epoch(state["watermark"])
+        rows = [r for r in rows if data_store.run_epoch(r.get("run_timestamp", "")) > watermark]
+    return rows
+
+
+def update(today: date, path: Optional[Path] = None) -> dict:
+    """fold newly appended history into the calibration state (incremental)"""
+    global _cache
+    with data_store.history_lock():
+        state = load_state(path)
+        rows = _new_rows(state)
+        added = add_rows(state, rows)
+        finalised = finalise(state, today)
+        _save_state(state, path)
+    print(f"[diagnostic] calibration: rows={added} nights_finalised={finalised} pending={len(state['pending'])}")
+    _cache = state
+    return state
+
+
+def rebuild(today: date, path: Optional[Path] = None) -> dict:
+    """recompute from the hot history and every archive"""
+    global _cache
+    with data_store.history_lock():
+        state = _empty_state()
+        add_rows(state, data_store.iter_history(include_archive=True))
+        finalise(state, today)
+        if data_store.HISTORY_PATH.exists():
+            st = data_store.HISTORY_PATH.stat()
+            state["offset"], state["inode"] = st.st_size, st.st_ino
+        _save_state(state, path)
+    _cache = state
+    return state
+
+
+def error_sigma(stats: dict, field: str, lead: int) -> Optional[float]:
+    """RMS error of `field` at `lead` days (nearest calibrated lead when it has too few samples)"""
+    usable = {int(k): v for k, v in stats.get(field, {}).items() if v[0] >= MIN_SAMPLES}
+    if not usable:
+        return None
+    n, mean, m2 = usable[min(usable, key=lambda k: (abs(k - lead), -k))]
+    return math.sqrt(mean * mean + m2 / n)
+
+
+def attach_confidence(scored_days: List[dict], run_date: Optional[date] = None, state: Optional[dict] = None) -> List[dict]:
+    """
+    add lead_days, score_low and score_high to each scored night. without
+    enough calibrated history the interval collapses to the score itself.
+    """
+    global _cache
+    if not scored_days:
+        return scored_days
+    if state is None:
+        if _cache is None:
+            _cache = load_state()
+        state = _cache
+    run_date = run_date or date.fromisoformat(scored_days[0]["date"])
+    z = float(getattr(config, "CONFIDENCE_Z", DEFAULT_Z))
+    weights = config.WEIGHTS
+
+    for day in scored_days:
+        score = float(day.get("suitability_score", 0.0))
+        lead = (date.fromisoformat(day["date"]) - run_date).days
+        variance = 0.0
+        for field, targets in CALIBRATED_FIELDS.items():
+            sigma = error_sigma(state["stats"], field, lead)
+            if not sigma:
+                continue
+            base = {f: [_num(day.get(f))] for f in targets if _num(day.get(f)) is not None}
+            if not base:
+                continue
+            names = [n for n, c in curves.COMPONENTS.items() if c.field in base and n in weights]
+            up = curves.score_columns({f: [v[0] + sigma] for f, v in base.items()}, components=names)
+            down = curves.score_columns({f: [v[0] - sigma] for f, v in base.items()}, components=names)
+            # half the swing across +/- one RMS error, through the weighted curves
+            swing = sum(weights[n] * (float(up[n][0]) - float(down[n][0])) for n in up) / 2.0
+            variance += swing * swing
+        half = z * math.sqrt(variance)
+        day["lead_days"] = lead
+        day["score_low"] = max(0.0, score - half)
+        day["score_high"] = min(100.0, score + half)
+    return scored_days
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Per-lead-time forecast error calibration from history")
+    parser.add_argument("--rebuild", action="store_true", help="recompute from hot history + archives")
+    parser.add_argument("--today", type=date.fromisoformat, default=date.today())
+    args = parser.parse_args(argv)
+
+    state = rebuild(args.today) if args.rebuild else update(args.today)
+    for field in CALIBRATED_FIELDS:
+        for lead, (n, mean, m2) in sorted(state["stats"][field].items(), key=lambda kv: int(kv[0])):
+            rmse = math.sqrt(mean * mean + m2 / n) if n else float("nan")
+            print(f"[calibration] {field:15s} lead={int(lead):2d}d n={n:5d} bias={mean:+6.2f} rmse={rmse:6.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Suitability scoring curves.
+
+The exact scalar curves used by utils.calculate_suitability_data live here,
+together with vectorised equivalents for scoring many nights at once
+(backtests, tuning, grids) and a precompiled lookup-table evaluator.
+
+The table evaluator linearly interpolates each logistic curve on a uniform
+grid over its bounded input domain. The grid step is chosen from the curve's
+second-derivative bound so that |table - exact| <= max_error everywhere in
+the domain; inputs outside the domain fall through to the exact expression.
+The log curve is evaluated with a single fused NumPy expression (exact).
+
+Select the path with config.SUITABILITY_CURVES = "exact" (default) | "table".
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+import config
+
+E_APPROX = 2.71828  # base used by the original logistic (kept for identical scores)
+DEFAULT_MAX_ERROR = 0.01  # score points
+_MAX_TABLE_POINTS = 1 << 16
+
+
+class Component(NamedTuple):
+    field: str                  # key in process_weather_data output
+    params: str                 # key in config.SUITABILITY_PARAMS
+    kind: str                   # "logistic" | "log"
+    cutoff: Optional[float]     # x >= cutoff scores 0
+    domain: Tuple[float, float]  # bounded input range covered by the table
+
+
+# component name (as used in config.WEIGHTS) -> curve spec
+COMPONENTS: Dict[str, Component] = {
+    "avg_cloud":         Component("avg_cloud", "cloud", "logistic", 30, (0.0, 100.0)),
+    "min_cloud":         Component("min_cloud", "cloud", "logistic", 30, (0.0, 100.0)),
+    "max_cloud":         Component("max_cloud", "cloud", "logistic", 30, (0.0, 100.0)),
+    "moon_presence":     Component("moon_presence", "moon_presence", "logistic", 50, (0.0, 100.0)),
+    "moon_illumination": Component("moon_illumination", "moon_presence", "logistic", 40, (0.0, 100.0)),
+    "wind_speed":        Component("wind_speed_kph", "wind_speed", "logistic", 40, (0.0, 150.0)),
+    "humidity":          Component("humidity", "humidity", "logistic", None, (0.0, 100.0)),
+    "visibility":        Component("visibility_km", "visibility", "log", None, (0.0, 100.0)),
+    "dewpoint_risk":     Component("dewpoint_risk", "dewpoint_risk", "logistic", 6, (-40.0, 40.0)),
+    "sky_brightness":    Component("sky_brightness", "sky_brightness", "logistic", None, (15.0, 23.0)),
+}
+
+# scored only when configured in SUITABILITY_PARAMS and present on the night
+# (sky_brightness: site SQM from the light_pollution raster)
+OPTIONAL_COMPONENTS = frozenset({"sky_brightness"})
+
+
+# ---------------------------------------------------------------------------
+# exact curves
+# ---------------------------------------------------------------------------
+
+def logistic(x, L, k, x0, cutoff=None):
+    output = L / (1 + pow(E_APPROX, -k * (x - x0)))
+    if output > 100:
+        output = 100
+    if cutoff is not None and x >= cutoff:
+        return 0
+    return output
+
+
+def log_curve(x, A, B, k, x0):
+    inside = k * (x - x0)
+    if inside <= 0:
+        return 0
+    return A * np.log(inside) + B
+
+
+def _logistic_raw_np(x: np.ndarray, L, k, x0) -> np.ndarray:
+    with np.errstate(over="ignore"):
+        return L / (1.0 + np.power(E_APPROX, -k * (x - x0)))
+
+
+def _finish_logistic(x: np.ndarray, raw: np.ndarray, cutoff) -> np.ndarray:
+    out = np.minimum(raw, 100.0)
+    if cutoff is not None:
+        out = np.where(x >= cutoff, 0.0, out)
+    return out
+
+
+def logistic_np(x, L, k, x0, cutoff=None) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return _finish_logistic(x, _logistic_raw_np(x, L, k, x0), cutoff)
+
+
+def log_curve_np(x, A, B, k, x0) -> np.ndarray:
+    inside = k * (np.asarray(x, dtype=float) - x0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(inside > 0, A * np.log(np.where(inside > 0, inside, 1.0)) + B, 0.0)
+
+
+# ---------------------------------------------------------------------------
+# lookup-table evaluator
+# ---------------------------------------------------------------------------
+
+class _Table(NamedTuple):
+    lo: float
+    step: float
+    values: np.ndarray
+    bound: float  # analytic max interpolation error
+
+
+def _build_logistic_table(params: dict, domain: Tuple[float, float], max_error: float) -> _Table:
+    L, k, x0 = params["L"], params["k"], params["x0"]
+    lo, hi = domain
+    # f(x) = L / (1 + exp(-c (x - x0))) with c = k ln(base); max |f''| = L c^2 / (6 sqrt 3)
+    c = k * math.log(E_APPROX)
+    curvature = abs(L) * c * c / (6 * math.sqrt(3))
+    if curvature == 0:
+        n = 2
+    else:
+        step = math.sqrt(8 * max_error / curvature)
+        n = min(_MAX_TABLE_POINTS, int(math.ceil((hi - lo) / step)) + 1)
+    grid = np.linspace(lo, hi, max(n, 2))
+    step = grid[1] - grid[0]
+    return _Table(lo, step, _logistic_raw_np(grid, L, k, x0), curvature * step * step / 8)
+
+
+class CurveEvaluator:
+    """precompiled curves for one SUITABILITY_PARAMS snapshot"""
+
+    def __init__(self, params: Dict[str, dict], max_error: float = DEFAULT_MAX_ERROR):
+        self.params = params
+        self.tables: Dict[str, _Table] = {}
+        for name, comp in COMPONENTS.items():
+            if comp.kind == "logistic" and comp.params in params:
+                self.tables[name] = _build_logistic_table(params[comp.params], comp.domain, max_error)
+        # guaranteed bound across all tabulated components (<= max_error unless capped)
+        self.max_error = max((t.bound for t in self.tables.values()), default=0.0)
+
+    def component(self, name: str, x) -> np.ndarray:
+        comp = COMPONENTS[name]
+        p = self.params[comp.params]
+        x = np.asarray(x, dtype=float)
+        if comp.kind == "log":
+            return log_curve_np(x, **p)
+        table = self.tables[name]
+        # uniform grid: cell index is arithmetic, no search needed
+        last = len(table.values) - 1
+        pos = (x - table.lo) * (1.0 / table.step)
+        idx = np.clip(np.nan_to_num(pos), 0, last - 1).astype(np.intp)
+        frac = pos - idx
+        lo_vals = table.values[idx]
+        raw = lo_vals + (table.values[idx + 1] - lo_vals) * frac
+        outside = ~((pos >= 0) & (pos <= last))
+        if outside.any():
+            raw = np.where(outside, _logistic_raw_np(x, p["L"], p["k"], p["x0"]), raw)
+        return _finish_logistic(x, raw, comp.cutoff)
+
+
+_evaluator: Optional[CurveEvaluator] = None
+_fingerprint: Optional[str] = None
+
+
+def get_evaluator(max_error: Optional[float] = None) -> CurveEvaluator:
+    """cached evaluator; rebuilt whenever config.SUITABILITY_PARAMS (or max_error) changes"""
+    global _evaluator, _fingerprint
+    tol = max_error if max_error is not None else getattr(config, "SUITABILITY_CURVE_MAX_ERROR", DEFAULT_MAX_ERROR)
+    params = config.SUITABILITY_PARAMS
+    fp = repr((sorted((k, sorted(v.items())) for k, v in params.items()), tol))
+    if _evaluator is None or fp != _fingerprint:
+        _evaluator = CurveEvaluator({k: dict(v) for k, v in params.items()}, tol)
+        _fingerprint = fp
+    return _evaluator
+
+
+def curve_mode() -> str:
+    return getattr(config, "SUITABILITY_CURVES", "exact")
+
+
+def score_columns(
+    columns: Dict[str, Iterable[float]],
+    mode: Optional[str] = None,
+    components: Optional[Iterable[str]] = None,
+    params: Optional[Dict[str, dict]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    vectorised component scores. `columns` maps process_weather_data field
+    names to arrays; returns component name -> score array. Components whose
+    input field (or params) is missing are skipped. `params` overrides
+    config.SUITABILITY_PARAMS (e.g. when tuning).
+    """
+    mode = mode or curve_mode()
+    evaluator = None
+    if params is None:
+        params = config.SUITABILITY_PARAMS
+        if mode == "table":
+            evaluator = get_evaluator()
+    elif mode == "table":
+        evaluator = CurveEvaluator(params, getattr(config, "SUITABILITY_CURVE_MAX_ERROR", DEFAULT_MAX_ERROR))
+    out: Dict[str, np.ndarray] = {}
+    for name in components or COMPONENTS:
+        comp = COMPONENTS[name]
+        if comp.field not in columns or comp.params not in params:
+            continue
+        x = np.asarray(columns[comp.field], dtype=float)
+        if evaluator is not None:
+            out[name] = evaluator.component(name, x)
+        elif comp.kind == "log":
+            out[name] = log_curve_np(x, **params[comp.params])
+        else:
+            out[name] = logistic_np(x, **params[comp.params], cutoff=comp.cutoff)
+    return out
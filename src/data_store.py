@@ -1,18 +1,119 @@
 import csv
+import gzip
+import io
+import json
+import os
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to unlocked writes
+    fcntl = None
 
 DATA_DIR = Path(__file__).resolve().parent / "data"
-HISTORY_PATH = DATA_DIR / "forecast_history.csv"
+HISTORY_PATH = DATA_DIR / "forecast_history.csv"          # hot segment: current weeks only
+ARCHIVE_DIR = DATA_DIR / "archive"                         # forecast_history_YYYY-MM.csv.gz
+SUMMARY_PATH = DATA_DIR / "forecast_summary.csv"           # first/last forecast per (location, date); split per
+                                                           # forecast month as forecast_summary_YYYY-MM.csv
+LOCK_PATH = DATA_DIR / "forecast_history.lock"             # serialises writers across processes
+INDEX_PATH = DATA_DIR / "history_index.json"               # (location, week, window) -> run snapshot
+
+HISTORY_FIELDS = [
+    "run_timestamp",
+    "location",
+    "promise_window",
+    "forecast_date",
+    "suitability_score",
+    "avg_cloud",
+    "min_cloud",
+    "max_cloud",
+    "moon_presence",
+    "moon_illumination",
+    "wind_speed_kph",
+    "humidity",
+    "visibility_km",
+    "sky_brightness",
+]
+
+SUMMARY_FIELDS = [
+    "location",
+    "forecast_date",
+    "first_run",
+    "first_score",
+    "last_run",
+    "last_score",
+    "revisions",
+]
+
+DEFAULT_HOT_WEEKS = 2
+INDEX_KEEP_WEEKS = 8
+
+# per-night values kept in the window index (enough to diff and describe a run)
+INDEX_FIELDS = ("suitability_score", "avg_cloud", "moon_presence", "moon_illumination", "wind_speed_kph", "humidity")
 
 
 def _ensure_data_dir() -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
 
 
+def _row_location(row: dict) -> str:
+    # early history files used "city" for the location column
+    return row.get("location") or row.get("city") or ""
+
+
+def run_epoch(run_timestamp_iso: str) -> float:
+    """
+    a run timestamp as seconds since the epoch, for ordering runs. stamps
+    carry each site's own UTC offset, so they don't order as strings; naive
+    (legacy) stamps are read as default-zone local. unparseable -> -inf.
+    """
+    try:
+        ts = datetime.fromisoformat(run_timestamp_iso)
+    except (TypeError, ValueError):
+        return float("-inf")
+    if ts.tzinfo is None:
+        from src.zones import default_tz, zone
+        ts = ts.replace(tzinfo=zone(default_tz()))
+    return ts.timestamp()
+
+
+def _row_date(row: dict) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(row["run_timestamp"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _week_key(city: str, day, window: str) -> str:
+    week_monday = day - timedelta(days=day.weekday())
+    return f"{city}|{week_monday.isoformat()}|{window}"
+
+
+def _read_index() -> Dict[str, dict]:
+    try:
+        with INDEX_PATH.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def window_snapshot(city: str, now: datetime, window: str = "monday") -> Optional[Dict[str, dict]]:
+    """
+    forecast_date -> values recorded by this week's `window` run for `city`,
+    straight from the index (no CSV scan). None if no such run is indexed.
+    """
+    entry = _read_index().get(_week_key(city, now.date(), window))
+    return entry["nights"] if entry else None
+
+
 def monday_notified_this_week(city: str, now: datetime) -> bool:
     """Return True if a Monday notification was recorded for this city in the current calendar week."""
+    if window_snapshot(city, now, "monday") is not None:
+        return True
+    # rows written before the index existed
     if not HISTORY_PATH.exists():
         return False
     week_monday = now.date() - timedelta(days=now.weekday())
@@ -32,50 +133,350 @@ def monday_notified_this_week(city: str, now: datetime) -> bool:
     return False
 
 
+def _history_rows(
+    city: str,
+    run_timestamp_iso: str,
+    scored_days: Iterable[dict],
+    promise_window: Optional[str],
+) -> List[dict]:
+    return [
+        {
+            "run_timestamp": run_timestamp_iso,
+            "location": city,
+            "promise_window": promise_window or "",
+            "forecast_date": day.get("date", ""),
+            "suitability_score": day.get("suitability_score", ""),
+            "avg_cloud": day.get("avg_cloud", ""),
+            "min_cloud": day.get("min_cloud", ""),
+            "max_cloud": day.get("max_cloud", ""),
+            "moon_presence": day.get("moon_presence", ""),
+            "moon_illumination": day.get("moon_illumination", ""),
+            "wind_speed_kph": day.get("wind_speed_kph", ""),
+            "humidity": day.get("humidity", ""),
+            "visibility_km": day.get("visibility_km", ""),
+            "sky_brightness": day.get("sky_brightness", ""),
+        }
+        for day in scored_days
+    ]
+
+
+@contextmanager
+def history_lock():
+    """exclusive cross-process lock around every history/summary/archive mutation"""
+    _ensure_data_dir()
+    with open(LOCK_PATH, "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def _upgrade_header_locked() -> None:
+    """rewrite a hot file written before a column was added so appended rows line up"""
+    with HISTORY_PATH.open("r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        if reader.fieldnames == HISTORY_FIELDS:
+            return
+        rows = list(reader)
+    print(f"[diagnostic] history: upgrading header to {len(HISTORY_FIELDS)} columns ({len(rows)} rows)")
+    _write_atomic(HISTORY_PATH, HISTORY_FIELDS, rows)
+
+
+def write_history_rows(rows: List[dict]) -> None:
+    """
+    append rows as one buffered write under the history lock. the header is
+    decided inside the lock (empty/missing file), and the data is fsynced
+    before the lock is released so a crash never leaves a torn batch behind
+    another writer's rows.
+    """
+    if not rows:
+        return
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=HISTORY_FIELDS, extrasaction="ignore")
+    with history_lock():
+        if not HISTORY_PATH.exists() or HISTORY_PATH.stat().st_size == 0:
+            writer.writeheader()
+        else:
+            _upgrade_header_locked()
+        writer.writerows(rows)
+        data = buf.getvalue().encode("utf-8")
+        fd = os.open(HISTORY_PATH, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        _update_summary_locked(rows)
+        _update_index_locked(rows)
+
+
 def append_forecast_history(
     city: str,
     run_timestamp_iso: str,
     scored_days: Iterable[dict],
     promise_window: Optional[str],
 ) -> None:
-    _ensure_data_dir()
-    fieldnames = [
-        "run_timestamp",
-        "location",
-        "promise_window",
-        "forecast_date",
-        "suitability_score",
-        "avg_cloud",
-        "min_cloud",
-        "max_cloud",
-        "moon_presence",
-        "moon_illumination",
-        "wind_speed_kph",
-        "humidity",
-        "visibility_km",
-    ]
+    write_history_rows(_history_rows(city, run_timestamp_iso, scored_days, promise_window))
+
+
+class HistoryWriter:
+    """
+    buffers a whole run's history and writes it once on exit (also when the
+    run fails part-way, so completed locations are not lost). repeated adds
+    for the same (location, run) are ignored — the forecast is per city, not
+    per subscriber. `on_flush` is called with the locations of each batch
+    once it is on disk (the run journal marks their history stage done).
+    """
+
+    def __init__(self, on_flush: Optional[Callable[[List[str]], None]] = None):
+        self.rows: List[dict] = []
+        self._seen: Set[Tuple[str, str]] = set()
+        self.on_flush = on_flush
+
+    def add(self, city: str, run_timestamp_iso: str, scored_days: Iterable[dict], promise_window: Optional[str]) -> None:
+        key = (city, run_timestamp_iso)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.rows.extend(_history_rows(city, run_timestamp_iso, scored_days, promise_window))
+
+    def flush(self) -> int:
+        count = len(self.rows)
+        write_history_rows(self.rows)
+        if self.on_flush is not None and self.rows:
+            self.on_flush([r["location"] for r in self.rows])
+        self.rows = []
+        return count
 
-    file_exists = HISTORY_PATH.exists()
-    with HISTORY_PATH.open("a", newline="", encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        if not file_exists:
+    def __enter__(self) -> "HistoryWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        count = self.flush()
+        print(f"[diagnostic] HistoryWriter: wrote rows={count}")
+
+
+# ---------------------------------------------------------------------------
+# retention: monthly archives + per-night summary
+# ---------------------------------------------------------------------------
+
+def archive_path(month: str) -> Path:
+    return ARCHIVE_DIR / f"forecast_history_{month}.csv.gz"
+
+
+def summary_path(month: str) -> Path:
+    return SUMMARY_PATH.with_name(f"{SUMMARY_PATH.stem}_{month}{SUMMARY_PATH.suffix}")
+
+
+def _read_summary(path: Path) -> Dict[Tuple[str, str], dict]:
+    if not path.exists():
+        return {}
+    with path.open("r", encoding="utf-8") as f:
+        return {(r["location"], r["forecast_date"]): r for r in csv.DictReader(f)}
+
+
+def _write_summary(path: Path, summary: Dict[Tuple[str, str], dict]) -> None:
+    _write_atomic(path, SUMMARY_FIELDS, sorted(summary.values(), key=lambda e: (e["location"], e["forecast_date"])))
+
+
+def _split_legacy_summary_locked() -> None:
+    """move a single-file summary (older releases) into per-month files, once"""
+    if not SUMMARY_PATH.exists():
+        return
+    by_month: Dict[str, Dict[Tuple[str, str], dict]] = {}
+    for key, entry in _read_summary(SUMMARY_PATH).items():
+        by_month.setdefault(key[1][:7], {})[key] = entry
+    for month, entries in by_month.items():
+        _write_summary(summary_path(month), {**entries, **_read_summary(summary_path(month))})
+    SUMMARY_PATH.unlink()
+
+
+def _write_atomic(path: Path, fieldnames: List[str], rows: Iterable[dict]) -> None:
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def update_summary(rows: Iterable[dict]) -> None:
+    """fold new history rows into the first/last-forecast summary"""
+    with history_lock():
+        _update_summary_locked(list(rows))
+
+
+def _update_summary_locked(rows: List[dict]) -> None:
+    """
+    the summary is kept per forecast month, so an append rewrites only the
+    months its nights fall in (this one and maybe the next), not every night
+    ever summarised
+    """
+    by_month: Dict[str, List[dict]] = {}
+    for row in rows:
+        day = row.get("forecast_date", "")
+        if day:
+            by_month.setdefault(day[:7], []).append(row)
+    if not by_month:
+        return
+    _split_legacy_summary_locked()
+    for month, month_rows in by_month.items():
+        path = summary_path(month)
+        summary = _read_summary(path)
+        _fold_summary(summary, month_rows)
+        _write_summary(path, summary)
+
+
+def _fold_summary(summary: Dict[Tuple[str, str], dict], rows: List[dict]) -> None:
+    for row in rows:
+        key = (_row_location(row), row["forecast_date"])
+        ts, score = row.get("run_timestamp", ""), row.get("suitability_score", "")
+        entry = summary.get(key)
+        if entry is None:
+            summary[key] = {
+                "location": key[0], "forecast_date": key[1],
+                "first_run": ts, "first_score": score,
+                "last_run": ts, "last_score": score, "revisions": 1,
+            }
+            continue
+        entry["revisions"] = int(entry.get("revisions") or 0) + 1
+        at = run_epoch(ts)
+        if at < run_epoch(entry["first_run"]):
+            entry["first_run"], entry["first_score"] = ts, score
+        if at >= run_epoch(entry["last_run"]):
+            entry["last_run"], entry["last_score"] = ts, score
+
+
+def _update_index_locked(rows: List[dict]) -> None:
+    """record each windowed run's nights; the latest run per (location, week, window) wins"""
+    windowed = [r for r in rows if r.get("promise_window")]
+    if not windowed:
+        return
+    index = _read_index()
+    for row in windowed:
+        ts = _row_date(row)
+        if ts is None:
+            continue
+        key = _week_key(_row_location(row), ts.date(), row["promise_window"])
+        entry = index.get(key)
+        at = run_epoch(row["run_timestamp"])
+        if entry is None or at > run_epoch(entry["run"]):
+            entry = index[key] = {"run": row["run_timestamp"], "nights": {}}
+        elif at < run_epoch(entry["run"]):
+            continue
+        entry["nights"][row.get("forecast_date", "")] = {f: row.get(f, "") for f in INDEX_FIELDS}
+
+    # keep the newest INDEX_KEEP_WEEKS weeks (relative to the data, not the wall clock)
+    newest = max(k.split("|")[1] for k in index)
+    oldest = (datetime.fromisoformat(newest) - timedelta(weeks=INDEX_KEEP_WEEKS)).date().isoformat()
+    index = {k: v for k, v in index.items() if k.split("|")[1] >= oldest}
+    tmp = INDEX_PATH.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(index, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, INDEX_PATH)
+
+
+def read_summary(city: str, forecast_date: str) -> Optional[dict]:
+    key = (city, forecast_date)
+    return _read_summary(summary_path(forecast_date[:7])).get(key) or _read_summary(SUMMARY_PATH).get(key)
+
+
+def compact_history(now: datetime, hot_weeks: Optional[int] = None) -> int:
+    """
+    move rows from runs before the hot window (the current week plus
+    hot_weeks-1 previous weeks) into gzip monthly archives, rewrite the
+    hot file with what remains. the archives are durable before the hot
+    file is rewritten, and re-archiving after a crash is a no-op. the
+    per-night summary is kept for archived nights too. returns the number
+    of rows moved out of the hot file.
+    """
+    if hot_weeks is None:
+        try:
+            import config
+            hot_weeks = int(getattr(config, "HISTORY_HOT_WEEKS", DEFAULT_HOT_WEEKS))
+        except ImportError:
+            hot_weeks = DEFAULT_HOT_WEEKS
+    with history_lock():
+        return _compact_locked(now, hot_weeks)
+
+
+def _compact_locked(now: datetime, hot_weeks: int) -> int:
+    if not HISTORY_PATH.exists():
+        return 0
+
+    cutoff = now.date() - timedelta(days=now.weekday()) - timedelta(weeks=max(hot_weeks, 1) - 1)
+    keep: List[dict] = []
+    by_month: Dict[str, List[dict]] = {}
+    with HISTORY_PATH.open("r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row["location"] = _row_location(row)
+            ts = _row_date(row)
+            if ts is None or ts.date() >= cutoff:
+                keep.append(row)
+            else:
+                by_month.setdefault(ts.strftime("%Y-%m"), []).append(row)
+
+    if not by_month:
+        return 0
+
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    for month, rows in sorted(by_month.items()):
+        _archive_locked(month, rows)
+
+    _write_atomic(HISTORY_PATH, HISTORY_FIELDS, keep)
+    archived = sum(len(r) for r in by_month.values())
+    print(f"[diagnostic] compact_history: archived={archived} months={sorted(by_month)} hot_rows={len(keep)}")
+    return archived
+
+
+def _archive_key(row: dict) -> Tuple[str, str, str]:
+    return _row_location(row), row.get("run_timestamp", ""), row.get("forecast_date", "")
+
+
+def _archive_locked(month: str, rows: List[dict]) -> int:
+    """
+    merge rows into a month's archive: the file is rewritten to a temp file,
+    fsynced and swapped in before the hot file drops the rows, and rows
+    already archived (a compaction that crashed before its hot-file rewrite)
+    are skipped. returns the number of rows added.
+    """
+    path = archive_path(month)
+    existing: List[dict] = []
+    if path.exists():
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as gz:
+            existing = list(csv.DictReader(gz))
+    seen = {_archive_key(r) for r in existing}
+    new_rows = [r for r in rows if _archive_key(r) not in seen]
+    if not new_rows:
+        return 0
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    with tmp.open("wb") as raw:
+        with gzip.GzipFile(fileobj=raw, mode="wb") as gz, io.TextIOWrapper(gz, newline="", encoding="utf-8") as text:
+            writer = csv.DictWriter(text, fieldnames=HISTORY_FIELDS, extrasaction="ignore")
             writer.writeheader()
+            writer.writerows(existing)
+            writer.writerows(new_rows)
+        raw.flush()
+        os.fsync(raw.fileno())
+    os.replace(tmp, path)
+    return len(new_rows)
+
 
-        for day in scored_days:
-            writer.writerow(
-                {
-                    "run_timestamp": run_timestamp_iso,
-                    "location": city,
-                    "promise_window": promise_window or "",
-                    "forecast_date": day.get("date", ""),
-                    "suitability_score": day.get("suitability_score", ""),
-                    "avg_cloud": day.get("avg_cloud", ""),
-                    "min_cloud": day.get("min_cloud", ""),
-                    "max_cloud": day.get("max_cloud", ""),
-                    "moon_presence": day.get("moon_presence", ""),
-                    "moon_illumination": day.get("moon_illumination", ""),
-                    "wind_speed_kph": day.get("wind_speed_kph", ""),
-                    "humidity": day.get("humidity", ""),
-                    "visibility_km": day.get("visibility_km", ""),
-                }
-            )
+def iter_history(include_archive: bool = False) -> Iterator[dict]:
+    """history rows (oldest archives first, then the hot file)"""
+    if include_archive and ARCHIVE_DIR.exists():
+        for path in sorted(ARCHIVE_DIR.glob("forecast_history_*.csv.gz")):
+            with gzip.open(path, "rt", newline="", encoding="utf-8") as gz:
+                yield from csv.DictReader(gz)
+    if HISTORY_PATH.exists():
+        with HISTORY_PATH.open("r", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
@@ -0,0 +1,153 @@
+"""
+Precomputed ephemeris tables for the configured sites.
+
+Sun and moon events are fully deterministic, so instead of running Astral's
+iterative search on every run we compute them once per location for a span
+of years and store them as a compact binary table under src/data/ephemeris.
+Each row is one local calendar date; times are stored as minutes past local
+midnight (-1 = no event that day) and illumination in tenths of a percent.
+
+Build (from the repo root):
+    python -m src.ephemeris --years 5
+"""
+from __future__ import annotations
+
+import argparse
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from src import metrics
+from src.zones import DEFAULT_TZ, parse_location, zone
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "ephemeris"
+
+_NO_EVENT = -1
+_TIME_FIELDS = ("sunrise", "sunset", "dusk", "dawn", "moonrise", "moonset")
+TABLE_DTYPE = np.dtype([(f, "<i2") for f in _TIME_FIELDS] + [("illumination", "<i2")])
+
+# (lat, lon) key -> (start ordinal, tz name, table) or None when no file exists
+_tables: Dict[Tuple[float, float], Optional[Tuple[int, str, np.ndarray]]] = {}
+
+
+def table_path(lat: float, lon: float) -> Path:
+    return DATA_DIR / f"ephemeris_{lat:.4f}_{lon:.4f}.npz"
+
+
+def _key(lat: float, lon: float) -> Tuple[float, float]:
+    return round(float(lat), 4), round(float(lon), 4)
+
+
+def _minutes(dt) -> int:
+    return _NO_EVENT if dt is None else dt.hour * 60 + dt.minute
+
+
+def _fmt(minutes: int) -> Optional[str]:
+    # same "%I:%M %p" rendering as moon_utils.get_moon_sun_times
+    if minutes < 0:
+        return None
+    h, m = divmod(int(minutes), 60)
+    return f"{(h % 12) or 12:02d}:{m:02d} {'AM' if h < 12 else 'PM'}"
+
+
+def build_table(lat: float, lon: float, start: date, days: int, tz: str = DEFAULT_TZ) -> np.ndarray:
+    """compute one row per date with Astral (slow path, run offline)"""
+    from astral import LocationInfo, moon
+    from astral.sun import dawn, dusk, sun
+
+    from src.moon_utils import moon_illumination
+
+    tzinfo = zone(tz)
+    obs = LocationInfo(latitude=lat, longitude=lon, timezone=tz).observer
+    table = np.full(days, _NO_EVENT, dtype=TABLE_DTYPE)
+
+    def safe(fn, day, **kw):
+        try:
+            return fn(obs, date=day, tzinfo=tzinfo, **kw)
+        except ValueError:
+            return None
+
+    for i in range(days):
+        day = start + timedelta(days=i)
+        s = sun(obs, date=day, tzinfo=tzinfo)
+        row = table[i]
+        row["sunrise"] = _minutes(s.get("sunrise"))
+        row["sunset"] = _minutes(s.get("sunset"))
+        row["dusk"] = _minutes(safe(dusk, day, depression=18))
+        row["dawn"] = _minutes(safe(dawn, day, depression=18))
+        row["moonrise"] = _minutes(safe(moon.moonrise, day))
+        row["moonset"] = _minutes(safe(moon.moonset, day))
+        row["illumination"] = int(round(moon_illumination(day) * 10))
+    return table
+
+
+def save_table(lat: float, lon: float, start: date, table: np.ndarray, tz: str = DEFAULT_TZ) -> Path:
+    DATA_DIR.mkdir(parents=True, exist_ok=True)
+    path = table_path(lat, lon)
+    np.savez_compressed(path, start=np.int64(start.toordinal()), tz=np.array(tz), table=table)
+    _tables.pop(_key(lat, lon), None)
+    return path
+
+
+def _load(lat: float, lon: float) -> Optional[Tuple[int, str, np.ndarray]]:
+    key = _key(lat, lon)
+    if key not in _tables:
+        path = table_path(*key)
+        if path.exists():
+            with np.load(path) as npz:
+                _tables[key] = (int(npz["start"]), str(npz["tz"]), npz["table"])
+        else:
+            _tables[key] = None
+    return _tables[key]
+
+
+def lookup(lat: float, lon: float, day: date, tz: str = DEFAULT_TZ) -> Optional[dict]:
+    """O(1) table lookup; None if no table covers (lat, lon, day, tz)"""
+    loaded = _load(lat, lon)
+    if loaded is None:
+        return None
+    start, table_tz, table = loaded
+    idx = day.toordinal() - start
+    if table_tz != tz or not 0 <= idx < len(table):
+        return None
+    row = table[idx]
+    out = {f: _fmt(row[f]) for f in _TIME_FIELDS}
+    out["illumination"] = int(row["illumination"]) / 10.0
+    return out
+
+
+def get_astro(lat: float, lon: float, day: date, tz: str = DEFAULT_TZ) -> dict:
+    """table lookup with automatic fallback to Astral outside the table"""
+    hit = lookup(lat, lon, day, tz)
+    metrics.cache("ephemeris", hit is not None)
+    if hit is not None:
+        return hit
+    from src.moon_utils import get_moon_sun_times
+    return get_moon_sun_times(lat, lon, day, tz=tz)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Precompute ephemeris tables for config.LOCATIONS")
+    parser.add_argument("--start", type=date.fromisoformat, default=date.today().replace(month=1, day=1))
+    parser.add_argument("--years", type=int, default=5)
+    parser.add_argument("--tz", default=None, help="override every site's zone (default: each location's own)")
+    args = parser.parse_args(argv)
+
+    import config
+    days = (args.start.replace(year=args.start.year + args.years) - args.start).days
+    for city, coords in config.LOCATIONS.items():
+        lat, lon, tz = parse_location(city, coords)
+        tz = args.tz or tz
+        table = build_table(lat, lon, args.start, days, tz=tz)
+        path = save_table(lat, lon, args.start, table, tz=tz)
+        print(f"[ephemeris] {city}: {days} days from {args.start} -> {path.name} ({path.stat().st_size} bytes)")
+
+
+if __name__ == "__main__":
+    ROOT = Path(__file__).resolve().parents[1]
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    main()
@@ -0,0 +1,86 @@
+"""
+Diff the Wednesday weekend selection against Monday's recorded run.
+
+A change is material when a night's score moves by at least
+config.DIFF_SCORE_DELTA points (default 10), when it crosses
+NOTIFY_THRESHOLD in either direction, when a night had no Monday forecast,
+or when the best night of the weekend changes. A crossing that lands within
+a night's score noise (the std of its revisions recorded before this run,
+once there are at least three) of the threshold is not material on its own. Nothing material means
+no follow-up; otherwise a compact delta message is sent instead of a fresh
+AI-generated outlook.
+"""
+from __future__ import annotations
+
+from typing import Dict, List, Optional
+
+DEFAULT_SCORE_DELTA = 10.0
+_ABBREV = {4: "Fri", 5: "Sat", 6: "Sun"}
+
+
+def _to_float(value) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _label(day) -> str:
+    return _ABBREV.get(day.weekday(), day.strftime("%a"))
+
+
+def diff_nights(
+    nights: List[dict],
+    previous: Dict[str, dict],
+    threshold: float,
+    score_delta: float = DEFAULT_SCORE_DELTA,
+    noise: Optional[Dict[str, float]] = None,
+) -> dict:
+    """
+    nights: select_promising_nights output for this run.
+    previous: forecast_date -> recorded values (data_store.window_snapshot).
+    noise: forecast_date -> score std across revisions (crossings inside it don't count).
+    """
+    changes: List[dict] = []
+    for night in nights:
+        before = _to_float(previous.get(night["date"].isoformat(), {}).get("suitability_score"))
+        after = float(night["score"])
+        if before is None:
+            changes.append({"date": night["date"], "before": None, "after": after,
+                            "delta": None, "crossed": after >= threshold, "material": True})
+            continue
+        delta = after - before
+        crossed = (before >= threshold) != (after >= threshold)
+        clear = abs(after - threshold) > (noise or {}).get(night["date"].isoformat(), 0.0)
+        changes.append({"date": night["date"], "before": before, "after": after, "delta": delta,
+                        "crossed": crossed, "material": (crossed and clear) or abs(delta) >= score_delta})
+
+    known = [c for c in changes if c["before"] is not None]
+    best_before = max(known, key=lambda c: c["before"])["date"] if known else None
+    best_after = max(changes, key=lambda c: c["after"])["date"] if changes else None
+    # a tie with Monday's best night is not a change of best night
+    after_by_date = {c["date"]: c["after"] for c in changes}
+    best_changed = best_before is not None and after_by_date[best_before] < after_by_date[best_after]
+
+    return {
+        "changes": changes,
+        "best_before": best_before,
+        "best_after": best_after,
+        "best_changed": best_changed,
+        "material": best_changed or any(c["material"] for c in changes),
+    }
+
+
+def build_delta_message(city: str, rule_label: str, diff: dict, threshold: float) -> str:
+    """'Adelaide updated forecast — Sat 62→81 ✓ · Sun 74→55 · Fri steady 40'"""
+    moved, steady = [], []
+    for c in diff["changes"]:
+        tag = " ✓" if c["crossed"] and c["after"] >= threshold else ""
+        if c["before"] is None:
+            moved.append(f"{_label(c['date'])} new {c['after']:.0f}{tag}")
+        elif c["material"]:
+            moved.append(f"{_label(c['date'])} {c['before']:.0f}→{c['after']:.0f}{tag}")
+        else:
+            steady.append(f"{_label(c['date'])} steady {c['after']:.0f}")
+    best = f" — best now {_label(diff['best_after'])}" if diff["best_changed"] else ""
+    return f"{city} {rule_label} — {' · '.join(moved + steady)}{best}"
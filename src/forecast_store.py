@@ -0,0 +1,217 @@
+"""
+In-process store of every forecast revision, for trend and stability queries.
+
+Revisions are kept per (location, forecast_date) in one preallocated ring
+buffer: a fixed number of revision slots per night (oldest revision
+overwritten first) and a fixed number of nights sized from a memory budget
+(least recently updated night evicted first). Memory never grows with the
+length of the history.
+
+    store = get_store()                     # lazily loaded from the hot history
+    store.stability("Adelaide", "2025-11-01")
+    store.trend("Adelaide", "2025-11-01", "avg_cloud", last=4)
+
+Config (optional): FORECAST_STORE_MB (default 8), FORECAST_STORE_REVISIONS
+(default 32).
+"""
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+STORE_FIELDS = (
+    "suitability_score",
+    "avg_cloud",
+    "min_cloud",
+    "max_cloud",
+    "moon_presence",
+    "moon_illumination",
+    "wind_speed_kph",
+    "humidity",
+    "visibility_km",
+)
+DEFAULT_BUDGET_MB = 8
+DEFAULT_REVISIONS = 32
+MIN_NOISE_REVISIONS = 3  # prior revisions needed before a night's score noise is trusted
+
+_FIELD_INDEX = {f: i for i, f in enumerate(STORE_FIELDS)}
+
+
+def _num(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def _epoch(run_timestamp_iso: str) -> Optional[int]:
+    try:
+        return int(datetime.fromisoformat(run_timestamp_iso).timestamp())
+    except (TypeError, ValueError):
+        return None
+
+
+class ForecastStore:
+    def __init__(self, budget_bytes: Optional[int] = None, revisions: Optional[int] = None):
+        if budget_bytes is None or revisions is None:
+            try:
+                import config
+            except ImportError:
+                config = None
+            if budget_bytes is None:
+                budget_bytes = int(float(getattr(config, "FORECAST_STORE_MB", DEFAULT_BUDGET_MB)) * 1024 * 1024)
+            if revisions is None:
+                revisions = int(getattr(config, "FORECAST_STORE_REVISIONS", DEFAULT_REVISIONS))
+        self.revisions = max(1, revisions)
+        # float32 per field plus an int64 run time, per revision slot
+        per_night = self.revisions * (len(STORE_FIELDS) * 4 + 8)
+        self.capacity = max(1, budget_bytes // per_night)
+        self._values = np.full((self.capacity, self.revisions, len(STORE_FIELDS)), np.nan, dtype=np.float32)
+        self._runs = np.zeros((self.capacity, self.revisions), dtype=np.int64)
+        self._written = np.zeros(self.capacity, dtype=np.int64)   # revisions ever written per slot
+        self._slots: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+        self._free = list(range(self.capacity - 1, -1, -1))
+        self.evicted = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._values.nbytes + self._runs.nbytes + self._written.nbytes
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Tuple[str, str]) -> bool:
+        return key in self._slots
+
+    # --- writes -------------------------------------------------------------
+
+    def _slot(self, key: Tuple[str, str]) -> int:
+        slot = self._slots.get(key)
+        if slot is not None:
+            self._slots.move_to_end(key)
+            return slot
+        if not self._free:
+            _, slot = self._slots.popitem(last=False)
+            self.evicted += 1
+        else:
+            slot = self._free.pop()
+        self._values[slot] = np.nan
+        self._runs[slot] = 0
+        self._written[slot] = 0
+        self._slots[key] = slot
+        return slot
+
+    def add_row(self, row: dict) -> bool:
+        """one history-shaped row; a repeat of the night's latest run is ignored"""
+        key = (row.get("location") or row.get("city") or "", str(row.get("forecast_date") or row.get("date") or ""))
+        run = _epoch(row.get("run_timestamp", ""))
+        if not key[1] or run is None:
+            return False
+        slot = self._slot(key)
+        n = int(self._written[slot])
+        if n and self._runs[slot, (n - 1) % self.revisions] == run:
+            return False
+        i = n % self.revisions
+        self._values[slot, i] = [_num(row.get(f)) for f in STORE_FIELDS]
+        self._runs[slot, i] = run
+        self._written[slot] = n + 1
+        return True
+
+    def add(self, city: str, run_timestamp_iso: str, scored_days: Iterable[dict]) -> int:
+        """one run's scored nights (same shape as HistoryWriter.add)"""
+        added = 0
+        for day in scored_days:
+            row = dict(day, location=city, forecast_date=day.get("date", ""), run_timestamp=run_timestamp_iso)
+            added += self.add_row(row)
+        return added
+
+    def load(self, rows: Iterable[dict]) -> int:
+        return sum(self.add_row(r) for r in rows)
+
+    # --- queries ------------------------------------------------------------
+
+    def revisions_of(self, location: str, forecast_date: str, field: str = "suitability_score", last: Optional[int] = None,
+                     before: Optional[str] = None) -> np.ndarray:
+        """values of `field` over the stored revisions, oldest first (only runs earlier than `before`, if given)"""
+        slot = self._slots.get((location, str(forecast_date)))
+        if slot is None:
+            return np.empty(0, dtype=np.float32)
+        n = min(int(self._written[slot]), self.revisions)
+        head = int(self._written[slot])
+        order = (head - n + np.arange(n)) % self.revisions
+        if before is not None:
+            cutoff = _epoch(before)
+            if cutoff is not None:
+                order = order[self._runs[slot, order] < cutoff]
+        if last is not None:
+            order = order[max(0, len(order) - last):]
+        return self._values[slot, order, _FIELD_INDEX[field]]
+
+    def stability(self, location: str, forecast_date: str, last: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """how much the night's score has moved across its revisions"""
+        scores = self.revisions_of(location, forecast_date, "suitability_score", last)
+        scores = scores[~np.isnan(scores)]
+        if not len(scores):
+            return None
+        return {
+            "revisions": int(len(scores)),
+            "latest": float(scores[-1]),
+            "mean": float(scores.mean()),
+            "std": float(scores.std()),
+            "spread": float(scores.max() - scores.min()),
+        }
+
+    def score_noise(self, location: str, forecast_date: str, before: str) -> Optional[float]:
+        """
+        score std over the revisions recorded before the run at `before`, so
+        the run being judged never widens its own noise band; None with fewer
+        than MIN_NOISE_REVISIONS of them.
+        """
+        scores = self.revisions_of(location, forecast_date, "suitability_score", before=before)
+        scores = scores[~np.isnan(scores)]
+        if len(scores) < MIN_NOISE_REVISIONS:
+            return None
+        return float(scores.std())
+
+    def trend(self, location: str, forecast_date: str, field: str = "avg_cloud", last: Optional[int] = None) -> Optional[Dict[str, float]]:
+        """first/latest value and least-squares slope per revision"""
+        values = self.revisions_of(location, forecast_date, field, last)
+        values = values[~np.isnan(values)]
+        if len(values) < 2:
+            return None
+        slope = float(np.polyfit(np.arange(len(values)), values.astype(float), 1)[0])
+        return {
+            "revisions": int(len(values)),
+            "first": float(values[0]),
+            "latest": float(values[-1]),
+            "change": float(values[-1] - values[0]),
+            "slope": slope,
+        }
+
+    def night_context(self, location: str, forecast_date: str, last: Optional[int] = None) -> Optional[dict]:
+        """stability + cloud trend for a night, or None with fewer than two revisions"""
+        stability = self.stability(location, forecast_date, last)
+        if stability is None or stability["revisions"] < 2:
+            return None
+        return {"stability": stability, "cloud": self.trend(location, forecast_date, "avg_cloud", last)}
+
+
+_store: Optional[ForecastStore] = None
+
+
+def get_store() -> ForecastStore:
+    """process-wide store, loaded from the hot history on first use"""
+    global _store
+    if _store is None:
+        from src.data_store import iter_history
+        t0 = time.perf_counter()
+        store = ForecastStore()
+        loaded = store.load(iter_history())
+        print(f"[diagnostic] forecast_store: loaded revisions={loaded} nights={len(store)} "
+              f"budget={store.nbytes / 1024 / 1024:.1f}MB in {(time.perf_counter() - t0) * 1000:.0f}ms")
+        _store = store
+    return _store
@@ -0,0 +1,62 @@
+"""
+Cross-location weekend leaderboard.
+
+A user subscribed to several sites gets one notification per window instead
+of one per site: every site's selected weekend nights are ranked together
+and a bounded top-k of (site, night) pairs is kept in a heap, so ranking
+stays O(n log k) however many sites the user follows. Monday's leaderboard
+goes through the message generator once; Wednesday's follow-up keeps only
+sites whose weekend materially changed since Monday and is sent as a
+compact delta, like the single-site follow-up.
+
+Config (optional): LEADERBOARD_SIZE nights per notification (default 3).
+"""
+from __future__ import annotations
+
+import heapq
+from typing import Iterable, List, Tuple
+
+import config
+
+DEFAULT_SIZE = 3
+TITLE = "Top sites"
+_ABBREV = {4: "Fri", 5: "Sat", 6: "Sun"}
+
+
+def size() -> int:
+    return max(1, int(getattr(config, "LEADERBOARD_SIZE", DEFAULT_SIZE)))
+
+
+def _label(day) -> str:
+    return _ABBREV.get(day.weekday(), day.strftime("%a"))
+
+
+def top_nights(candidates: Iterable[Tuple[str, dict]], k: int) -> List[dict]:
+    """
+    best k of (site, night) by score, earlier night then first-seen site on
+    ties; each returned night is a copy carrying its "site".
+    """
+    heap: List[tuple] = []
+    for seq, (site, night) in enumerate(candidates):
+        entry = (float(night["score"]), -night["date"].toordinal(), -seq, site, night)
+        if len(heap) < k:
+            heapq.heappush(heap, entry)
+        elif entry[:3] > heap[0][:3]:
+            heapq.heapreplace(heap, entry)
+    return [dict(night, site=site) for *_, site, night in sorted(heap, key=lambda e: e[:3], reverse=True)]
+
+
+def build_delta_message(rule_label: str, nights: List[dict], threshold: float) -> str:
+    """'Top sites updated forecast — Clare Sat 62→81 ✓ · Adelaide Sun new 74'"""
+    parts = []
+    for night in nights:
+        tag = " ✓" if night["score"] >= threshold else ""
+        before = night.get("before")
+        if before is None:
+            change = f"new {night['score']:.0f}"
+        elif round(before) == round(night["score"]):
+            change = f"steady {night['score']:.0f}"
+        else:
+            change = f"{before:.0f}→{night['score']:.0f}"
+        parts.append(f"{night['site']} {_label(night['date'])} {change}{tag}")
+    return f"{TITLE} {rule_label} — {' · '.join(parts)}"
@@ -0,0 +1,165 @@
+"""
+Site darkness from a memory-mapped light-pollution raster.
+
+The raster is a plain row-major binary grid of zenith sky brightness in
+mag/arcsec^2 (SQM; ~17 city centre, ~22 pristine), with a JSON sidecar
+holding its georeference:
+
+    src/data/light_pollution/sky_brightness.bin
+    src/data/light_pollution/sky_brightness.json
+        {"west": 129.0, "north": -26.0, "res_deg": 0.0083333,
+         "width": 1200, "height": 1080, "dtype": "float32", "nodata": -1}
+
+The grid is opened with np.memmap, so a lookup touches one page of the file
+instead of loading it; sample_many() samples whole arrays of cells (grid /
+region runs) in one vectorised gather. Per-site values are cached.
+
+Build the grid once from a World Atlas / VIIRS-derived GeoTIFF (needs the
+optional rasterio package), cropped to the region of interest:
+
+    python -m src.light_pollution --geotiff World_Atlas_2015.tif --bbox -39,129,-26,141 --units mcd
+
+The "sky_brightness" scoring component only applies when
+config.SUITABILITY_PARAMS has a "sky_brightness" entry (and WEIGHTS a
+weight for it), e.g. {"L": 100, "k": 2.0, "x0": 20.0}. Sites outside the
+raster are not scored on it; their other components' weights are scaled up
+to cover its share, so their totals stay on the same scale as sites inside
+it. config.LIGHT_POLLUTION_RASTER overrides the path.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+
+from src import metrics
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "light_pollution"
+RASTER_PATH = DATA_DIR / "sky_brightness.bin"
+NATURAL_SKY_MCD = 0.171168  # natural background (mcd/m^2) used by the World Atlas
+
+
+def _config():
+    try:
+        import config
+        return config
+    except ImportError:
+        return None
+
+
+def meta_path(path: Path) -> Path:
+    return Path(path).with_suffix(".json")
+
+
+class SkyRaster:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        meta = json.loads(meta_path(self.path).read_text(encoding="utf-8"))
+        self.west, self.north, self.res = float(meta["west"]), float(meta["north"]), float(meta["res_deg"])
+        self.width, self.height = int(meta["width"]), int(meta["height"])
+        self.nodata = meta.get("nodata")
+        self.grid = np.memmap(self.path, dtype=np.dtype(meta.get("dtype", "float32")), mode="r",
+                              shape=(self.height, self.width))
+
+    def _cells(self, lat, lon) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        row = np.floor((self.north - np.asarray(lat, dtype=float)) / self.res).astype(np.intp)
+        col = np.floor((np.asarray(lon, dtype=float) - self.west) / self.res).astype(np.intp)
+        inside = (row >= 0) & (row < self.height) & (col >= 0) & (col < self.width)
+        return np.where(inside, row, 0), np.where(inside, col, 0), inside
+
+    def sample_many(self, lats, lons) -> np.ndarray:
+        """sky brightness per point; NaN outside the raster or on nodata cells"""
+        row, col, inside = self._cells(lats, lons)
+        values = np.asarray(self.grid[row, col], dtype=float)
+        if self.nodata is not None:
+            inside &= values != self.nodata
+        return np.where(inside, values, np.nan)
+
+    def sample(self, lat: float, lon: float) -> Optional[float]:
+        value = float(self.sample_many([lat], [lon])[0])
+        return None if math.isnan(value) else value
+
+
+_raster: Optional[SkyRaster] = None
+_raster_path: Optional[Path] = None
+
+
+def get_raster() -> Optional[SkyRaster]:
+    """the configured raster, opened once; None when no raster file exists"""
+    global _raster, _raster_path
+    path = Path(getattr(_config(), "LIGHT_POLLUTION_RASTER", None) or RASTER_PATH)
+    if path != _raster_path:
+        _raster_path = path
+        _raster = SkyRaster(path) if path.exists() and meta_path(path).exists() else None
+        _cached_brightness.cache_clear()
+    return _raster
+
+
+@lru_cache(maxsize=65536)
+def _cached_brightness(lat: float, lon: float) -> Optional[float]:
+    raster = _raster
+    return raster.sample(lat, lon) if raster is not None else None
+
+
+def site_brightness(lat: float, lon: float) -> Optional[float]:
+    """cached per site; None without a raster or outside it"""
+    if get_raster() is None:
+        return None
+    hits = _cached_brightness.cache_info().hits
+    value = _cached_brightness(round(lat, 4), round(lon, 4))
+    metrics.cache("sky_brightness", _cached_brightness.cache_info().hits > hits)
+    return value
+
+
+def write_raster(path: Path, grid: np.ndarray, west: float, north: float, res_deg: float, nodata: Optional[float] = -1.0) -> Path:
+    """write a grid (row 0 = northern edge) and its sidecar"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    grid = np.ascontiguousarray(grid, dtype=np.float32)
+    grid.tofile(path)
+    meta = {"west": west, "north": north, "res_deg": res_deg, "width": grid.shape[1],
+            "height": grid.shape[0], "dtype": "float32", "nodata": nodata}
+    meta_path(path).write_text(json.dumps(meta), encoding="utf-8")
+    return path
+
+
+def mcd_to_sqm(artificial_mcd: np.ndarray) -> np.ndarray:
+    """World Atlas artificial brightness (mcd/m^2) -> total sky brightness (mag/arcsec^2)"""
+    return -2.5 * np.log10((np.asarray(artificial_mcd, dtype=float) + NATURAL_SKY_MCD) / 108_000_000)
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Build the memory-mapped sky brightness raster from a GeoTIFF")
+    parser.add_argument("--geotiff", type=Path, required=True)
+    parser.add_argument("--bbox", required=True, help="south,west,north,east in degrees")
+    parser.add_argument("--units", choices=("sqm", "mcd"), default="sqm", help="GeoTIFF values: SQM or artificial mcd/m^2")
+    parser.add_argument("--out", type=Path, default=RASTER_PATH)
+    args = parser.parse_args(argv)
+
+    try:
+        import rasterio
+        from rasterio.windows import from_bounds
+    except ImportError:
+        raise SystemExit("building the raster needs rasterio (pip install rasterio)")
+
+    south, west, north, east = (float(x) for x in args.bbox.split(","))
+    with rasterio.open(args.geotiff) as src:
+        window = from_bounds(west, south, east, north, src.transform).round_offsets().round_lengths()
+        data = src.read(1, window=window).astype(np.float64)
+        transform = src.window_transform(window)
+        nodata = src.nodata
+    grid = mcd_to_sqm(data) if args.units == "mcd" else data
+    if nodata is not None:
+        grid = np.where(data == nodata, -1.0, grid)
+    path = write_raster(args.out, grid, transform.c, transform.f, transform.a)
+    print(f"[light_pollution] {grid.shape[1]}x{grid.shape[0]} cells at {transform.a:.5f}deg -> {path} "
+          f"({path.stat().st_size / 1024 / 1024:.1f}MB)")
+
+
+if __name__ == "__main__":
+    main()
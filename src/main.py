@@ -1,9 +1,10 @@
+import argparse
 import logging
 import sys
 from datetime import datetime, timedelta, time
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from zoneinfo import ZoneInfo
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
 
 # --- import path setup (keep identical) ---
 ROOT = Path(__file__).resolve().parents[1]
@@ -12,11 +13,29 @@ if str(ROOT) not in sys.path:
 
 # --- local imports (identical) ---
 import config  # noqa: E402
+from src import calibration  # noqa: E402
+from src import leaderboard  # noqa: E402
+from src import light_pollution  # noqa: E402
+from src import message_builder  # noqa: E402
+from src import metrics  # noqa: E402
+from src import profiling  # noqa: E402
 from src import pushover_utils as notifs  # noqa: E402
+from src import transport  # noqa: E402
 from src import utils  # noqa: E402
-from src.data_store import append_forecast_history, monday_notified_this_week  # noqa: E402
+from src import zones  # noqa: E402
+from src.data_store import (  # noqa: E402
+    HistoryWriter,
+    append_forecast_history,
+    compact_history,
+    monday_notified_this_week,
+    window_snapshot,
+)
+from src.forecast_diff import DEFAULT_SCORE_DELTA, build_delta_message, diff_nights  # noqa: E402
+from src.forecast_store import ForecastStore, get_store  # noqa: E402
 from src.message_builder import generate_notification_message  # noqa: E402
-from src.provider_vc import fetch_visualcrossing  # noqa: E402
+from src.provider_vc import MAX_FORECAST_DAYS  # noqa: E402
+from src.providers import get_provider  # noqa: E402
+from src.run_journal import JournalBusy, RunJournal, open_journal  # noqa: E402
 
 # --- logging configuration (unchanged: still writes to output.log) ---
 logging.basicConfig(
@@ -26,7 +45,7 @@ logging.basicConfig(
 )
 
 # --- constants / simple config ---
-ADEL_TZ = ZoneInfo("Australia/Adelaide")
+ADEL_TZ = zones.zone(zones.DEFAULT_TZ)
 WEEKEND_TARGETS = (4, 5, 6)  # 4=Fri, 5=Sat, 6=Sun
 
 # notification windows: Monday outlook + Wednesday follow-up (if Monday sent)
@@ -36,15 +55,38 @@ PROMISE_WINDOWS: Dict[str, Dict[str, object]] = {
 }
 
 
-def build_and_score(lat: float, lon: float, days: int = 7) -> List[dict]:
-    """fetch forecast, compute features, add suitability scores"""
-    print(f"[diagnostic] build_and_score: lat={lat} lon={lon} days={days}")
-    data = fetch_visualcrossing(lat, lon, days=days)
-    logging.info("Fetched data for lat=%.4f lon=%.4f days=%d", lat, lon, days)
-
-    processed = utils.process_weather_data(data)
-    scored = utils.add_suitability_scores(processed)
-
+def build_and_score(lat: float, lon: float, days: int = 7, provider=None, resolution_minutes: int = 60,
+                    tz: Optional[str] = None) -> List[dict]:
+    """
+    fetch forecast (from any provider), compute features, add suitability scores.
+    days is the horizon (1..15, else ValueError); resolution_minutes < 60 uses sub-hourly samples.
+    tz is the site's zone (default: the payload's own, else Adelaide).
+    """
+    if not 1 <= days <= MAX_FORECAST_DAYS:
+        raise ValueError(f"days must be 1..{MAX_FORECAST_DAYS}, got {days}")
+    provider = provider or get_provider()
+    print(f"[diagnostic] build_and_score: lat={lat} lon={lon} days={days} resolution={resolution_minutes}m provider={provider.name}")
+    with profiling.stage("fetch"):
+        t0 = perf_counter()
+        data = provider.fetch(lat, lon, days=days, resolution_minutes=resolution_minutes, tz=tz)
+        metrics.FETCH_SECONDS.observe(perf_counter() - t0, provider=provider.name)
+    forecast_days = data.get("forecast", {}).get("forecastday", []) if isinstance(data, dict) else []
+    metrics.RECORDS.inc(sum(len(d.get("hour", [])) for d in forecast_days), provider=provider.name)
+    logging.info("Fetched data for lat=%.4f lon=%.4f days=%d provider=%s", lat, lon, days, provider.name)
+
+    with profiling.stage("process"):
+        processed = utils.process_weather_data(data)
+        # site darkness from the memory-mapped raster (None when no raster covers the site)
+        sky = light_pollution.site_brightness(lat, lon)
+        if isinstance(processed, list):
+            for night in processed:
+                night["sky_brightness"] = sky
+    with profiling.stage("score"):
+        scored = utils.add_suitability_scores(processed)
+        # interval from historical error at each night's lead time
+        calibration.attach_confidence(scored)
+
+    metrics.NIGHTS_SCORED.inc(len(scored))
     print(f"[diagnostic] build_and_score: scored_count={len(scored)}")
     return scored
 
@@ -66,6 +108,11 @@ def _list_valid_windows() -> str:
     return "; ".join(items)
 
 
+def _window_pending(now: datetime) -> bool:
+    """True if a promise window opens later today at 'now'"""
+    return any(now.weekday() == rule["weekday"] and now.time() < rule["start"] for rule in PROMISE_WINDOWS.values())
+
+
 def current_promise_window(now: datetime) -> Optional[Tuple[str, Dict[str, object]]]:
     """return (label, window) if a promise window is active at 'now'"""
     print(f"[diagnostic] current_promise_window: now={now.isoformat()}")
@@ -173,15 +220,36 @@ def select_promising_nights(scored_days: List[dict], reference: datetime, rule:
 
 
 def build_promise_message(city: str, rule_label: str, nights: List[dict]) -> str:
-    """Compact format: 'Adelaide weekend outlook — Fri:91 · Sat:87 · Sun:12'"""
+    """Compact format: 'Adelaide weekend outlook — Fri:91 · Sat:87 · Sun:12' (leaderboard: 'Clare Sat:91')"""
     _abbrev = {4: "Fri", 5: "Sat", 6: "Sun"}
     parts: List[str] = []
     for night in nights:
         label = _abbrev.get(night["date"].weekday(), night["date"].strftime("%a"))
-        parts.append(f"{label}:{night['score']:.0f}")
+        site = f"{night['site']} " if night.get("site") else ""
+        parts.append(f"{site}{label}:{night['score']:.0f}")
     return f"{city} {rule_label} — {' · '.join(parts)}"
 
 
+def monday_snapshot(city: str, now: datetime) -> Optional[Dict[str, dict]]:
+    """Monday's recorded nights for this city/week (indexed lookup, no CSV scan)"""
+    return window_snapshot(city, now, "monday")
+
+
+def _score_noise(store: ForecastStore, city: str, nights: List[dict], now: datetime) -> Dict[str, float]:
+    """
+    attach each night's revision history (for the message) and return its
+    score noise for the diff, from revisions recorded before this run only
+    """
+    noise: Dict[str, float] = {}
+    for night in nights:
+        day = night["date"].isoformat()
+        night["history"] = store.night_context(city, day)
+        std = store.score_noise(city, day, before=now.isoformat())
+        if std is not None:
+            noise[day] = std
+    return noise
+
+
 def notify_weekend_promise(
     scored_days: List[dict],
     city: str,
@@ -189,9 +257,15 @@ def notify_weekend_promise(
     user_key: str,
     now: datetime,
     window: Optional[Tuple[str, Dict[str, object]]] = None,
+    send=None,
+    generate=None,
+    store: Optional[ForecastStore] = None,
 ) -> int:
     """
     send a push if an active window exists and qualifying nights are found.
+    `send` / `generate` override the push sink and message generator
+    (defaults: pushover + generate_notification_message); `store` supplies
+    each night's revision history (default: the process-wide forecast store).
     prints explicit diagnostics for:
       - running outside a valid window
       - each considered date (eligible vs not_notified)
@@ -225,10 +299,29 @@ def notify_weekend_promise(
 
     print(f"[diagnostic] notify_weekend_promise: nights_selected={len(nights)}")
     threshold = getattr(config, "NOTIFY_THRESHOLD", 60.0)
-    message = generate_notification_message(city, rule["label"], nights, threshold=threshold)
+
+    # revision history per night: stability/trend for the message, score noise for the diff
+    store = store if store is not None else get_store()
+    noise = _score_noise(store, city, nights, now)
+
+    # Wednesday: only follow up when the weekend materially changed since Monday
+    previous = monday_snapshot(city, now) if label == "wednesday" else None
+    if previous is not None:
+        diff = diff_nights(nights, previous, threshold, getattr(config, "DIFF_SCORE_DELTA", DEFAULT_SCORE_DELTA), noise)
+        for c in diff["changes"]:
+            print(f"[diagnostic] notify_weekend_promise: diff {c['date']} before={c['before']} after={c['after']:.1f} material={c['material']}")
+        if not diff["material"]:
+            logging.info("Wednesday suppressed for %s: no material change since Monday", city)
+            print("[diagnostic] notify_weekend_promise: no material change since monday (nothing sent)")
+            return 0
+        message = build_delta_message(city, rule["label"], diff, threshold)
+    else:
+        with profiling.stage("message"):
+            message = (generate or generate_notification_message)(city, rule["label"], nights, threshold=threshold)
     print(f"[diagnostic] notify_weekend_promise: sending message='{message}'")
 
-    notifs.send_push_notification(user_key, message, user_name=user_name)
+    with profiling.stage("push"):
+        (send or notifs.send_push_notification)(user_key, message, user_name=user_name)
     logging.info("Sent %s notification to %s: %s", label, user_name, message)
 
     # print exactly which dates were notified (eligible list)
@@ -243,23 +336,308 @@ def notify_weekend_promise(
     return len(nights)
 
 
-def main():
-    """main orchestration: detect window, process each user/city, record+notify"""
-    now = get_adelaide_now()
-    print(f"[diagnostic] main: start run_time={now.isoformat()}")
+def notify_leaderboard(
+    scored_by_city: Dict[str, List[dict]],
+    cities: List[str],
+    user_name: str,
+    user_key: str,
+    now: datetime,
+    window: Optional[Tuple[str, Dict[str, object]]] = None,
+    send=None,
+    generate=None,
+    store: Optional[ForecastStore] = None,
+) -> int:
+    """
+    one notification ranking every site's weekend nights together (users
+    with several sites). each site passes the same gates as
+    notify_weekend_promise (Wednesday: Monday sent, material change); the
+    best LEADERBOARD_SIZE (site, night) pairs go out in a single message.
+    the Wednesday message is a delta unless a ranked site has no Monday
+    snapshot, in which case the full leaderboard is sent instead.
+    """
+    active = window or current_promise_window(now)
+    if not active:
+        logging.info("No promise window active at %s", now)
+        return 0
+    label, rule = active
+    threshold = getattr(config, "NOTIFY_THRESHOLD", 60.0)
+    store = store if store is not None else get_store()
 
-    window = current_promise_window(now)
-    window_label = window[0] if window else None
-    print(f"[diagnostic] main: window_label={window_label}")
+    candidates: List[Tuple[str, dict]] = []
+    unbased = set()  # sites with no Monday baseline to diff against
+    for city in cities:
+        if label == "wednesday" and not monday_notified_this_week(city, now):
+            print(f"[diagnostic] leaderboard: {city} skipped — no monday notification this week")
+            continue
+        nights, _ = select_promising_nights(scored_by_city[city], now, rule)
+        noise = _score_noise(store, city, nights, now)
+        previous = monday_snapshot(city, now) if label == "wednesday" else None
+        if previous is None:
+            unbased.add(city)
+        else:
+            diff = diff_nights(nights, previous, threshold, getattr(config, "DIFF_SCORE_DELTA", DEFAULT_SCORE_DELTA), noise)
+            if not diff["material"]:
+                print(f"[diagnostic] leaderboard: {city} no material change since monday")
+                continue
+            before = {c["date"]: c["before"] for c in diff["changes"]}
+            for night in nights:
+                night["before"] = before.get(night["date"])
+        candidates.extend((city, night) for night in nights)
+
+    ranked = leaderboard.top_nights(candidates, leaderboard.size())
+    print(f"[diagnostic] leaderboard: user={user_name} sites={len(cities)} candidates={len(candidates)} ranked={len(ranked)}")
+    if not ranked:
+        logging.info("No leaderboard nights for %s in %s window", user_name, label)
+        return 0
 
-    for name, user_key in config.USERS.items():
-        for city, coords in config.LOCATIONS.items():
-            lat, lon = [float(x) for x in coords.split(",")]
-            print(f"[diagnostic] main: processing user={name} city={city} lat={lat} lon={lon}")
+    if not any(night["site"] in unbased for night in ranked):
+        message = leaderboard.build_delta_message(rule["label"], ranked, threshold)
+    else:
+        with profiling.stage("message"):
+            message = (generate or generate_notification_message)(leaderboard.TITLE, rule["label"], ranked, threshold=threshold)
+    print(f"[diagnostic] leaderboard: sending message='{message}'")
+    with profiling.stage("push"):
+        (send or notifs.send_push_notification)(user_key, message, user_name=user_name)
+    logging.info("Sent %s leaderboard to %s: %s", label, user_name, message)
+    for night in ranked:
+        print(f"[diagnostic] notified for {night['site']} {night['date']}: score={night['score']:.1f}")
+    return len(ranked)
+
+
+def run_pipeline(
+    now: datetime,
+    users: Dict[str, str],
+    locations: Dict[str, str],
+    provider=None,
+    history: Optional[HistoryWriter] = None,
+    send=None,
+    generate=None,
+    subscriptions: Optional[Dict[str, List[str]]] = None,
+    store: Optional[ForecastStore] = None,
+    journal: Optional[RunJournal] = None,
+    only_zones: Optional[List[str]] = None,
+    journal_for: Optional[Callable[[str, datetime, str], Optional[RunJournal]]] = None,
+) -> Dict[str, int]:
+    """
+    per time zone: detect that zone's window in local time and, only while
+    it is open, fetch+score each subscribed location once, record it, then
+    run the promise flow once per user (a single site directly, several
+    sites as one leaderboard ranked across all their zones, sent once
+    every zone of theirs whose window opens today is open). one process
+    serves every zone: run it every half hour through the evening and
+    each zone is handled once its own window opens. `subscriptions` maps
+    user -> location names (default: every user gets every location);
+    `only_zones` limits the run to those zones (default: all). with a
+    `journal` (or `journal_for(tz, local_now, label)` opening one per zone;
+    None skips a zone held by another process), stages it already records
+    as done are reused or skipped.
+    """
+    store = store if store is not None else get_store()
+
+    def cities_of(name: str):
+        return subscriptions.get(name, ()) if subscriptions is not None else locations
+
+    batches = zones.batch_by_zone((c for name in users for c in cities_of(name)), locations)
+    if only_zones is not None:
+        skipped = [tz for tz in batches if tz not in only_zones]
+        if skipped:
+            logging.warning("Zones not covered by this run (--zone %s): %s", ",".join(only_zones), ", ".join(skipped))
+        batches = {tz: cities for tz, cities in batches.items() if tz in only_zones}
+
+    scored_by_city: Dict[str, List[dict]] = {}
+    counts = {"locations": 0, "pairs": 0, "nights_notified": 0}
+    pending = set()  # zones whose window opens later today
+    runs: Dict[str, tuple] = {}  # tz -> (local_now, window, journal, send, generate) for zones run now
+    for tz, batch in batches.items():
+        # one conversion per zone: windows, weekend dates and run timestamps are site-local
+        local_now = now.astimezone(zones.zone(tz))
+        window = current_promise_window(local_now)
+        window_label = window[0] if window else None
+        print(f"[diagnostic] main: zone={tz} locations={len(batch)} local_time={local_now.isoformat()} window_label={window_label}")
+        if window is None:
+            if _window_pending(local_now):
+                pending.add(tz)
+            print(f"[diagnostic] main: zone={tz} window not open — skipped")
+            continue
 
-            scored = build_and_score(lat, lon, days=7)
-            append_forecast_history(city, now.isoformat(), scored, window_label)
-            notify_weekend_promise(scored, city, name, user_key, now, window)
+        zone_journal = journal
+        if journal_for is not None:
+            zone_journal = journal_for(tz, local_now, window_label)
+            if zone_journal is None:
+                continue
+            local_now = zone_journal.now.astimezone(zones.zone(tz))
+        zone_provider, zone_send, zone_generate = provider, send, generate
+        if zone_journal is not None:
+            zone_provider = zone_journal.provider(provider or get_provider())
+            zone_generate = generate or generate_notification_message
+            zone_send = send or notifs.send_push_notification
+        runs[tz] = (local_now, window, zone_journal, zone_send, zone_generate)
+
+        for city in batch:
+            lat, lon, _ = zones.parse_location(city, locations[city])
+            print(f"[diagnostic] main: processing city={city} lat={lat} lon={lon}")
+            scored = zone_journal.scored(city) if zone_journal is not None else None
+            if scored is None:
+                scored = build_and_score(lat, lon, days=7, provider=zone_provider, tz=tz)
+                if zone_journal is not None:
+                    zone_journal.record_scored(city, scored)
+            scored_by_city[city] = scored
+            counts["locations"] += 1
+            store.add(city, local_now.isoformat(), scored)
+            if history is not None and not (zone_journal is not None and zone_journal.is_done("history", city)):
+                with profiling.stage("history"):
+                    history.add(city, local_now.isoformat(), scored, window_label)
+
+    # one notification per user across all their sites, whatever their zones
+    for name, user_key in users.items():
+        subscribed = [city for city in dict.fromkeys(cities_of(name)) if city in locations]
+        user_zones = {zones.parse_location(city, locations[city])[2] for city in subscribed}
+        mine = [city for city in subscribed if city in scored_by_city]
+        counts["pairs"] += len(mine)
+        if not mine:
+            continue
+        waiting = user_zones & pending
+        if waiting:
+            print(f"[diagnostic] main: user={name} waits for {', '.join(sorted(waiting))} to open")
+            continue
+        # sent from the zone that opens last and so closes last: a rerun there dedupes the push
+        anchor = min(user_zones & set(runs), key=lambda tz: (runs[tz][0].utcoffset(), tz))
+        local_now, window, zone_journal, zone_send, zone_generate = runs[anchor]
+        # several sites: one ranked notification instead of one per site
+        key = subscribed[0] if len(subscribed) == 1 else leaderboard.TITLE
+        hooks = {
+            "send": zone_journal.send(key, name, zone_send) if zone_journal is not None else zone_send,
+            "generate": zone_journal.generate(key, name, zone_generate) if zone_journal is not None else zone_generate,
+            "store": store,
+        }
+        if len(subscribed) == 1:
+            notified = notify_weekend_promise(scored_by_city[key], key, name, user_key, local_now, window, **hooks)
+        else:
+            notified = notify_leaderboard(scored_by_city, mine, name, user_key, local_now, window, **hooks)
+        counts["nights_notified"] += notified
+    return counts
+
+
+def _offline_message(city: str, rule_label: str, nights: List[dict], threshold: float = 60.0) -> str:
+    return build_promise_message(city, rule_label, nights)
+
+
+def _offline_send(user_key: str, message: str, user_name: str = "user") -> None:
+    print(f"[diagnostic] offline: push to {user_name} suppressed: {message}")
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Star Signal run")
+    parser.add_argument("--profile", nargs="?", const="profile", default=None, metavar="DIR",
+                        help="profile each stage; write .prof/.txt stats and stacks.collapsed to DIR")
+    parser.add_argument("--top", type=int, default=15, help="hotspots to print with --profile")
+    parser.add_argument("--offline", action="store_true",
+                        help="use src/data/test.json; no AI call, no push, no history writes")
+    parser.add_argument("--now", type=datetime.fromisoformat, default=None,
+                        help="override the run time (ISO; naive times are Adelaide local)")
+    parser.add_argument("--zone", default=None, metavar="TZ",
+                        help="run only the locations in this time zone (default: every zone whose window is open)")
+    parser.add_argument("--nowcast", action="store_true",
+                        help="evening-of refresh of tonight's window; push go/no-go only if the score crossed the threshold")
+    parser.add_argument("--fresh", action="store_true",
+                        help="discard this window's run journal instead of resuming it")
+    parser.add_argument("--shadow", default=None, metavar="USERSxLOCATIONS",
+                        help="shadow run for a simulated fleet, e.g. 2000x300; nothing is sent or written")
+    parser.add_argument("--shadow-provider", default="synthetic", help="provider for --shadow (synthetic|replay|offline)")
+    parser.add_argument("--shadow-subscriptions", type=int, default=3, help="locations per simulated user")
+    parser.add_argument("--shadow-ai-latency-ms", type=float, default=0.0,
+                        help="simulated message-generation latency per call")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """main orchestration: detect window, process each user/city, record+notify"""
+    args = parse_args(argv)
+    now = args.now or get_adelaide_now()
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=ADEL_TZ)
+    print(f"[diagnostic] main: start run_time={now.isoformat()} offline={args.offline} profile={args.profile}")
+
+    if args.shadow:
+        from src import shadow
+        n_users, n_locations = (int(x) for x in args.shadow.lower().split("x"))
+        shadow.run_shadow(
+            now, n_users, n_locations,
+            provider=args.shadow_provider,
+            subscriptions_per_user=args.shadow_subscriptions,
+            ai_latency_ms=args.shadow_ai_latency_ms,
+        )
+        return
+
+    provider = get_provider("offline") if args.offline else None
+    send = _offline_send if args.offline else None
+    generate = _offline_message if args.offline else None
+
+    # live promise runs are journaled per zone: a rerun in the same window resumes it
+    journals: Dict[str, RunJournal] = {}
+    journal_for = None
+    if not (args.offline or args.nowcast):
+        def journal_for(tz: str, local_now: datetime, label: str) -> Optional[RunJournal]:
+            # the default zone keeps the unscoped journal
+            scope = None if tz == zones.default_tz() else tz
+            try:
+                journals[tz] = open_journal(local_now, label, fresh=args.fresh, scope=scope)
+            except JournalBusy as exc:
+                print(f"[diagnostic] main: {exc} — zone {tz} skipped")
+                return None
+            return journals[tz]
+
+    def history_written(locations: List[str]) -> None:
+        for tz, zone_journal in journals.items():
+            zone_journal.history_written([c for c in locations if zones.parse_location(c, config.LOCATIONS[c])[2] == tz])
+
+    only_zones = [args.zone] if args.zone else None
+    out_dir = Path(args.profile) / now.strftime("%Y%m%dT%H%M%S") if args.profile else None
+    with profiling.StageProfiler(out_dir, profile=bool(args.profile)) as profiler:
+        with profiling.stage("main"):
+            # one locked, fsynced history write for the whole run
+            with HistoryWriter(on_flush=history_written if journal_for else None) as history:
+                if args.nowcast:
+                    from src import nowcast
+                    nowcast.run_nowcast(
+                        now, config.USERS, config.LOCATIONS,
+                        fetch=(lambda lat, lon, start, end, tz=None: provider.fetch(lat, lon, days=2, tz=tz)) if args.offline else None,
+                        history=None if args.offline else history,
+                        send=send,
+                        only_zones=only_zones,
+                    )
+                else:
+                    run_pipeline(
+                        now, config.USERS, config.LOCATIONS,
+                        provider=provider,
+                        history=None if args.offline else history,
+                        send=send,
+                        generate=generate,
+                        only_zones=only_zones,
+                        journal_for=journal_for,
+                    )
+                    if not args.offline:
+                        print(f"[diagnostic] main: messages {message_builder.get_budget().summary()}")
+                        transport.report()
+                with profiling.stage("history"):
+                    history.flush()
+                    if not args.offline:
+                        # fold the rows just written into the per-lead error stats
+                        calibration.update(now.date())
+                        # roll runs older than the hot window into monthly archives
+                        compact_history(now)
+
+    for zone_journal in journals.values():
+        zone_journal.close()
+    if not args.offline:
+        # textfile-collector export: counters accumulate across runs, gauges describe this one
+        mode = "nowcast" if args.nowcast else "promise"
+        metrics.observe_stages(profiler.durations)
+        metrics.RUN_SECONDS.set(sum(profiler.durations.get("main", ())), mode=mode)
+        metrics.LAST_RUN.set(datetime.now().timestamp(), mode=mode)
+        metrics.write_textfile()
+    if args.profile:
+        profiler.write(top=args.top)
 
 
 if __name__ == "__main__":
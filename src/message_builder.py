@@ -2,23 +2,173 @@
 AI-powered push notification message generator.
 Calls Claude to produce a single natural-language sentence summarising
 the weekend's astrophotography outlook for Adelaide.
+
+The instructions live in one short static system prompt; each call only
+sends the threshold and one short line per night. The prompt is marked
+for prompt caching only when it is long enough for the model to cache it
+(MESSAGE_CACHE_MIN_TOKENS, estimated from its length). The built-in prompt
+is a few hundred tokens, well below that, so it is sent uncached: runs are
+days apart and the cache lives for minutes, so padding it to qualify would
+pay a cache write on nearly every call. Every call's tokens, latency and
+estimated cost are recorded in a MessageBudget, which decides per message whether to call
+the model or use the compact template (when the run's cost budget is spent
+or recent calls are slower than the latency budget). Latency is averaged
+over the calls among the last few messages, so templated messages age slow
+calls out and the model is tried again.
+
+Config (all optional):
+  MESSAGE_MODEL              model id (default claude-opus-4-8)
+  MESSAGE_MAX_TOKENS         output cap (default 96; messages are < 220 chars)
+  MESSAGE_TIMEOUT_S          per-call timeout (default 15)
+  MESSAGE_LATENCY_BUDGET_MS  template once recent calls average above this (default 8000)
+  MESSAGE_COST_BUDGET_USD    AI spend per run before falling back (default 0.50)
+  MESSAGE_PRICE_PER_MTOK     {"input", "output", "cache_write", "cache_read"} USD per million tokens
+  MESSAGE_CACHE_MIN_TOKENS   mark the system prompt for caching once it is about this long (default 4096)
 """
 from __future__ import annotations
 
+import time
 import anthropic
-from typing import List
+from typing import Dict, List, Optional
+
+from src import metrics
+from src import transport
+
+DEFAULT_MODEL = "claude-opus-4-8"
+DEFAULT_MAX_TOKENS = 96
+DEFAULT_TIMEOUT_S = 15.0
+DEFAULT_LATENCY_BUDGET_MS = 8000.0
+DEFAULT_COST_BUDGET_USD = 0.50
+DEFAULT_PRICE_PER_MTOK = {"input": 5.0, "output": 25.0, "cache_write": 6.25, "cache_read": 0.50}
+_LATENCY_WINDOW = 5  # AI calls among the last N messages are averaged against the latency budget
+DEFAULT_CACHE_MIN_TOKENS = 4096  # shortest prefix the default model will cache
+_CHARS_PER_TOKEN = 4  # rough English estimate, used only for the caching gate
+
+SYSTEM_PROMPT = """\
+You write push notifications for an astrophotographer, in the voice of a knowledgeable friend texting a quick heads-up.
+
+Each request gives the good-night threshold and one line per weekend night: score, whether it is GOOD, the likely score range, cloud, moon, wind, and sometimes how the forecast has moved across runs. When the nights come from several sites, each line starts with its site: they are the best few across all the user's sites, best first, so name the site along with the day.
+
+Structure the notification so it's almost entirely about the best night: name the day, its score, and one or two specific conditions worth noting (e.g. no moon, low wind, clear skies, cold/hot, holding steady all week). Then close with one short remark that acknowledges the other two options (nights) together — just enough to say whether either is a real backup worth considering or whether they're both not worth bothering with. That closing remark should be brief, roughly a quarter of the message at most, not a separate breakdown of each night.
+
+If no night clears the threshold, say so plainly and skip the "best night" framing — just tell them to skip the weekend, with maybe a one-line reason why.
+
+Hard rules:
+- No opener like "Adelaide:", "This weekend:", "Here's the outlook" — start directly with the substance.
+- Write like a person, not a report. Avoid mechanical listing.
+- Construct the response without using full stops to make the notification flow fluently.
+- Total output under 220 characters."""
 
 _client: anthropic.Anthropic | None = None
+_clock = time.perf_counter
+_budget: Optional["MessageBudget"] = None
+
+
+def _config():
+    import config
+    return config
 
 
 def _get_client() -> anthropic.Anthropic:
     global _client
     if _client is None:
-        import config
-        _client = anthropic.Anthropic(api_key=config.ANTHROPIC_API_KEY)
+        # pooled httpx client with the shared timeout/retry policy and per-host metrics
+        _client = anthropic.Anthropic(
+            api_key=_config().ANTHROPIC_API_KEY,
+            max_retries=transport.retries(),
+            http_client=anthropic.DefaultHttpxClient(
+                timeout=transport.timeout(),
+                event_hooks=transport.httpx_event_hooks(),
+            ),
+        )
     return _client
 
 
+class MessageBudget:
+    """per-call token/latency accounting and the AI-vs-template decision"""
+
+    def __init__(
+        self,
+        latency_budget_ms: Optional[float] = None,
+        cost_budget_usd: Optional[float] = None,
+        prices: Optional[Dict[str, float]] = None,
+    ):
+        cfg = _config()
+        self.latency_budget_ms = float(latency_budget_ms if latency_budget_ms is not None
+                                       else getattr(cfg, "MESSAGE_LATENCY_BUDGET_MS", DEFAULT_LATENCY_BUDGET_MS))
+        self.cost_budget_usd = float(cost_budget_usd if cost_budget_usd is not None
+                                     else getattr(cfg, "MESSAGE_COST_BUDGET_USD", DEFAULT_COST_BUDGET_USD))
+        self.prices = dict(DEFAULT_PRICE_PER_MTOK, **(prices or getattr(cfg, "MESSAGE_PRICE_PER_MTOK", {}) or {}))
+        self.calls: List[dict] = []
+        self.templates = 0
+        self.messages = 0  # AI calls and templates, in order
+
+    @property
+    def spent_usd(self) -> float:
+        return sum(c["cost_usd"] for c in self.calls)
+
+    def recent_latency_ms(self) -> float:
+        recent = [c["latency_ms"] for c in self.calls[-_LATENCY_WINDOW:] if c["message"] > self.messages - _LATENCY_WINDOW]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def expected_cost_usd(self) -> float:
+        recent = [c["cost_usd"] for c in self.calls[-_LATENCY_WINDOW:]]
+        return sum(recent) / len(recent) if recent else 0.0
+
+    def allow_ai(self) -> Optional[str]:
+        """None when an AI call fits the budget, otherwise the reason it doesn't"""
+        if self.spent_usd + self.expected_cost_usd() > self.cost_budget_usd:
+            return f"cost budget spent (${self.spent_usd:.4f} of ${self.cost_budget_usd:.2f})"
+        if self.recent_latency_ms() > self.latency_budget_ms:
+            return f"recent latency {self.recent_latency_ms():.0f}ms > {self.latency_budget_ms:.0f}ms"
+        return None
+
+    def record(self, usage, latency_ms: float, chars: int, cached: bool = False) -> dict:
+        tokens = {
+            "input": int(getattr(usage, "input_tokens", 0) or 0),
+            "output": int(getattr(usage, "output_tokens", 0) or 0),
+            "cache_write": int(getattr(usage, "cache_creation_input_tokens", 0) or 0),
+            "cache_read": int(getattr(usage, "cache_read_input_tokens", 0) or 0),
+        }
+        cost = sum(tokens[k] * self.prices[k] for k in tokens) / 1_000_000
+        self.messages += 1
+        call = dict(tokens, latency_ms=latency_ms, cost_usd=cost, chars=chars, message=self.messages)
+        self.calls.append(call)
+        for kind, count in tokens.items():
+            metrics.MESSAGE_TOKENS.inc(count, type=kind)
+        if cached:  # only calls that asked for the prompt cache count as hits or misses
+            metrics.cache("prompt", tokens["cache_read"] > 0)
+        print(f"[message_builder] tokens in={tokens['input']} out={tokens['output']} "
+              f"cache_write={tokens['cache_write']} cache_read={tokens['cache_read']} "
+              f"latency={latency_ms:.0f}ms cost=${cost:.5f}")
+        return call
+
+    def template(self) -> None:
+        """count a message that used the compact template instead of the model"""
+        self.templates += 1
+        self.messages += 1
+        metrics.MESSAGES.inc(kind="fallback")
+
+    def summary(self) -> dict:
+        return {
+            "ai_calls": len(self.calls),
+            "templates": self.templates,
+            "input_tokens": sum(c["input"] for c in self.calls),
+            "output_tokens": sum(c["output"] for c in self.calls),
+            "cache_read_tokens": sum(c["cache_read"] for c in self.calls),
+            "cost_usd": self.spent_usd,
+            "mean_latency_ms": sum(c["latency_ms"] for c in self.calls) / len(self.calls) if self.calls else 0.0,
+        }
+
+
+def get_budget() -> MessageBudget:
+    """process-wide budget (one per run)"""
+    global _budget
+    if _budget is None:
+        _budget = MessageBudget()
+    return _budget
+
+
 def generate_notification_message(
     city: str,
     rule_label: str,
@@ -27,14 +177,22 @@ def generate_notification_message(
 ) -> str:
     """
     Generate a natural-language push notification summary using Claude.
-    Falls back to the compact format if the API call fails.
+    Falls back to the compact format if the API call fails or the
+    latency/cost budget says not to call it.
 
     `nights` is the list of all 3 weekend nights (date, score, avg_cloud, raw).
     """
+    budget = get_budget()
+    reason = budget.allow_ai()
+    if reason:
+        print(f"[message_builder] {reason}. Using fallback.")
+        budget.template()
+        return _fallback_message(city, rule_label, nights)
     try:
-        return _ai_message(city, rule_label, nights, threshold)
+        return _ai_message(city, rule_label, nights, threshold, budget)
     except Exception as exc:
         print(f"[message_builder] AI generation failed: {exc}. Using fallback.")
+        budget.template()
         return _fallback_message(city, rule_label, nights)
 
 
@@ -51,46 +209,61 @@ def _night_summary(night: dict, threshold: float) -> str:
     moon_illum = float(raw.get("moon_illumination", 0.0))
     wind = float(raw.get("wind_speed_kph", 0.0))
     tag = "GOOD" if score >= threshold else "poor"
-    return (
-        f"  {date.strftime('%A')}: score={score:.0f} ({tag}), "
-        f"cloud={cloud:.0f}%, "
-        f"moon visible={moon_pres:.0f}% at {moon_illum:.0f}% full, "
-        f"wind={wind:.0f}kph"
+    likely = ""
+    if raw.get("score_high", score) - raw.get("score_low", score) >= 1:
+        likely = f" likely {raw['score_low']:.0f}-{raw['score_high']:.0f}"
+    site = f"{night['site']} " if night.get("site") else ""
+    line = (
+        f"{site}{date.strftime('%a')} {score:.0f} {tag}{likely}, "
+        f"cloud {cloud:.0f}%, moon up {moon_pres:.0f}% at {moon_illum:.0f}% full, wind {wind:.0f}kph"
     )
+    # revision history from the forecast store, when this night has been forecast before
+    history = night.get("history")
+    if history:
+        s = history["stability"]
+        line += f", {'steady' if s['spread'] < 10 else 'volatile'} over {s['revisions']} forecasts"
+        if history.get("cloud"):
+            line += f", cloud was {history['cloud']['first']:.0f}%"
+    return line
 
 
-def _ai_message(city: str, rule_label: str, nights: List[dict], threshold: float) -> str:
-    client = _get_client()
-
-    night_block = "\n".join(_night_summary(n, threshold) for n in nights)
+def _cacheable(text: str) -> bool:
+    min_tokens = int(getattr(_config(), "MESSAGE_CACHE_MIN_TOKENS", DEFAULT_CACHE_MIN_TOKENS))
+    return len(text) / _CHARS_PER_TOKEN >= min_tokens
 
-    prompt = f"""\
-You are writing a push notification for an astrophotographer, in the voice of a knowledgeable friend texting a quick heads-up.
 
-Night scores (good = score ≥ {threshold:.0f}):
-{night_block}
+def _system_block(text: str) -> dict:
+    """the system prompt, with a cache marker only when the prefix can actually be cached"""
+    block = {"type": "text", "text": text}
+    if _cacheable(text):
+        block["cache_control"] = {"type": "ephemeral"}
+    return block
 
-Structure the notification so it's almost entirely about the best night: name the day, its score, and one or two specific conditions worth noting (e.g. no moon, low wind, clear skies, cold/hot). Then close with one short remark that acknowledges the other two options (nights) together — just enough to say whether either is a real backup worth considering or whether they're both not worth bothering with. That closing remark should be brief, roughly a quarter of the message at most, not a separate breakdown of each night.
 
-If no night clears {threshold:.0f}, say so plainly and skip the "best night" framing — just tell them to skip the weekend, with maybe a one-line reason why.
+def _ai_message(city: str, rule_label: str, nights: List[dict], threshold: float, budget: MessageBudget) -> str:
+    client = _get_client()
+    cfg = _config()
 
-Hard rules:
-- No opener like "Adelaide:", "This weekend:", "Here's the outlook" — start directly with the substance.
-- Write like a person, not a report. Avoid mechanical listing.
-- Construct the response without using full stops to make the notification flow fluently.
-- Total output under 220 characters."""
+    payload = f"threshold {threshold:.0f}\n" + "\n".join(_night_summary(n, threshold) for n in nights)
 
+    system = _system_block(SYSTEM_PROMPT)
+    t0 = _clock()
     response = client.messages.create(
-        model="claude-opus-4-8",
-        max_tokens=150,
-        temperature=1.0,
-        messages=[{"role": "user", "content": prompt}],
+        model=getattr(cfg, "MESSAGE_MODEL", DEFAULT_MODEL),
+        max_tokens=int(getattr(cfg, "MESSAGE_MAX_TOKENS", DEFAULT_MAX_TOKENS)),
+        system=[system],
+        messages=[{"role": "user", "content": payload}],
+        timeout=float(getattr(cfg, "MESSAGE_TIMEOUT_S", DEFAULT_TIMEOUT_S)),
     )
+    latency_ms = (_clock() - t0) * 1000
 
     text = next((b.text for b in response.content if b.type == "text"), "").strip()
+    budget.record(getattr(response, "usage", None), latency_ms, len(text), cached="cache_control" in system)
     if not text:
+        budget.template()
         return _fallback_message(city, rule_label, nights)
 
+    metrics.MESSAGES.inc(kind="ai")
     print(f"[message_builder] AI generated: {text!r}  ({len(text)} chars)")
     return text
 
@@ -98,7 +271,7 @@ Hard rules:
 def _fallback_message(city: str, rule_label: str, nights: List[dict]) -> str:
     _abbrev = {4: "Fri", 5: "Sat", 6: "Sun"}
     parts = [
-        f"{_abbrev.get(n['date'].weekday(), n['date'].strftime('%a'))}:{n['score']:.0f}"
+        f"{n['site'] + ' ' if n.get('site') else ''}{_abbrev.get(n['date'].weekday(), n['date'].strftime('%a'))}:{n['score']:.0f}"
         for n in nights
     ]
     return f"{city} {rule_label} — {' · '.join(parts)}"
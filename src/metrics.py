@@ -0,0 +1,339 @@
+"""
+Prometheus-style run metrics.
+
+Counters, gauges and histograms are collected in-process during a run and
+rendered in the Prometheus text exposition format:
+
+  star_signal_http_requests_total{host,status}   outbound calls (transport)
+  star_signal_http_request_seconds{host}         their latency
+  star_signal_fetch_seconds{provider}            forecast fetch per site
+  star_signal_forecast_records_total{provider}   hourly/sub-hourly samples consumed
+  star_signal_cache_requests_total{cache,result} ephemeris / journal / prompt cache hits and misses
+  star_signal_stage_seconds{stage}               per-stage durations (profiling stages)
+  star_signal_nights_scored_total
+  star_signal_messages_total{kind}               ai | fallback
+  star_signal_message_tokens_total{type}         input | output | cache_read | cache_write
+  star_signal_pushes_total{outcome}              sent | failed
+  star_signal_run_seconds / star_signal_last_run_timestamp_seconds {mode}
+
+Cron runs write a node_exporter textfile-collector file at the end of each
+live run (config.METRICS_TEXTFILE, default src/data/metrics/star_signal.prom).
+Counters and histograms are carried over from the previous file, so they
+stay monotonic across runs; gauges hold the latest run of each mode. To scrape
+without node_exporter, serve the file on a local port:
+
+    python -m src.metrics --serve 9109          # http://127.0.0.1:9109/metrics
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: fall back to unlocked writes
+    fcntl = None
+
+TEXTFILE_PATH = Path(__file__).resolve().parent / "data" / "metrics" / "star_signal.prom"
+DEFAULT_PORT = 9109
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+STAGE_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0)
+
+_SAMPLE = re.compile(r"^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})?\s+(\S+)$")
+_lock = threading.Lock()
+_registry: Dict[str, "_Metric"] = {}
+
+
+def _config():
+    try:
+        import config
+        return config
+    except ImportError:
+        return None
+
+
+def _fmt(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _labels(pairs: Sequence[Tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+class _Metric(ABC):
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.values: Dict[Tuple[str, ...], object] = {}
+        with _lock:
+            _registry[name] = self
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _pairs(self, key: Tuple[str, ...]) -> List[Tuple[str, str]]:
+        return list(zip(self.labelnames, key))
+
+    @abstractmethod
+    def samples(self) -> List[Tuple[str, str, float]]:
+        """(sample name, rendered labels, value)"""
+
+    def clear(self) -> None:
+        with _lock:
+            self.values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return float(self.values.get(self._key(labels), 0.0))
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, _labels(self._pairs(k)), v) for k, v in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self.values[key] = float(value)
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        return [(self.name, _labels(self._pairs(k)), v) for k, v in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            state = self.values.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self.values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self) -> List[Tuple[str, str, float]]:
+        out = []
+        for key, (counts, total, n) in sorted(self.values.items()):
+            pairs = self._pairs(key)
+            for bound, c in zip(self.buckets, counts):
+                out.append((f"{self.name}_bucket", _labels(pairs + [("le", _fmt(bound))]), c))
+            out.append((f"{self.name}_sum", _labels(pairs), total))
+            out.append((f"{self.name}_count", _labels(pairs), n))
+        return out
+
+
+# --- instruments ------------------------------------------------------------
+
+HTTP_REQUESTS = Counter("star_signal_http_requests_total", "Outbound HTTP requests by host and status (error = transport failure)", ("host", "status"))
+HTTP_RETRIES = Counter("star_signal_http_retries_total", "Retries performed by the shared transport", ("host",))
+HTTP_SECONDS = Histogram("star_signal_http_request_seconds", "Outbound HTTP request latency including retries", ("host",))
+FETCH_SECONDS = Histogram("star_signal_fetch_seconds", "Forecast fetch latency per site", ("provider",))
+RECORDS = Counter("star_signal_forecast_records_total", "Forecast samples (hourly or sub-hourly) consumed", ("provider",))
+CACHE = Counter("star_signal_cache_requests_total", "Cache lookups by cache and result (hit or miss)", ("cache", "result"))
+STAGE_SECONDS = Histogram("star_signal_stage_seconds", "Duration of each profiling stage", ("stage",), buckets=STAGE_BUCKETS)
+NIGHTS_SCORED = Counter("star_signal_nights_scored_total", "Nights scored")
+MESSAGES = Counter("star_signal_messages_total", "Notification messages by kind (ai or fallback)", ("kind",))
+MESSAGE_TOKENS = Counter("star_signal_message_tokens_total", "Message model tokens by type", ("type",))
+PUSHES = Counter("star_signal_pushes_total", "Push notifications by outcome (sent or failed)", ("outcome",))
+RUN_SECONDS = Gauge("star_signal_run_seconds", "Wall-clock duration of the latest run", ("mode",))
+LAST_RUN = Gauge("star_signal_last_run_timestamp_seconds", "Unix time the latest run finished", ("mode",))
+
+
+def cache(name: str, hit: bool) -> None:
+    CACHE.inc(cache=name, result="hit" if hit else "miss")
+
+
+def observe_stages(durations: Dict[str, List[float]]) -> None:
+    """fold a StageProfiler's per-stage timings into star_signal_stage_seconds"""
+    for stage, values in durations.items():
+        for seconds in values:
+            STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+def reset() -> None:
+    for metric in list(_registry.values()):
+        metric.clear()
+
+
+# --- exposition ---------------------------------------------------------------
+
+def _family(sample: str) -> Optional[str]:
+    """the registered metric a sample name belongs to"""
+    metric = _registry.get(sample)
+    if metric is None:
+        base, _, suffix = sample.rpartition("_")
+        metric = _registry.get(base) if suffix in ("bucket", "sum", "count") else None
+        if metric is not None and metric.kind != "histogram":
+            metric = None
+    return metric.name if metric is not None else None
+
+
+def _previous(path: Path) -> Dict[str, Dict[Tuple[str, str], float]]:
+    """samples from an earlier textfile: family -> (sample, labels) -> value"""
+    out: Dict[str, Dict[Tuple[str, str], float]] = {}
+    try:
+        lines = path.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return out
+    for line in lines:
+        match = _SAMPLE.match(line)
+        family = _family(match.group(1)) if match else None
+        if family is None:
+            continue
+        try:
+            out.setdefault(family, {})[(match.group(1), match.group(2) or "")] = float(match.group(3))
+        except ValueError:
+            continue
+    return out
+
+
+def render(carry: Optional[Dict[str, Dict[Tuple[str, str], float]]] = None) -> str:
+    """
+    text exposition of every metric. `carry` (an earlier file's samples) is
+    added to counters and histograms; earlier gauge series are kept unless
+    this run set them.
+    """
+    carry = carry or {}
+    lines: List[str] = []
+    with _lock:
+        metrics = sorted(_registry.values(), key=lambda m: m.name)
+        samples = {m.name: m.samples() for m in metrics}
+    for metric in metrics:
+        previous = dict(carry.get(metric.name, {}))
+        cumulative = metric.kind != "gauge"
+        rows = [(n, l, v + previous.pop((n, l), 0.0) * cumulative) for n, l, v in samples[metric.name]]
+        rows += [(n, l, v) for (n, l), v in previous.items()]  # series not seen this run
+        if not rows:
+            continue
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(f"{n}{l} {_fmt(v)}" for n, l, v in rows)
+    return "\n".join(lines) + "\n"
+
+
+def textfile_path() -> Path:
+    return Path(getattr(_config(), "METRICS_TEXTFILE", None) or TEXTFILE_PATH)
+
+
+@contextmanager
+def _textfile_lock(path: Path):
+    """exclusive cross-process lock on a sidecar file, held across read-merge-replace"""
+    with open(path.with_suffix(".prom.lock"), "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+
+def write_textfile(path: Optional[Path] = None) -> Path:
+    """
+    atomically (re)write the textfile-collector file, accumulating counters
+    across runs. overlapping cron jobs take turns on a sidecar lock so no
+    run's increments are lost.
+    """
+    path = Path(path or textfile_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _textfile_lock(path):
+        body = render(_previous(path))
+        tmp = path.with_suffix(".prom.tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    print(f"[metrics] wrote {path} ({body.count(chr(10))} lines)")
+    return path
+
+
+def serve(port: int = DEFAULT_PORT, host: str = "127.0.0.1", path: Optional[Path] = None) -> ThreadingHTTPServer:
+    """
+    serve /metrics on a local port from a background thread: the textfile
+    (the latest cron run) when one exists, otherwise this process's metrics.
+    """
+    source = Path(path or textfile_path())
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            try:
+                body = source.read_bytes()
+            except OSError:
+                body = render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, fmt, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f"[metrics] serving http://{host}:{server.server_port}/metrics")
+    return server
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Serve the run metrics for Prometheus")
+    parser.add_argument("--serve", type=int, default=DEFAULT_PORT, metavar="PORT")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--textfile", type=Path, default=None, help="metrics file to serve (default: config.METRICS_TEXTFILE)")
+    args = parser.parse_args(argv)
+
+    server = serve(args.serve, args.host, args.textfile)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    import sys
+    ROOT = Path(__file__).resolve().parents[1]
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    main()
@@ -1,12 +1,23 @@
 # src/moon_utils.py
 from datetime import date, datetime, timedelta
-from zoneinfo import ZoneInfo
 from astral import moon, LocationInfo
 from astral.sun import sun
 import math
 
-def get_moon_sun_times(lat, lon, day, tz="Australia/Adelaide"):
-    tzinfo = ZoneInfo(tz)
+from src.zones import DEFAULT_TZ, zone
+
+SYNODIC_MONTH_DAYS = 29.530588853
+
+
+def moon_illumination(day):
+    """illuminated fraction of the moon (percent, 1 dp) from its age on `day`"""
+    age_days = moon.phase(day)  # 0=new … ~14.77=full
+    phase_angle = 2 * math.pi * (age_days / SYNODIC_MONTH_DAYS)
+    return round(((1 - math.cos(phase_angle)) / 2) * 100, 1)
+
+
+def get_moon_sun_times(lat, lon, day, tz=DEFAULT_TZ):
+    tzinfo = zone(tz)
     loc = LocationInfo(latitude=lat, longitude=lon, timezone=tz)
     obs = loc.observer
 
@@ -25,9 +36,7 @@ def get_moon_sun_times(lat, lon, day, tz="Australia/Adelaide"):
     except ValueError:
         ms = None
 
-    age_days = moon.phase(day)  # 0=new … ~14.77=full
-    phase_angle = 2 * math.pi * (age_days / 29.530588853)
-    illum_pct = round(((1 - math.cos(phase_angle)) / 2) * 100, 1)
+    illum_pct = moon_illumination(day)
 
     return {
         "sunrise": fmt(s_today.get("sunrise")),
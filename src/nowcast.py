@@ -0,0 +1,172 @@
+"""
+Evening-of cloud-cover nowcast for nights already sent in this week's outlook.
+
+On a weekend evening each location whose tonight was part of this week's
+Monday selection is refreshed with a narrow Visual Crossing request: only
+the observation-window hours (sunset + 1h, WINDOW_HOURS long) and only the
+fields scoring needs, instead of a full forecastDays=7 timeline. Tonight is
+rescored and compared with the latest recorded score for it (an earlier
+nowcast, else Wednesday, else Monday). A go / no-go push goes out only when
+the score crossed NOTIFY_THRESHOLD; every refresh is recorded in history
+under promise_window "nowcast" so a later rerun compares against it.
+
+    python src/main.py --nowcast        (cron: Fri-Sun, late afternoon)
+"""
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import config
+from src import profiling
+from src import pushover_utils as notifs
+from src import utils
+from src import zones
+from src.data_store import HistoryWriter, window_snapshot
+from src.ephemeris import get_astro
+from src.provider_vc import _vc_to_weatherapi_like, fetch_visualcrossing_raw
+
+# newest first: the most recent recorded score for tonight is the baseline
+BASELINE_WINDOWS = ("nowcast", "wednesday", "monday")
+NOWCAST_ELEMENTS = "datetime,tempmin,temp,humidity,dew,windspeed,visibility,cloudcover"
+
+WindowFetch = Callable[..., dict]  # (lat, lon, start, end, tz=None) -> weatherapi-like payload
+
+
+def observation_window(lat: float, lon: float, day: date, tz: Optional[str] = None) -> Optional[Tuple[datetime, datetime]]:
+    """(start, end) site-local times of the night's window, as process_weather_data computes it"""
+    sunset = get_astro(lat, lon, day, tz or zones.default_tz()).get("sunset")
+    if not sunset:
+        return None
+    sunset_time = datetime.combine(day, datetime.strptime(sunset, "%I:%M %p").time())
+    start = (sunset_time + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    return start, start + timedelta(hours=utils.WINDOW_HOURS)
+
+
+def fetch_window(lat: float, lon: float, start: datetime, end: datetime, tz: Optional[str] = None) -> dict:
+    """Visual Crossing request for just [start, end] (site-local) with the scoring fields only"""
+    raw = fetch_visualcrossing_raw(
+        lat, lon,
+        start=start.strftime("%Y-%m-%dT%H:%M:%S"),
+        end=end.strftime("%Y-%m-%dT%H:%M:%S"),
+        elements=NOWCAST_ELEMENTS,
+    )
+    return _vc_to_weatherapi_like(raw, lat, lon, tz)
+
+
+def baseline_score(city: str, now: datetime) -> Optional[Tuple[str, float]]:
+    """(window, score) last recorded for tonight, or None if tonight was never selected"""
+    if window_snapshot(city, now, "monday") is None:
+        return None
+    tonight = now.date().isoformat()
+    for window in BASELINE_WINDOWS:
+        night = (window_snapshot(city, now, window) or {}).get(tonight)
+        if not night:
+            continue
+        try:
+            return window, float(night["suitability_score"])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+
+def rescore_tonight(lat: float, lon: float, day: date, fetch: Optional[WindowFetch] = None,
+                    tz: Optional[str] = None) -> Optional[dict]:
+    """fetch only tonight's window and score it; None when the window has no data"""
+    tz = tz or zones.default_tz()
+    window = observation_window(lat, lon, day, tz)
+    if window is None:
+        return None
+    start, end = window
+    print(f"[diagnostic] nowcast: window {start:%Y-%m-%d %H:%M}-{end:%H:%M} lat={lat} lon={lon}")
+    with profiling.stage("fetch"):
+        data = (fetch or fetch_window)(lat, lon, start, end, tz=tz)
+    with profiling.stage("process"):
+        processed = utils.process_weather_data(data)
+    if not isinstance(processed, list):
+        return None
+    tonight = [d for d in processed if d.get("date") == day.isoformat()]
+    if not tonight:
+        return None
+    with profiling.stage("score"):
+        return utils.add_suitability_scores(tonight)[0]
+
+
+def build_nowcast_message(city: str, before: float, record: dict, threshold: float) -> str:
+    """'Adelaide tonight — GO · score 52→78 · cloud 12%'"""
+    after = float(record["suitability_score"])
+    verdict = "GO" if after >= threshold else "NO-GO"
+    cloud = record.get("avg_cloud")
+    cloud_part = f" · cloud {cloud:.0f}%" if cloud is not None else ""
+    return f"{city} tonight — {verdict} · score {before:.0f}→{after:.0f}{cloud_part}"
+
+
+def run_nowcast(
+    now: datetime,
+    users: Dict[str, str],
+    locations: Dict[str, str],
+    fetch: Optional[WindowFetch] = None,
+    history: Optional[HistoryWriter] = None,
+    send=None,
+    subscriptions: Optional[Dict[str, List[str]]] = None,
+    only_zones: Optional[List[str]] = None,
+) -> Dict[str, int]:
+    """
+    refresh tonight for every selected location once, then push go/no-go to
+    its subscribers when the score crossed the threshold, one push per user
+    listing each of their sites that crossed (a line per site). locations
+    are batched by time zone and "tonight" is each zone's local date; every
+    zone runs unless `only_zones` limits it.
+    """
+    threshold = getattr(config, "NOTIFY_THRESHOLD", 60.0)
+    counts = {"locations": 0, "refreshed": 0, "crossed": 0, "pushes": 0}
+    verdicts: Dict[str, Optional[str]] = {}
+
+    def cities_of(name: str):
+        return subscriptions.get(name, ()) if subscriptions is not None else locations
+
+    batches = zones.batch_by_zone((c for name in users for c in cities_of(name)), locations)
+    if only_zones is not None:
+        skipped = [tz for tz in batches if tz not in only_zones]
+        if skipped:
+            logging.warning("Zones not covered by this nowcast (--zone %s): %s", ",".join(only_zones), ", ".join(skipped))
+        batches = {tz: cities for tz, cities in batches.items() if tz in only_zones}
+
+    for tz, batch in batches.items():
+        local_now = now.astimezone(zones.zone(tz))
+        for city in batch:
+            verdicts[city] = None
+            counts["locations"] += 1
+            baseline = baseline_score(city, local_now)
+            if baseline is None:
+                print(f"[diagnostic] nowcast: {city} tonight not in this week's selection (skipped)")
+                continue
+            source, before = baseline
+            lat, lon, _ = zones.parse_location(city, locations[city])
+            record = rescore_tonight(lat, lon, local_now.date(), fetch, tz)
+            if record is None:
+                print(f"[diagnostic] nowcast: {city} no data for tonight's window")
+                continue
+            counts["refreshed"] += 1
+            if history is not None:
+                with profiling.stage("history"):
+                    history.add(city, local_now.isoformat(), [record], "nowcast")
+            after = float(record["suitability_score"])
+            crossed = (before >= threshold) != (after >= threshold)
+            print(f"[diagnostic] nowcast: {city} before={before:.1f} ({source}) after={after:.1f} crossed={crossed}")
+            if crossed:
+                counts["crossed"] += 1
+                verdicts[city] = build_nowcast_message(city, before, record, threshold)
+
+    # one push per user with every site of theirs that crossed
+    for name, user_key in users.items():
+        lines = [verdicts[city] for city in dict.fromkeys(cities_of(name)) if verdicts.get(city)]
+        if not lines:
+            continue
+        message = "\n".join(lines)
+        with profiling.stage("push"):
+            (send or notifs.send_push_notification)(user_key, message, user_name=name)
+        logging.info("Sent nowcast to %s: %s", name, message)
+        counts["pushes"] += 1
+    return counts
@@ -0,0 +1,157 @@
+"""
+Per-stage timing and profiling for a run.
+
+Code marks its stages with `with profiling.stage("fetch"):`. With no active
+profiler that is a cheap no-op; main() activates a StageProfiler for
+--profile runs (and the shadow/metrics paths reuse its wall-clock timings).
+
+A profiling run writes to <out_dir>:
+  <stage>.prof        cProfile stats per stage (load with pstats / snakeviz)
+  <stage>.txt         the same stats as text, sorted by cumulative time
+  stacks.collapsed    sampled stacks, "stage:main;stage:fetch;mod:func 42" —
+                      feed to flamegraph.pl or speedscope
+and prints a top-N hotspot summary. Stages nest (fetch -> astral); each
+cProfile only sees time not spent in a nested stage.
+"""
+from __future__ import annotations
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+_active: Optional["StageProfiler"] = None
+
+
+class StageProfiler:
+    def __init__(self, out_dir: Optional[Path] = None, profile: bool = False, sample_interval: float = 0.001):
+        self.out_dir = Path(out_dir) if out_dir else None
+        self.profile = profile
+        self.sample_interval = sample_interval
+        self.durations: Dict[str, List[float]] = defaultdict(list)
+        self._profiles: Dict[str, cProfile.Profile] = {}
+        self._stack: List[str] = []
+        self._samples: Counter = Counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._thread_id = threading.get_ident()
+
+    # --- activation ---------------------------------------------------------
+
+    def __enter__(self) -> "StageProfiler":
+        global _active
+        self._previous, _active = _active, self
+        if self.profile:
+            self._sampler = threading.Thread(target=self._sample_loop, name="stage-sampler", daemon=True)
+            self._sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        global _active
+        _active = self._previous
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+
+    # --- stages -------------------------------------------------------------
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        parent = self._stack[-1] if self._stack else None
+        if self.profile and parent is not None:
+            self._profiles[parent].disable()
+        prof = None
+        if self.profile:
+            prof = self._profiles.setdefault(name, cProfile.Profile())
+            prof.enable()
+        self._stack.append(name)
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name].append(time.perf_counter() - t0)
+            self._stack.pop()
+            if prof is not None:
+                prof.disable()
+            if self.profile and parent is not None:
+                self._profiles[parent].enable()
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.sample_interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+                frame = frame.f_back
+            prefix = [f"stage:{s}" for s in list(self._stack)] or ["stage:-"]
+            self._samples[";".join(prefix + stack[::-1])] += 1
+
+    # --- reporting ----------------------------------------------------------
+
+    def summary(self) -> Dict[str, dict]:
+        out = {}
+        for name, values in self.durations.items():
+            ordered = sorted(values)
+            out[name] = {
+                "count": len(values),
+                "total_s": sum(values),
+                "mean_s": sum(values) / len(values),
+                "p50_s": ordered[len(ordered) // 2],
+                "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                "max_s": ordered[-1],
+            }
+        return out
+
+    def write(self, top: int = 15) -> None:
+        """dump per-stage stats, collapsed stacks and print the hotspot summary"""
+        for name, s in sorted(self.summary().items(), key=lambda kv: -kv[1]["total_s"]):
+            print(f"[profile] stage={name:10s} calls={s['count']:5d} total={s['total_s']:.3f}s "
+                  f"mean={s['mean_s'] * 1000:.1f}ms max={s['max_s'] * 1000:.1f}ms")
+        if not self.profile:
+            return
+
+        if self.out_dir:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+        hotspots = []
+        for name, prof in self._profiles.items():
+            stats = pstats.Stats(prof)
+            if self.out_dir:
+                stats.dump_stats(str(self.out_dir / f"{name}.prof"))
+                buf = io.StringIO()
+                pstats.Stats(prof, stream=buf).sort_stats("cumulative").print_stats(40)
+                (self.out_dir / f"{name}.txt").write_text(buf.getvalue(), encoding="utf-8")
+            for (filename, line, func), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+                hotspots.append((tottime, name, f"{Path(filename).name}:{line}({func})", ncalls, cumtime))
+
+        if self.out_dir:
+            with (self.out_dir / "stacks.collapsed").open("w", encoding="utf-8") as f:
+                for stack, count in self._samples.most_common():
+                    f.write(f"{stack} {count}\n")
+            print(f"[profile] wrote stats + stacks.collapsed ({sum(self._samples.values())} samples) to {self.out_dir}")
+
+        print(f"[profile] top {top} hotspots by own time:")
+        for tottime, name, where, ncalls, cumtime in sorted(hotspots, reverse=True)[:top]:
+            print(f"[profile]   {tottime * 1000:8.1f}ms own {cumtime * 1000:8.1f}ms cum {ncalls:7d} calls  [{name}] {where}")
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """time/profile a stage under the active profiler (no-op when none is active)"""
+    if _active is None:
+        yield
+        return
+    with _active.stage(name):
+        yield
+
+
+def active() -> Optional[StageProfiler]:
+    return _active
@@ -1,8 +1,9 @@
 import os
 import json
-import requests
 from datetime import datetime
-from src.moon_utils import get_moon_sun_times
+from src import profiling
+from src import transport
+from src.ephemeris import DEFAULT_TZ, get_astro
 
 import logging
 logger = logging.getLogger("star_signal")
@@ -23,15 +24,18 @@ except Exception:
         pass
 
 
-def _vc_to_weatherapi_like(vc_json, lat=None, lon=None):
+def _vc_to_weatherapi_like(vc_json, lat=None, lon=None, tz=None):
+    # hour stamps are the site's local time; sun/moon events must use the same zone
+    tz = tz or vc_json.get("timezone") or DEFAULT_TZ
     forecastday = []
     for day in vc_json.get("days", []):
         date = day.get("datetime")
 
-        # Always compute with Astral (uses local timezone inside helper)
-        astro_calc = get_moon_sun_times(
-            lat, lon, datetime.strptime(date, "%Y-%m-%d").date()
-        )
+        # precomputed table lookup; falls back to Astral outside the table
+        with profiling.stage("astral"):
+            astro_calc = get_astro(
+                lat, lon, datetime.strptime(date, "%Y-%m-%d").date(), tz
+            )
         astro = {
             "sunrise": astro_calc["sunrise"],
             "sunset": astro_calc["sunset"],
@@ -40,18 +44,19 @@ def _vc_to_weatherapi_like(vc_json, lat=None, lon=None):
             "moon_illumination": astro_calc["illumination"],
         }
 
+        # hourly records, or their sub-hourly "minutes" samples when requested
         hours = []
         for h in day.get("hours", []) or []:
-            timestr = f"{date} {str(h.get('datetime','00:00:00'))[:5]}"
-            hours.append({
-                "time": timestr,
-                "temp_c": h.get("temp"),
-                "dewpoint_c": h.get("dew"),
-                "wind_kph": h.get("windspeed"),
-                "humidity": h.get("humidity"),
-                "vis_km": h.get("visibility"),
-                "cloud": h.get("cloudcover"),
-            })
+            for m in h.get("minutes") or (h,):
+                hours.append({
+                    "time": f"{date} {str(m.get('datetime','00:00:00'))[:5]}",
+                    "temp_c": m.get("temp"),
+                    "dewpoint_c": m.get("dew"),
+                    "wind_kph": m.get("windspeed"),
+                    "humidity": m.get("humidity"),
+                    "vis_km": m.get("visibility"),
+                    "cloud": m.get("cloudcover"),
+                })
 
         daily = {
             "date": date,
@@ -63,7 +68,7 @@ def _vc_to_weatherapi_like(vc_json, lat=None, lon=None):
     return {"forecast": {"forecastday": forecastday}}
 
 
-def _load_offline(path, lat, lon):
+def _load_offline(path, lat, lon, tz=None):
     print(f"[diagnostic] provider: loading offline data path={path}")
     with open(path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -71,23 +76,23 @@ def _load_offline(path, lat, lon):
     days_ct = len((data if not OFFLINE_TESTING else data).get("days", []))
     logger.info("[provider] raw_days=%d elements=request(datetime,temp,humidity,dew,windspeed,visibility,cloudcover,moonphase)+astral(sun/moon)", days_ct)
 
-    return _vc_to_weatherapi_like(data, lat, lon)
+    return _vc_to_weatherapi_like(data, lat, lon, tz)
 
 
-def fetch_visualcrossing(lat, lon, days=7):
-    mode = "OFFLINE" if OFFLINE_TESTING else "ONLINE"
-    print(f"[diagnostic] fetch_visualcrossing: mode={mode} lat={lat} lon={lon} days={days}")
-    logger.info("[provider] mode=%s lat=%.4f lon=%.4f days=%d", mode, lat, lon, days)
+DEFAULT_ELEMENTS = "datetime,temp,humidity,dew,windspeed,visibility,cloudcover,moonphase"
+MAX_FORECAST_DAYS = 15  # longest forecastDays Visual Crossing serves
 
-    if OFFLINE_TESTING:
-        data_dir = os.path.join(os.path.dirname(__file__), "data")
-        test_path = os.path.join(data_dir, "test.json")
-        logging.info("OFFLINE mode: loading %s", test_path)
-        print(f"[diagnostic] fetch_visualcrossing: offline file={test_path}")
-
-        return _load_offline(test_path, lat, lon)
 
-    # online path (not used while testing)
+def fetch_visualcrossing_raw(lat, lon, days=7, resolution_minutes=60, start=None, end=None, elements=None):
+    """
+    online Visual Crossing timeline request; returns the raw JSON payload.
+    days: forecast horizon (VC serves up to 15). resolution_minutes < 60
+    requests sub-hourly samples, nested as "minutes" under each hour.
+    start/end (ISO dates or datetimes) request just that range instead of
+    forecastDays; elements narrows the returned fields.
+    """
+    if not start and not 1 <= days <= MAX_FORECAST_DAYS:
+        raise ValueError(f"days must be 1..{MAX_FORECAST_DAYS}, got {days}")
     try:
         try:
             from src import config as cfg
@@ -105,23 +110,45 @@ def fetch_visualcrossing(lat, lon, days=7):
             "unitGroup": "metric",
             "include": "hours",
             "key": key,
-            "elements": "datetime,temp,humidity,dew,windspeed,visibility,cloudcover,moonphase",
-            "forecastDays": str(days)
+            "elements": elements or DEFAULT_ELEMENTS,
         }
-
-        r = requests.get(url, params=params, timeout=30)
+        if start:
+            url = f"{url}/{start}/{end or start}"
+        else:
+            params["forecastDays"] = str(days)
+        if resolution_minutes < 60:
+            params["include"] = "hours,minutes"
+            params["options"] = f"minuteinterval_{int(resolution_minutes)}"
+
+        r = transport.get(url, params=params)
         r.raise_for_status()
         vc_json = r.json()
         logging.info("Online VC fetch ok: %d days", len(vc_json.get("days", [])))
         print(f"[diagnostic] fetch_visualcrossing: online request url={url} status={r.status_code}")
 
-        days_ct = len((vc_json if not OFFLINE_TESTING else vc_json).get("days", []))
-        logger.info("[provider] raw_days=%d elements=request(datetime,temp,humidity,dew,windspeed,visibility,cloudcover,moonphase)+astral(sun/moon)", days_ct)
+        days_ct = len(vc_json.get("days", []))
+        logger.info("[provider] raw_days=%d elements=request(%s)+astral(sun/moon)", days_ct, params["elements"])
         print(f"[diagnostic] fetch_visualcrossing: days_returned={days_ct}")
 
-        return _vc_to_weatherapi_like(vc_json, lat, lon)
+        return vc_json
     
     except Exception as e:
         logging.error("Visual Crossing fetch failed: %s", e)
         print(f"[diagnostic] fetch_visualcrossing: exception={e}")
         raise
+
+
+def fetch_visualcrossing(lat, lon, days=7, resolution_minutes=60):
+    mode = "OFFLINE" if OFFLINE_TESTING else "ONLINE"
+    print(f"[diagnostic] fetch_visualcrossing: mode={mode} lat={lat} lon={lon} days={days}")
+    logger.info("[provider] mode=%s lat=%.4f lon=%.4f days=%d", mode, lat, lon, days)
+
+    if OFFLINE_TESTING:
+        data_dir = os.path.join(os.path.dirname(__file__), "data")
+        test_path = os.path.join(data_dir, "test.json")
+        logging.info("OFFLINE mode: loading %s", test_path)
+        print(f"[diagnostic] fetch_visualcrossing: offline file={test_path}")
+
+        return _load_offline(test_path, lat, lon)
+
+    return _vc_to_weatherapi_like(fetch_visualcrossing_raw(lat, lon, days, resolution_minutes), lat, lon)
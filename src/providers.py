@@ -0,0 +1,193 @@
+"""
+Pluggable forecast providers.
+
+Every provider returns the same weatherapi-like structure that
+utils.process_weather_data consumes, so build_and_score can run against
+any of them:
+
+  visualcrossing  live Visual Crossing timeline API (optionally recording
+                  each raw payload for later replay when
+                  config.VC_RECORD_PAYLOADS is set)
+  offline         the fixed src/data/test.json payload (OFFLINE_TESTING)
+  replay          recorded raw payloads keyed by location and run date
+  synthetic       deterministic generated forecasts for load tests
+
+fetch() takes the site's time zone (tz) for the sun/moon events; payloads
+that carry their own "timezone" (Visual Crossing) fall back to it.
+
+Select with config.FORECAST_PROVIDER (defaults to "offline" when
+OFFLINE_TESTING is set, otherwise "visualcrossing").
+"""
+from __future__ import annotations
+
+import json
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from src import provider_vc
+from src.provider_vc import _vc_to_weatherapi_like, fetch_visualcrossing_raw
+
+DATA_DIR = Path(__file__).resolve().parent / "data"
+REPLAY_DIR = DATA_DIR / "replay"
+
+
+def _config():
+    try:
+        import config
+        return config
+    except ImportError:
+        return None
+
+
+def _site_dir(root: Path, lat: float, lon: float) -> Path:
+    return Path(root) / f"{lat:.4f}_{lon:.4f}"
+
+
+class VisualCrossingProvider:
+    """live API; with record=True each raw payload is saved under the replay tree"""
+
+    name = "visualcrossing"
+
+    def __init__(self, record: Optional[bool] = None, replay_root: Path = REPLAY_DIR):
+        if record is None:
+            record = bool(getattr(_config(), "VC_RECORD_PAYLOADS", False))
+        self.record = record
+        self.replay_root = Path(replay_root)
+
+    def fetch(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60, tz: Optional[str] = None) -> dict:
+        raw = fetch_visualcrossing_raw(lat, lon, days, resolution_minutes)
+        if self.record and raw.get("days"):
+            site = _site_dir(self.replay_root, lat, lon)
+            site.mkdir(parents=True, exist_ok=True)
+            path = site / f"{raw['days'][0]['datetime']}.json"
+            path.write_text(json.dumps(raw), encoding="utf-8")
+            print(f"[diagnostic] provider: recorded payload -> {path}")
+        return _vc_to_weatherapi_like(raw, lat, lon, tz)
+
+
+class OfflineProvider:
+    """one fixed raw payload for every location (the old OFFLINE_TESTING behaviour)"""
+
+    name = "offline"
+
+    def __init__(self, path: Path = DATA_DIR / "test.json"):
+        self.path = Path(path)
+
+    def fetch(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60, tz: Optional[str] = None) -> dict:
+        return provider_vc._load_offline(str(self.path), lat, lon, tz)
+
+
+class ReplayProvider:
+    """
+    recorded raw payloads at <root>/<lat>_<lon>/<first forecast date>.json.
+    picks the recording for `as_of` (or the latest one before it); with no
+    `as_of` the newest recording for the site is used.
+    """
+
+    name = "replay"
+
+    def __init__(self, root: Path = REPLAY_DIR, as_of: Optional[date] = None):
+        self.root = Path(root)
+        self.as_of = as_of
+
+    def _pick(self, lat: float, lon: float) -> Path:
+        site = _site_dir(self.root, lat, lon)
+        recordings = sorted(site.glob("*.json"))
+        if self.as_of is not None:
+            recordings = [p for p in recordings if p.stem <= self.as_of.isoformat()]
+        if not recordings:
+            raise FileNotFoundError(f"no replay recording for {lat},{lon} in {site}")
+        return recordings[-1]
+
+    def fetch(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60, tz: Optional[str] = None) -> dict:
+        # recordings are replayed at whatever resolution they were captured
+        path = self._pick(lat, lon)
+        print(f"[diagnostic] provider: replay {path}")
+        raw = json.loads(path.read_text(encoding="utf-8"))
+        raw["days"] = raw.get("days", [])[:days]
+        return _vc_to_weatherapi_like(raw, lat, lon, tz)
+
+
+class SyntheticProvider:
+    """
+    deterministic fake forecasts for load tests: the same (lat, lon, start,
+    seed) always yields the same payload, different sites get different weather.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, start: Optional[date] = None, seed: int = 0):
+        self.start = start
+        self.seed = seed
+
+    def raw(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60) -> dict:
+        start = self.start or date.today()
+        key = f"{lat:.4f},{lon:.4f},{start.isoformat()},{self.seed}".encode()
+        rng = np.random.default_rng(zlib.crc32(key))
+        per_hour = max(1, 60 // int(resolution_minutes))
+        n = days * 24 * per_hour
+        # smooth-ish series: random walk clipped to physical ranges
+        step = 1.0 / np.sqrt(per_hour)
+        cloud = np.clip(50 + np.cumsum(rng.normal(0, 8 * step, n)), 0, 100)
+        humidity = np.clip(60 + np.cumsum(rng.normal(0, 3 * step, n)), 5, 100)
+        wind = np.clip(12 + np.cumsum(rng.normal(0, 1.5 * step, n)), 0, 80)
+        temp = 15 + 6 * np.sin(np.arange(n) * (2 * np.pi / (24 * per_hour)) - 2) + rng.normal(0, 1, n)
+        dew = temp - rng.uniform(2, 10, n)
+        vis = rng.uniform(5, 30, n)
+
+        def sample(i: int, clock: str) -> dict:
+            return {
+                "datetime": clock,
+                "temp": round(float(temp[i]), 1),
+                "humidity": round(float(humidity[i]), 1),
+                "dew": round(float(dew[i]), 1),
+                "windspeed": round(float(wind[i]), 1),
+                "visibility": round(float(vis[i]), 1),
+                "cloudcover": round(float(cloud[i]), 1),
+            }
+
+        minutes = 60 // per_hour
+        out_days = []
+        for d in range(days):
+            base = d * 24 * per_hour
+            day_temp = temp[base:base + 24 * per_hour]
+            hours = []
+            for h in range(24):
+                i = base + h * per_hour
+                hour = sample(i, f"{h:02d}:00:00")
+                if per_hour > 1:
+                    hour["minutes"] = [sample(i + j, f"{h:02d}:{j * minutes:02d}:00") for j in range(per_hour)]
+                hours.append(hour)
+            out_days.append({
+                "datetime": (start + timedelta(days=d)).isoformat(),
+                "tempmin": round(float(day_temp.min()), 1),
+                "tempmax": round(float(day_temp.max()), 1),
+                "hours": hours,
+            })
+        return {"latitude": lat, "longitude": lon, "days": out_days}
+
+    def fetch(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60, tz: Optional[str] = None) -> dict:
+        return _vc_to_weatherapi_like(self.raw(lat, lon, days, resolution_minutes), lat, lon, tz)
+
+
+_PROVIDERS = {
+    "visualcrossing": VisualCrossingProvider,
+    "offline": OfflineProvider,
+    "replay": ReplayProvider,
+    "synthetic": SyntheticProvider,
+}
+
+
+def get_provider(name: Optional[str] = None, **kwargs):
+    """provider by name (default from config.FORECAST_PROVIDER / OFFLINE_TESTING)"""
+    if name is None:
+        name = getattr(_config(), "FORECAST_PROVIDER", None) or ("offline" if provider_vc.OFFLINE_TESTING else "visualcrossing")
+    try:
+        cls = _PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"unknown forecast provider {name!r} (expected one of {sorted(_PROVIDERS)})")
+    return cls(**kwargs)
@@ -1,5 +1,6 @@
-import requests
 import config
+from src import metrics
+from src import transport
 
 def send_push_notification(user_key, message, user_name='user'):
     try:
@@ -10,8 +11,14 @@ def send_push_notification(user_key, message, user_name='user'):
             "message": message,
             "title": "Star Signal Alert"
         }
-        response = requests.post(url, data=payload)
+        response = transport.post(url, data=payload)
         if response.status_code != 200:
             print(f"Error sending notification to {user_name}: {response.text}")
+            metrics.PUSHES.inc(outcome="failed")
+            return False
+        metrics.PUSHES.inc(outcome="sent")
+        return True
     except Exception as e:
-        print(f"Error sending notification to {user_name}: {e}")
\ No newline at end of file
+        print(f"Error sending notification to {user_name}: {e}")
+        metrics.PUSHES.inc(outcome="failed")
+        return False
\ No newline at end of file
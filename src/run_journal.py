@@ -0,0 +1,226 @@
+"""
+Per-run journal so an interrupted run can be resumed without repeating work.
+
+A run is identified by its local date and promise window, plus its zone
+outside the default zone (each zone's batch keeps its own journal). Its journal lives in src/data/journal/<date>_<window>[_<zone>]/:
+
+  journal.jsonl          one fsynced JSON line per completed stage
+  payloads/<site>.json   fetched forecasts (sha256 recorded in the journal)
+  scored/<site>.json     scored nights
+
+Stages recorded per location: fetch (payload hash), scored, history; and per
+(location, user): message (its text), push. A rerun in the same window
+reopens the journal, keeps the original run timestamp, reuses cached
+payloads and scored nights, skips history already written, reuses generated
+messages and never re-sends a delivered push. Only one process may hold a
+run's journal at a time.
+
+    python src/main.py            # resumes each open zone's window if a journal exists
+    python src/main.py --fresh    # discard it and start over
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src import metrics
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: no cross-process guard
+    fcntl = None
+
+JOURNAL_DIR = Path(__file__).resolve().parent / "data" / "journal"
+KEEP_DAYS = 14
+
+
+class JournalBusy(RuntimeError):
+    """another process holds this run's journal"""
+
+
+def _digest(data) -> str:
+    return hashlib.sha256(json.dumps(data, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+
+def _write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".json.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _safe(name: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in name)
+
+
+class RunJournal:
+    def __init__(self, run_dir: Path, now: datetime):
+        self.dir = Path(run_dir)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.dir / "journal.jsonl"
+        self._lock = open(self.dir / "journal.lock", "a")
+        if fcntl is not None:
+            try:
+                fcntl.flock(self._lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                self._lock.close()
+                raise JournalBusy(f"run journal {self.dir} is held by another process")
+
+        self.done: Set[Tuple[str, ...]] = set()
+        self.hashes: Dict[str, str] = {}
+        self.messages: Dict[Tuple[str, str], str] = {}
+        self.now = now
+        resumed = False
+        if self.path.exists():
+            with self.path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a crash
+                    self._apply(entry)
+                    resumed = True
+        if not resumed:
+            self._append({"stage": "start", "run": now.isoformat()})
+        self.resumed = resumed
+        print(f"[diagnostic] journal: {'resuming' if resumed else 'started'} {self.dir.name} "
+              f"run={self.now.isoformat()} completed_stages={len(self.done)}")
+
+    # --- persistence --------------------------------------------------------
+
+    def _apply(self, entry: dict) -> None:
+        stage = entry.get("stage")
+        if stage == "start":
+            self.now = datetime.fromisoformat(entry["run"])
+            return
+        key = (stage, entry.get("location", ""), entry.get("user", ""))
+        self.done.add(key)
+        if stage == "fetch":
+            self.hashes[entry["site"]] = entry["hash"]
+        elif stage == "message":
+            self.messages[(entry["location"], entry["user"])] = entry["message"]
+
+    def _append(self, entry: dict) -> None:
+        entry = dict(entry, at=datetime.now().isoformat(timespec="seconds"))
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, (json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._apply(entry)
+
+    def close(self) -> None:
+        if not self._lock.closed:
+            self._lock.close()
+
+    def is_done(self, stage: str, location: str = "", user: str = "") -> bool:
+        return (stage, location, user) in self.done
+
+    # --- fetch --------------------------------------------------------------
+
+    def provider(self, inner):
+        """wrap a provider so each site's payload is fetched once per run"""
+        return _JournalProvider(self, inner)
+
+    def _payload_path(self, site: str) -> Path:
+        return self.dir / "payloads" / f"{site}.json"
+
+    def cached_payload(self, site: str) -> Optional[dict]:
+        expected = self.hashes.get(site)
+        path = self._payload_path(site)
+        if expected is None or not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        return data if _digest(data) == expected else None
+
+    def record_payload(self, site: str, data: dict) -> None:
+        _write_json(self._payload_path(site), data)
+        self._append({"stage": "fetch", "site": site, "hash": _digest(data)})
+
+    # --- scored / history ---------------------------------------------------
+
+    def scored(self, city: str) -> Optional[List[dict]]:
+        path = self.dir / "scored" / f"{_safe(city)}.json"
+        if not self.is_done("scored", city) or not path.exists():
+            return None
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def record_scored(self, city: str, scored: List[dict]) -> None:
+        _write_json(self.dir / "scored" / f"{_safe(city)}.json", scored)
+        self._append({"stage": "scored", "location": city})
+
+    def history_written(self, locations: List[str]) -> None:
+        """HistoryWriter on_flush hook"""
+        for city in dict.fromkeys(locations):
+            if not self.is_done("history", city):
+                self._append({"stage": "history", "location": city})
+
+    # --- message / push -----------------------------------------------------
+
+    def generate(self, city: str, user: str, inner: Callable) -> Callable:
+        def generate(c: str, rule_label: str, nights: List[dict], threshold: float = 60.0) -> str:
+            cached = self.messages.get((city, user))
+            if cached is not None:
+                print(f"[diagnostic] journal: reusing message for {user}/{city}")
+                return cached
+            message = inner(c, rule_label, nights, threshold=threshold)
+            self._append({"stage": "message", "location": city, "user": user, "message": message})
+            return message
+        return generate
+
+    def send(self, city: str, user: str, inner: Callable) -> Callable:
+        def send(user_key: str, message: str, user_name: str = "user"):
+            if self.is_done("push", city, user):
+                print(f"[diagnostic] journal: push to {user}/{city} already delivered (skipped)")
+                return True
+            result = inner(user_key, message, user_name=user_name)
+            if result is not False:
+                self._append({"stage": "push", "location": city, "user": user})
+            return result
+        return send
+
+
+class _JournalProvider:
+    def __init__(self, journal: RunJournal, inner):
+        self.journal = journal
+        self.inner = inner
+        self.name = inner.name
+
+    def fetch(self, lat: float, lon: float, days: int = 7, resolution_minutes: int = 60, tz: Optional[str] = None) -> dict:
+        site = f"{lat:.4f}_{lon:.4f}_{days}d_{resolution_minutes}m"
+        cached = self.journal.cached_payload(site)
+        metrics.cache("journal_payload", cached is not None)
+        if cached is not None:
+            print(f"[diagnostic] journal: reusing payload {site}")
+            return cached
+        data = self.inner.fetch(lat, lon, days=days, resolution_minutes=resolution_minutes, tz=tz)
+        self.journal.record_payload(site, data)
+        return data
+
+
+def open_journal(now: datetime, window_label: Optional[str], fresh: bool = False, scope: Optional[str] = None) -> RunJournal:
+    """
+    the journal for this run's (date, window[, scope]), pruning journals
+    older than KEEP_DAYS. scope separates runs over different location sets
+    (main passes each non-default zone).
+    """
+    JOURNAL_DIR.mkdir(parents=True, exist_ok=True)
+    cutoff = (now.date() - timedelta(days=KEEP_DAYS)).isoformat()
+    for old in JOURNAL_DIR.iterdir():
+        if old.is_dir() and old.name[:10] < cutoff:
+            shutil.rmtree(old, ignore_errors=True)
+    run_dir = JOURNAL_DIR / f"{now.date().isoformat()}_{window_label or 'none'}"
+    if scope:
+        run_dir = run_dir.with_name(f"{run_dir.name}_{_safe(scope)}")
+    if fresh and run_dir.exists():
+        shutil.rmtree(run_dir)
+    return RunJournal(run_dir, now)
@@ -0,0 +1,180 @@
+"""
+Shadow runs: the full main() pipeline for a simulated fleet, with no side effects.
+
+Planning, fetch (synthetic/replay/offline provider), scoring, selection and
+message generation run exactly as in production, against recording sinks:
+pushes and messages are captured in memory and history rows are counted but
+never written. Production state is not read either: the forecast store
+starts empty and the Monday index is a stub in which every simulated site
+was notified on Monday without a recorded snapshot, so a Wednesday shadow
+run exercises the full follow-up path. Per-stage latency (from profiling stages) and end-to-end
+throughput are reported so the fan-out can be load-tested before onboarding
+more subscribers.
+
+    python src/main.py --shadow 2000x300 --now 2025-10-27T19:30
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from src import main as pipeline
+from src import profiling
+from src.data_store import HistoryWriter
+from src.forecast_store import ForecastStore
+from src.providers import get_provider
+
+# rough bounding box for simulated Australian sites
+_LAT_RANGE = (-43.0, -12.0)
+_LON_RANGE = (114.0, 153.0)
+
+
+class RecordingSink:
+    """stands in for pushover: records every push instead of sending it"""
+
+    def __init__(self):
+        self.sent: List[Tuple[str, str, str]] = []
+
+    def __call__(self, user_key: str, message: str, user_name: str = "user") -> None:
+        self.sent.append((user_name, user_key, message))
+
+
+class RecordingGenerator:
+    """stands in for the AI generator: compact template, optional simulated latency"""
+
+    def __init__(self, latency_ms: float = 0.0):
+        self.latency_s = latency_ms / 1000.0
+        self.calls = 0
+
+    def __call__(self, city: str, rule_label: str, nights: List[dict], threshold: float = 60.0) -> str:
+        self.calls += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        return pipeline.build_promise_message(city, rule_label, nights)
+
+
+class ShadowIndex:
+    """stands in for the history window index (main.monday_notified_this_week / monday_snapshot)"""
+
+    def __init__(self):
+        self.lookups = 0
+
+    def monday_notified_this_week(self, city: str, now: datetime) -> bool:
+        self.lookups += 1
+        return True
+
+    def monday_snapshot(self, city: str, now: datetime) -> Optional[Dict[str, dict]]:
+        self.lookups += 1
+        return None
+
+    @contextlib.contextmanager
+    def installed(self):
+        """route the pipeline's index lookups here for the duration of the block"""
+        original = pipeline.monday_notified_this_week, pipeline.monday_snapshot
+        pipeline.monday_notified_this_week, pipeline.monday_snapshot = self.monday_notified_this_week, self.monday_snapshot
+        try:
+            yield self
+        finally:
+            pipeline.monday_notified_this_week, pipeline.monday_snapshot = original
+
+
+class RecordingHistory(HistoryWriter):
+    """builds history rows like the real writer but never touches disk"""
+
+    def __init__(self):
+        super().__init__()
+        self.rows_recorded = 0
+
+    def flush(self) -> int:
+        count = len(self.rows)
+        self.rows_recorded += count
+        self.rows = []
+        return count
+
+
+def simulated_fleet(
+    n_users: int,
+    n_locations: int,
+    subscriptions_per_user: int = 3,
+    seed: int = 0,
+) -> Tuple[Dict[str, str], Dict[str, str], Dict[str, List[str]]]:
+    """(users, locations, subscriptions) shaped like config.USERS / config.LOCATIONS"""
+    rng = random.Random(seed)
+    locations = {
+        f"Site{i:05d}": f"{rng.uniform(*_LAT_RANGE):.4f},{rng.uniform(*_LON_RANGE):.4f}"
+        for i in range(n_locations)
+    }
+    names = list(locations)
+    users = {f"user{i:05d}": f"shadow-key-{i:05d}" for i in range(n_users)}
+    per_user = min(subscriptions_per_user, len(names))
+    subscriptions = {u: rng.sample(names, per_user) for u in users}
+    return users, locations, subscriptions
+
+
+def run_shadow(
+    now: datetime,
+    n_users: int,
+    n_locations: int,
+    provider: str = "synthetic",
+    subscriptions_per_user: int = 3,
+    ai_latency_ms: float = 0.0,
+    seed: int = 0,
+    quiet: bool = True,
+) -> dict:
+    users, locations, subscriptions = simulated_fleet(n_users, n_locations, subscriptions_per_user, seed)
+    source = get_provider(provider, start=now.date(), seed=seed) if provider == "synthetic" else get_provider(provider)
+    sink, generator, history = RecordingSink(), RecordingGenerator(ai_latency_ms), RecordingHistory()
+    index = ShadowIndex()
+
+    print(f"[shadow] users={n_users} locations={n_locations} subscriptions/user={subscriptions_per_user} "
+          f"provider={provider} now={now.isoformat()}")
+
+    devnull: Optional[object] = open(os.devnull, "w") if quiet else None
+    previous_disable = logging.root.manager.disable
+    try:
+        if quiet:
+            logging.disable(logging.INFO)
+        with contextlib.redirect_stdout(devnull) if quiet else contextlib.nullcontext(), index.installed():
+            with profiling.StageProfiler() as profiler:
+                t0 = time.perf_counter()
+                with profiling.stage("main"):
+                    counts = pipeline.run_pipeline(
+                        now, users, locations,
+                        provider=source,
+                        history=history,
+                        send=sink,
+                        generate=generator,
+                        subscriptions=subscriptions,
+                        store=ForecastStore(),
+                    )
+                    history.flush()
+                elapsed = time.perf_counter() - t0
+    finally:
+        logging.disable(previous_disable)
+        if devnull is not None:
+            devnull.close()
+
+    report = {
+        "elapsed_s": elapsed,
+        "counts": counts,
+        "pushes_recorded": len(sink.sent),
+        "messages_generated": generator.calls,
+        "history_rows_recorded": history.rows_recorded,
+        "stages": profiler.summary(),
+        "locations_per_s": counts["locations"] / elapsed if elapsed else 0.0,
+        "pairs_per_s": counts["pairs"] / elapsed if elapsed else 0.0,
+    }
+
+    print(f"[shadow] elapsed={elapsed:.2f}s locations={counts['locations']} ({report['locations_per_s']:.1f}/s) "
+          f"user-location pairs={counts['pairs']} ({report['pairs_per_s']:.1f}/s)")
+    print(f"[shadow] pushes_recorded={report['pushes_recorded']} messages={report['messages_generated']} "
+          f"history_rows={report['history_rows_recorded']} nights_notified={counts['nights_notified']}")
+    for name, s in sorted(report["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+        print(f"[shadow] stage={name:8s} n={s['count']:6d} total={s['total_s']:8.3f}s "
+              f"p50={s['p50_s'] * 1000:7.2f}ms p95={s['p95_s'] * 1000:7.2f}ms max={s['max_s'] * 1000:7.2f}ms")
+    return report
@@ -0,0 +1,164 @@
+"""
+Shared HTTP transport for every outbound call.
+
+One requests.Session per host, each with a keep-alive connection pool and a
+urllib3 retry policy, so repeated Visual Crossing and Pushover calls reuse
+DNS, TLS sessions and sockets instead of opening a new connection per call.
+The Anthropic SDK (httpx) gets the same timeout/retry settings and reports
+into the same per-host metrics through event hooks.
+
+    from src import transport
+    r = transport.get(url, params=params)
+    transport.post(url, data=payload)
+    transport.metrics()  # {"host": {"requests", "errors", "retries", "status", "total_s", "max_s"}}
+
+Config (all optional): HTTP_TIMEOUT_S (default 30), HTTP_RETRIES (3),
+HTTP_BACKOFF_S (0.5), HTTP_POOL_SIZE (10).
+
+Retries cover connection failures for every method; 429/5xx responses are
+only retried for idempotent methods, so a push is never sent twice.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from src import metrics as run_metrics
+
+DEFAULT_TIMEOUT_S = 30.0
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_S = 0.5
+DEFAULT_POOL_SIZE = 10
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_sessions: Dict[str, "requests.Session"] = {}
+_metrics: Dict[str, dict] = {}
+_lock = threading.Lock()
+
+
+def _setting(name: str, default):
+    try:
+        import config
+        return type(default)(getattr(config, name, default))
+    except ImportError:
+        return default
+
+
+def timeout() -> float:
+    return _setting("HTTP_TIMEOUT_S", DEFAULT_TIMEOUT_S)
+
+
+def retries() -> int:
+    return _setting("HTTP_RETRIES", DEFAULT_RETRIES)
+
+
+def _host(url: str) -> str:
+    return urlsplit(str(url)).netloc or "unknown"
+
+
+def _new_session() -> "requests.Session":
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=retries(),
+        connect=retries(),
+        read=retries(),
+        status=retries(),
+        backoff_factor=_setting("HTTP_BACKOFF_S", DEFAULT_BACKOFF_S),
+        status_forcelist=RETRY_STATUSES,
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool = _setting("HTTP_POOL_SIZE", DEFAULT_POOL_SIZE)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def session_for(url: str) -> "requests.Session":
+    """the pooled session for this URL's host (created on first use)"""
+    host = _host(url)
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = _sessions[host] = _new_session()
+    return session
+
+
+def record(host: str, elapsed_s: float, status: Optional[int], retried: int = 0) -> None:
+    """fold one request into the per-host metrics (status None = transport error)"""
+    with _lock:
+        m = _metrics.setdefault(host, {"requests": 0, "errors": 0, "retries": 0, "status": {}, "total_s": 0.0, "max_s": 0.0})
+        m["requests"] += 1
+        m["retries"] += retried
+        m["total_s"] += elapsed_s
+        m["max_s"] = max(m["max_s"], elapsed_s)
+        if status is None or status >= 400:
+            m["errors"] += 1
+        if status is not None:
+            m["status"][status] = m["status"].get(status, 0) + 1
+    run_metrics.HTTP_REQUESTS.inc(host=host, status="error" if status is None else status)
+    run_metrics.HTTP_SECONDS.observe(elapsed_s, host=host)
+    if retried:
+        run_metrics.HTTP_RETRIES.inc(retried, host=host)
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    kwargs.setdefault("timeout", timeout())
+    t0 = time.perf_counter()
+    try:
+        response = session_for(url).request(method, url, **kwargs)
+    except Exception:
+        record(_host(url), time.perf_counter() - t0, None)
+        raise
+    history = getattr(getattr(getattr(response, "raw", None), "retries", None), "history", None) or ()
+    record(_host(url), time.perf_counter() - t0, response.status_code, len(history))
+    return response
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
+
+
+def httpx_event_hooks() -> Dict[str, list]:
+    """event hooks that feed httpx (Anthropic SDK) requests into the same metrics"""
+    started: Dict[int, float] = {}
+
+    def on_request(req) -> None:
+        started[id(req)] = time.perf_counter()
+
+    def on_response(resp) -> None:
+        t0 = started.pop(id(resp.request), None)
+        record(_host(resp.request.url), time.perf_counter() - t0 if t0 is not None else 0.0, resp.status_code)
+
+    return {"request": [on_request], "response": [on_response]}
+
+
+def metrics() -> Dict[str, dict]:
+    with _lock:
+        return {host: dict(m, status=dict(m["status"])) for host, m in _metrics.items()}
+
+
+def report() -> None:
+    for host, m in sorted(metrics().items()):
+        mean = m["total_s"] / m["requests"] if m["requests"] else 0.0
+        print(f"[transport] host={host} requests={m['requests']} errors={m['errors']} retries={m['retries']} "
+              f"mean={mean * 1000:.0f}ms max={m['max_s'] * 1000:.0f}ms status={m['status']}")
+
+
+def close() -> None:
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
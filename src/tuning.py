@@ -0,0 +1,263 @@
+"""
+Weight / threshold tuning against labelled outcomes.
+
+History is loaded once into column arrays and the per-component scores are
+computed once per SUITABILITY_PARAMS variant. Every candidate weight vector
+is then scored in a single matrix product (nights x components @ components
+x candidates) and compared against every candidate threshold at once, so a
+grid of thousands of settings is ranked in well under a second.
+
+Labels are a CSV of nights we actually shot (or would have):
+    location,date,label
+    Adelaide,2025-11-01,1
+    Adelaide,2025-11-02,0
+`location` is optional; without it a label applies to every location.
+
+Run (from the repo root):
+    python -m src.tuning --labels outcomes.csv --factors 0.5,1,1.5 --top 10
+    python -m src.tuning --labels outcomes.csv --param cloud.x0=10,15,20
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+import config
+from src import curves
+from src.data_store import iter_history, run_epoch
+
+_TRUE_LABELS = {"1", "y", "yes", "true", "go", "shot"}
+_CHUNK = 2048  # candidates scored per matrix product (bounds memory)
+
+
+def _read_csv(path: Path) -> Iterator[dict]:
+    with Path(path).open("r", encoding="utf-8") as f:
+        yield from csv.DictReader(f)
+
+
+def load_history(path: Optional[Path] = None, revision: str = "last") -> Tuple[List[Tuple[str, str]], Dict[str, np.ndarray]]:
+    """
+    read forecast history once into arrays (hot file plus monthly archives
+    unless an explicit `path` is given).
+    revision: "last" | "first" keeps one row per (location, forecast_date); "all" keeps every row.
+    returns (keys, columns) where keys[i] = (location, forecast_date).
+    """
+    fields = [c.field for c in curves.COMPONENTS.values()]
+    picked: Dict[Tuple[str, str], Tuple[float, dict]] = {}
+    rows: List[Tuple[Tuple[str, str], dict]] = []
+    source = _read_csv(path) if path is not None else iter_history(include_archive=True)
+    for row in source:
+        key = (row.get("location") or row.get("city") or "", row.get("forecast_date", ""))
+        if not key[1]:
+            continue
+        if revision == "all":
+            rows.append((key, row))
+            continue
+        ts = run_epoch(row.get("run_timestamp", ""))
+        seen = picked.get(key)
+        if seen is None or (ts > seen[0] if revision == "last" else ts < seen[0]):
+            picked[key] = (ts, row)
+    if revision != "all":
+        rows = [(k, r) for k, (_, r) in picked.items()]
+
+    def num(value, default):
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return default
+
+    columns = {}
+    for field in fields:
+        # dewpoint_risk falls back to 0.0, as in process_weather_data when inputs are missing
+        default = 0.0 if field == "dewpoint_risk" else np.nan
+        columns[field] = np.array([num(r.get(field), default) for _, r in rows], dtype=float)
+    return [k for k, _ in rows], columns
+
+
+def load_labels(path: Path) -> Dict[Tuple[str, str], bool]:
+    """(location or '*', date) -> label"""
+    labels: Dict[Tuple[str, str], bool] = {}
+    with Path(path).open("r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            day = (row.get("date") or row.get("forecast_date") or "").strip()
+            if not day:
+                continue
+            loc = (row.get("location") or "*").strip() or "*"
+            labels[(loc, day)] = str(row.get("label", "")).strip().lower() in _TRUE_LABELS
+    return labels
+
+
+def component_matrix(columns: Dict[str, np.ndarray], names: Sequence[str], params: Optional[Dict[str, dict]] = None) -> np.ndarray:
+    """nights x components score matrix (missing inputs score 0)"""
+    scores = curves.score_columns(columns, components=names, params=params)
+    return np.nan_to_num(np.column_stack([scores[n] for n in names]), nan=0.0)
+
+
+def missing_matrix(columns: Dict[str, np.ndarray], names: Sequence[str]) -> np.ndarray:
+    """nights x components: True where an optional component has no input (site off the raster)"""
+    n = len(next(iter(columns.values()))) if columns else 0
+    missing = np.zeros((n, len(names)), dtype=bool)
+    for j, name in enumerate(names):
+        field = curves.COMPONENTS[name].field
+        if name in curves.OPTIONAL_COMPONENTS and field in columns:
+            missing[:, j] = np.isnan(columns[field])
+    return missing
+
+
+def weight_grid(base: Dict[str, float], names: Sequence[str], factors: Sequence[float], normalise: bool = True) -> np.ndarray:
+    """candidates x components: every combination of base weight * factor"""
+    b = np.array([base[n] for n in names], dtype=float)
+    grid = np.array(list(itertools.product(factors, repeat=len(names))), dtype=float) * b
+    if normalise:
+        totals = grid.sum(axis=1, keepdims=True)
+        grid = np.divide(grid, totals, out=np.zeros_like(grid), where=totals > 0) * b.sum()
+    return np.unique(grid, axis=0)
+
+
+def _counts_at_or_above(bins: np.ndarray, weight: np.ndarray, n_thresholds: int) -> np.ndarray:
+    """chunk x thresholds: sum of `weight` over nights whose score >= each threshold"""
+    n, c = bins.shape
+    flat = (np.arange(c) * (n_thresholds + 1))[None, :] + bins
+    w = np.broadcast_to(weight[:, None], (n, c)).ravel()
+    per_bin = np.bincount(flat.ravel(), weights=w, minlength=c * (n_thresholds + 1)).reshape(c, n_thresholds + 1)
+    # bin b means score >= thresholds[:b]; count for threshold j is the sum of bins > j
+    return np.cumsum(per_bin[:, ::-1], axis=1)[:, ::-1][:, 1:]
+
+
+def evaluate(matrix: np.ndarray, labels: np.ndarray, weights: np.ndarray, thresholds: np.ndarray,
+             missing: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """
+    confusion-derived metrics for every (weight vector, threshold): arrays
+    shaped candidates x thresholds. `thresholds` must be sorted ascending.
+    `missing` (see missing_matrix) spreads an absent optional component's
+    weight over the scored ones, as utils.get_suitability does.
+    """
+    present = (~missing).astype(float) if missing is not None and missing.any() else None
+    y = labels.astype(bool)
+    n_pos = y.sum()
+    pos_w, neg_w = y.astype(float), (~y).astype(float)
+    tp = np.empty((len(weights), len(thresholds)))
+    fp = np.empty_like(tp)
+    for start in range(0, len(weights), _CHUNK):
+        chunk = weights[start:start + _CHUNK]
+        scores = matrix @ chunk.T                                   # nights x chunk
+        if present is not None:
+            scored = present @ chunk.T                              # weight actually scored per night
+            scores *= np.divide(chunk.sum(axis=1), scored, out=np.ones_like(scores), where=scored > 0)
+        bins = np.searchsorted(thresholds, scores, side="right")    # thresholds passed per score
+        tp[start:start + _CHUNK] = _counts_at_or_above(bins, pos_w, len(thresholds))
+        fp[start:start + _CHUNK] = _counts_at_or_above(bins, neg_w, len(thresholds))
+    tn = len(y) - n_pos - fp
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.nan_to_num(tp / (tp + fp))
+        recall = np.nan_to_num(tp / n_pos) if n_pos else np.zeros_like(tp)
+        f1 = np.nan_to_num(2 * precision * recall / (precision + recall))
+    return {"f1": f1, "precision": precision, "recall": recall, "accuracy": (tp + tn) / len(y)}
+
+
+def rank(metrics: Dict[str, np.ndarray], top: int) -> List[Tuple[int, int]]:
+    """top (weight index, threshold index) pairs by F1 then accuracy"""
+    order = np.lexsort((-metrics["accuracy"].ravel(), -metrics["f1"].ravel()))[:top]
+    return [tuple(int(i) for i in np.unravel_index(o, metrics["f1"].shape)) for o in order]
+
+
+def _param_variants(specs: Iterable[str]) -> List[Dict[str, dict]]:
+    """'cloud.x0=10,15,20' -> one SUITABILITY_PARAMS copy per combination"""
+    axes = []
+    for spec in specs:
+        path, values = spec.split("=", 1)
+        group, name = path.split(".", 1)
+        axes.append([(group, name, float(v)) for v in values.split(",")])
+    variants = []
+    for combo in itertools.product(*axes):
+        params = {k: dict(v) for k, v in config.SUITABILITY_PARAMS.items()}
+        for group, name, value in combo:
+            params[group][name] = value
+        variants.append(params)
+    return variants
+
+
+def tune(
+    labels_path: Path,
+    history_path: Optional[Path] = None,
+    factors: Sequence[float] = (0.5, 1.0, 1.5),
+    thresholds: Sequence[float] = tuple(range(40, 95, 5)),
+    param_specs: Sequence[str] = (),
+    revision: str = "last",
+    top: int = 10,
+) -> List[dict]:
+    keys, columns = load_history(history_path, revision)
+    labels = load_labels(labels_path)
+    mask, y = [], []
+    for loc, day in keys:
+        label = labels.get((loc, day), labels.get(("*", day)))
+        mask.append(label is not None)
+        y.append(bool(label))
+    mask = np.array(mask, dtype=bool)
+    if not mask.any():
+        raise ValueError("no labelled nights found in history")
+    y = np.array(y, dtype=bool)[mask]
+    columns = {k: v[mask] for k, v in columns.items()}
+
+    names = [n for n in config.WEIGHTS if n in curves.COMPONENTS]
+    weights = weight_grid(config.WEIGHTS, names, factors)
+    missing = missing_matrix(columns, names)
+    thr = np.sort(np.asarray(thresholds, dtype=float))
+    print(f"[tuning] nights={int(mask.sum())} positives={int(y.sum())} "
+          f"weight_candidates={len(weights)} thresholds={len(thr)}")
+
+    results: List[dict] = []
+    for params in _param_variants(param_specs):
+        metrics = evaluate(component_matrix(columns, names, params), y, weights, thr, missing)
+        for wi, ti in rank(metrics, top):
+            results.append({
+                "f1": float(metrics["f1"][wi, ti]),
+                "precision": float(metrics["precision"][wi, ti]),
+                "recall": float(metrics["recall"][wi, ti]),
+                "accuracy": float(metrics["accuracy"][wi, ti]),
+                "threshold": float(thr[ti]),
+                "weights": dict(zip(names, (round(float(w), 4) for w in weights[wi]))),
+                "params": params,
+            })
+    results.sort(key=lambda r: (-r["f1"], -r["accuracy"]))
+    return results[:top]
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description="Rank WEIGHTS / NOTIFY_THRESHOLD candidates against labelled nights")
+    parser.add_argument("--labels", type=Path, required=True)
+    parser.add_argument("--history", type=Path, default=None, help="single CSV (default: hot history + archives)")
+    parser.add_argument("--factors", default="0.5,1,1.5", help="multipliers applied to each config.WEIGHTS entry")
+    parser.add_argument("--thresholds", default="40:95:5", help="start:stop:step")
+    parser.add_argument("--param", action="append", default=[], help="SUITABILITY_PARAMS axis, e.g. cloud.x0=10,15,20")
+    parser.add_argument("--revision", choices=("last", "first", "all"), default="last")
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    start, stop, step = (float(x) for x in args.thresholds.split(":"))
+    t0 = datetime.now()
+    results = tune(
+        args.labels,
+        args.history,
+        factors=[float(x) for x in args.factors.split(",")],
+        thresholds=np.arange(start, stop, step),
+        param_specs=args.param,
+        revision=args.revision,
+        top=args.top,
+    )
+    print(f"[tuning] ranked in {(datetime.now() - t0).total_seconds():.2f}s")
+    for i, r in enumerate(results, 1):
+        print(f"{i:3d}. f1={r['f1']:.3f} acc={r['accuracy']:.3f} p={r['precision']:.3f} "
+              f"r={r['recall']:.3f} threshold={r['threshold']:.0f} weights={r['weights']}")
+        if args.param:
+            print(f"     params={r['params']}")
+
+
+if __name__ == "__main__":
+    main()
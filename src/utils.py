@@ -1,6 +1,9 @@
 from __future__ import print_function
 from datetime import datetime, timedelta
 import config, numpy as np
+from src import curves
+
+WINDOW_HOURS = 5  # observation window length, from sunset + 1h floored to the hour
 
 # simple run-time status banner
 def log(msg):
@@ -31,11 +34,21 @@ def process_weather_data(weather_data):
         return sunset_time, moonrise_time, moonset_time
 
     results = []
-    mins_per_hour = 60
+    window_minutes = WINDOW_HOURS * 60
     log("processing weather data...")
 
     try:
-        for daily_forecast in weather_data["forecast"]["forecastday"]:
+        forecastdays = weather_data["forecast"]["forecastday"]
+        # one timeline across all days (any resolution) so the observation
+        # window can run past midnight; each night is two binary searches
+        samples = [h for d in forecastdays for h in d["hour"]]
+        times = np.array([h["time"] for h in samples], dtype="datetime64[m]")
+        if len(times) > 1 and (np.diff(times) < np.timedelta64(0, "m")).any():
+            order = np.argsort(times, kind="stable")
+            times = times[order]
+            samples = [samples[i] for i in order]
+
+        for daily_forecast in forecastdays:
             astro = daily_forecast["astro"]
             day = daily_forecast["day"]
             date = daily_forecast["date"]
@@ -46,14 +59,16 @@ def process_weather_data(weather_data):
                 continue
 
             rounded_time = (sunset_time + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
-            hour_data = {h["time"]: h for h in daily_forecast["hour"]}
-            temp_time_str = rounded_time.strftime("%Y-%m-%d %H:%M")
+            window_end = rounded_time + timedelta(minutes=window_minutes)
+            start64 = np.datetime64(rounded_time, "m")
+            lo = int(np.searchsorted(times, start64, side="left"))
+            hi = int(np.searchsorted(times, np.datetime64(window_end, "m"), side="left"))
 
-            if temp_time_str not in hour_data:
+            if lo >= len(times) or times[lo] != start64:
                 log(f"{date}: no hourly match near sunset, skipping")
                 continue
 
-            selected_hour = hour_data[temp_time_str]
+            selected_hour = samples[lo]
             temp_c = selected_hour["temp_c"]
             if mintemp_c is None or selected_hour["dewpoint_c"] is None:
                 dewpoint_risk = 0.0
@@ -63,32 +78,18 @@ def process_weather_data(weather_data):
             humidity = selected_hour["humidity"]
             visibility_km = selected_hour["vis_km"]
 
-            cloud_vals, dew_vals = [], []
-            total_visible_minutes = 0
+            window = samples[lo:hi]
+            cloud_vals = [h["cloud"] for h in window]
+            dew_vals = [h["dewpoint_c"] for h in window]
 
-            for i in range(5):
-                hour = rounded_time + timedelta(hours=i)
-                key = hour.strftime("%Y-%m-%d %H:%M")
-                if key not in hour_data:
-                    continue
-                h = hour_data[key]
-                cloud_vals.append(h["cloud"])
-                dew_vals.append(h["dewpoint_c"])
-                if moonrise_time or moonset_time:
-                    start, end = hour, hour + timedelta(hours=1)
-                    if moonrise_time and moonset_time:
-                        if moonrise_time < end and moonset_time > start:
-                            visible_start = max(moonrise_time, start)
-                            visible_end = min(moonset_time, end)
-                            total_visible_minutes += (visible_end - visible_start).total_seconds() / 60
-                    elif moonrise_time and not moonset_time and moonrise_time < end:
-                        # moon rose earlier and hasn't set — clamp visible_start to window boundary
-                        visible_start = max(moonrise_time, start)
-                        total_visible_minutes += (end - visible_start).total_seconds() / 60
-                    elif not moonrise_time and moonset_time and moonset_time > start:
-                        # moon already up at window start — clamp visible_end to window boundary
-                        visible_end = min(moonset_time, end)
-                        total_visible_minutes += (visible_end - start).total_seconds() / 60
+            # moon above the horizon: one interval intersection with the window.
+            # a missing rise means it was already up; a missing set means it stays up.
+            total_visible_minutes = 0
+            if moonrise_time or moonset_time:
+                visible_start = max(moonrise_time or rounded_time, rounded_time)
+                visible_end = min(moonset_time or window_end, window_end)
+                if visible_end > visible_start:
+                    total_visible_minutes = (visible_end - visible_start).total_seconds() / 60
 
             if cloud_vals:
                 avg_cloud, min_cloud, max_cloud = (
@@ -105,7 +106,7 @@ def process_weather_data(weather_data):
             else:
                 avg_dewpoint = min_dewpoint = None
 
-            moon_presence_percent = (total_visible_minutes / (5 * mins_per_hour)) * 100
+            moon_presence_percent = (total_visible_minutes / window_minutes) * 100
             moon_illum = astro.get("moon_illumination")
 
             results.append({
@@ -143,33 +144,23 @@ def process_weather_data(weather_data):
 def calculate_suitability_data(processed_data):
     """Models suitability scores for each condition."""
 
-    def log_function(x, A, B, k, x0, condition=None):
-        inside = k * (x - x0)
-        if inside <= 0:
-            return 0
-        return A * np.log(inside) + B
-
-    def logistic_function(x, L, k, x0, condition=None):
-        output = L / (1 + pow(2.71828, -k * (x - x0)))
-        if output > 100:
-            output = 100
-        limits = {1: 30, 2: 50, 3: 40, 4: 40, 5: 6}
-        if condition in limits and x >= limits[condition]:
-            return 0
-        return output
-
-    s = {
-        "date": processed_data["date"],
-        "avg_cloud": logistic_function(processed_data["avg_cloud"], **config.SUITABILITY_PARAMS["cloud"], condition=1),
-        "min_cloud": logistic_function(processed_data["min_cloud"], **config.SUITABILITY_PARAMS["cloud"], condition=1),
-        "max_cloud": logistic_function(processed_data["max_cloud"], **config.SUITABILITY_PARAMS["cloud"], condition=1),
-        "moon_presence": logistic_function(processed_data["moon_presence"], **config.SUITABILITY_PARAMS["moon_presence"], condition=2),
-        "moon_illumination": logistic_function(processed_data["moon_illumination"], **config.SUITABILITY_PARAMS["moon_presence"], condition=3),
-        "wind_speed": logistic_function(processed_data["wind_speed_kph"], **config.SUITABILITY_PARAMS["wind_speed"], condition=4),
-        "humidity": logistic_function(processed_data["humidity"], **config.SUITABILITY_PARAMS["humidity"]),
-        "visibility": log_function(processed_data["visibility_km"], **config.SUITABILITY_PARAMS["visibility"]),
-        "dewpoint_risk": logistic_function(processed_data["dewpoint_risk"], **config.SUITABILITY_PARAMS["dewpoint_risk"], condition=5),
-    }
+    params = config.SUITABILITY_PARAMS
+    evaluator = curves.get_evaluator() if curves.curve_mode() == "table" else None
+
+    s = {"date": processed_data["date"]}
+    for name, comp in curves.COMPONENTS.items():
+        if name in curves.OPTIONAL_COMPONENTS:
+            x = processed_data.get(comp.field)
+            if x is None or comp.params not in params:
+                continue
+        else:
+            x = processed_data[comp.field]
+        if evaluator is not None:
+            s[name] = float(evaluator.component(name, x))
+        elif comp.kind == "log":
+            s[name] = curves.log_curve(x, **params[comp.params])
+        else:
+            s[name] = curves.logistic(x, **params[comp.params], cutoff=comp.cutoff)
 
     # multiline readability log
     log(f"{s['date']}: component suitability:")
@@ -182,7 +173,15 @@ def calculate_suitability_data(processed_data):
 
 def get_suitability(s):
     """Combines weighted scores."""
-    total = sum(s[c]*config.WEIGHTS[c] for c in s if c in config.WEIGHTS)
+    weights = config.WEIGHTS
+    total = sum(s[c]*weights[c] for c in s if c in weights)
+    # a configured optional component with no value here (site off the raster):
+    # spread its weight over the scored components so totals stay comparable
+    missing = sum(weights.get(c, 0.0) for c in curves.OPTIONAL_COMPONENTS
+                  if c not in s and c in config.SUITABILITY_PARAMS)
+    scored = sum(weights[c] for c in s if c in weights)
+    if missing and scored:
+        total *= (scored + missing) / scored
     log(f"{s['date']}: total suitability={total:.1f}")
     return total
 
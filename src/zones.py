@@ -0,0 +1,63 @@
+"""
+Per-location time zones.
+
+A location's zone is, in order: an optional third field on its
+config.LOCATIONS coords, config.LOCATION_TIMEZONES[city], then
+config.DEFAULT_TZ (Australia/Adelaide when unset):
+
+    LOCATIONS = {
+        "Adelaide": "-34.9285,138.6007",
+        "Perth":    "-31.9523,115.8613,Australia/Perth",
+    }
+
+ZoneInfo objects are built once per zone name. Runs group their locations
+by zone (batch_by_zone) and convert the run time once per batch, so promise
+windows, weekend dates and history timestamps are all in each site's local
+time without per-location conversions. One process serves every zone: a
+zone's batch only runs while its own promise window is open, so a cron
+line every half hour through the evening handles each zone at its local
+time (main.py --zone limits a run to one zone).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Tuple
+from zoneinfo import ZoneInfo
+
+DEFAULT_TZ = "Australia/Adelaide"
+
+
+def _config():
+    try:
+        import config
+        return config
+    except ImportError:
+        return None
+
+
+@lru_cache(maxsize=None)
+def zone(name: str) -> ZoneInfo:
+    """the ZoneInfo for `name`, built once per process"""
+    return ZoneInfo(name)
+
+
+def default_tz() -> str:
+    return getattr(_config(), "DEFAULT_TZ", None) or DEFAULT_TZ
+
+
+def parse_location(city: str, coords: str) -> Tuple[float, float, str]:
+    """(lat, lon, tz name) for a config.LOCATIONS entry"""
+    parts = [p.strip() for p in coords.split(",")]
+    lat, lon = float(parts[0]), float(parts[1])
+    if len(parts) > 2 and parts[2]:
+        return lat, lon, parts[2]
+    overrides = getattr(_config(), "LOCATION_TIMEZONES", None) or {}
+    return lat, lon, overrides.get(city) or default_tz()
+
+
+def batch_by_zone(cities: Iterable[str], locations: Mapping[str, str]) -> Dict[str, List[str]]:
+    """zone name -> its cities (first-seen order, each city once)"""
+    batches: Dict[str, List[str]] = {}
+    for city in dict.fromkeys(cities):
+        batches.setdefault(parse_location(city, locations[city])[2], []).append(city)
+    return batches
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import calibration, data_store
+from tests.test_data_store import ADEL_TZ, HistoryStoreTestCase
+
+
+def run(day: datetime, nights, cloud_for):
+    """one run's rows: cloud_for(night, lead) gives the forecast cloud"""
+    return [
+        {"date": n.isoformat(), "suitability_score": 50.0, "avg_cloud": cloud_for(n, (n - day.date()).days),
+         "wind_speed_kph": 10.0, "humidity": 50.0}
+        for n in nights
+    ]
+
+
+class CalibrationTests(HistoryStoreTestCase):
+    def setUp(self):
+        super().setUp()
+        self.original_path = calibration.CALIBRATION_PATH
+        calibration.CALIBRATION_PATH = data_store.DATA_DIR / "calibration.json"
+
+    def tearDown(self):
+        calibration.CALIBRATION_PATH = self.original_path
+        super().tearDown()
+
+    def write_week(self, start: datetime):
+        # the forecast for each night is off by 10 points per day of lead
+        nights = [(start + timedelta(days=d)).date() for d in range(7)]
+        for r in range(7):
+            day = start + timedelta(days=r)
+            data_store.append_forecast_history(
+                "Adelaide", day.isoformat(), run(day, [n for n in nights if n >= day.date()], lambda n, lead: 20.0 + 10 * lead), None
+            )
+
+    def test_update_reads_only_new_rows_and_survives_compaction(self):
+        start = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        self.write_week(start)
+        first = calibration.update(date(2025, 9, 8))
+        self.assertEqual(first["pending"], {})
+        n_lead3, bias, _ = first["stats"]["avg_cloud"]["3"]
+        self.assertEqual(n_lead3, 4)
+        self.assertAlmostEqual(bias, 30.0)
+
+        self.write_week(start + timedelta(weeks=1))
+        data_store.compact_history(start + timedelta(weeks=1), hot_weeks=1)  # rewrites the hot file
+        second = calibration.update(date(2025, 9, 15))
+        self.assertEqual(second["stats"]["avg_cloud"]["3"][0], 8)  # no row counted twice
+        self.assertEqual(calibration.rebuild(date(2025, 9, 15))["stats"], second["stats"])
+
+    def test_watermark_orders_runs_across_utc_offsets(self):
+        adelaide = datetime(2025, 9, 8, 19, 30, tzinfo=ADEL_TZ)                     # 10:00Z
+        perth = datetime(2025, 9, 8, 19, 0, tzinfo=ZoneInfo("Australia/Perth"))    # 11:00Z, sorts lower as a string
+        data_store.append_forecast_history("Adelaide", adelaide.isoformat(), run(adelaide, [date(2025, 9, 12)], lambda n, lead: 20.0), None)
+        calibration.update(date(2025, 9, 8))
+
+        # hot file rewritten (as compaction does), then a later run from another zone
+        data_store._write_atomic(data_store.HISTORY_PATH, data_store.HISTORY_FIELDS, list(data_store.iter_history()))
+        data_store.append_forecast_history("Perth", perth.isoformat(), run(perth, [date(2025, 9, 12)], lambda n, lead: 30.0), None)
+        state = calibration.update(date(2025, 9, 8))
+        self.assertIn("Perth|2025-09-12", state["pending"])
+        self.assertEqual(state["watermark"], perth.isoformat())
+        self.assertEqual(len(state["pending"]["Adelaide|2025-09-12"]), 1)  # not re-read after the rewrite
+
+    def test_interval_widens_with_lead_time(self):
+        state = calibration._empty_state()
+        for lead, sigma in ((1, 5.0), (5, 25.0)):
+            for x in (-sigma, sigma) * 5:
+                calibration._fold(state["stats"]["avg_cloud"].setdefault(str(lead), [0, 0.0, 0.0]), x)
+        scored = [
+            {"date": "2025-09-02", "suitability_score": 60.0, "avg_cloud": 15.0, "min_cloud": 10.0, "max_cloud": 20.0},
+            {"date": "2025-09-06", "suitability_score": 60.0, "avg_cloud": 15.0, "min_cloud": 10.0, "max_cloud": 20.0},
+        ]
+        calibration.attach_confidence(scored, run_date=date(2025, 9, 1), state=state)
+        near, far = (d["score_high"] - d["score_low"] for d in scored)
+        self.assertGreater(near, 0)
+        self.assertGreater(far, near)
+        self.assertEqual(scored[1]["lead_days"], 5)
+
+        calibration.attach_confidence(scored, run_date=date(2025, 9, 1), state=calibration._empty_state())
+        self.assertEqual(scored[0]["score_low"], scored[0]["score_high"])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import config
+from src import curves
+
+
+TEST_PARAMS = {
+    "cloud": {"L": 100, "k": -0.2, "x0": 15},
+    "moon_presence": {"L": 100, "k": -0.1, "x0": 30},
+    "wind_speed": {"L": 100, "k": -0.2, "x0": 25},
+    "humidity": {"L": 110, "k": -0.1, "x0": 80},
+    "visibility": {"A": 30, "B": 10, "k": 1, "x0": 0},
+    "dewpoint_risk": {"L": 100, "k": -1, "x0": 3},
+    "sky_brightness": {"L": 100, "k": 2.0, "x0": 20.0},
+}
+
+
+class CurveEvaluatorTests(unittest.TestCase):
+    def setUp(self):
+        self.original_params = getattr(config, "SUITABILITY_PARAMS", None)
+        config.SUITABILITY_PARAMS = {k: dict(v) for k, v in TEST_PARAMS.items()}
+
+    def tearDown(self):
+        config.SUITABILITY_PARAMS = self.original_params
+
+    def _exact(self, name, xs):
+        comp = curves.COMPONENTS[name]
+        p = config.SUITABILITY_PARAMS[comp.params]
+        if comp.kind == "log":
+            return np.array([curves.log_curve(x, **p) for x in xs], dtype=float)
+        return np.array([curves.logistic(x, **p, cutoff=comp.cutoff) for x in xs], dtype=float)
+
+    def test_vectorised_exact_matches_scalar(self):
+        for name, comp in curves.COMPONENTS.items():
+            xs = np.linspace(comp.domain[0] - 5, comp.domain[1] + 5, 997)
+            got = curves.score_columns({comp.field: xs}, mode="exact", components=[name])[name]
+            np.testing.assert_allclose(got, self._exact(name, xs), rtol=0, atol=1e-9, err_msg=name)
+
+    def test_table_within_guaranteed_error(self):
+        evaluator = curves.get_evaluator(max_error=0.01)
+        self.assertLessEqual(evaluator.max_error, 0.01)
+        for name, comp in curves.COMPONENTS.items():
+            xs = np.linspace(comp.domain[0] - 5, comp.domain[1] + 5, 20011)
+            err = np.abs(evaluator.component(name, xs) - self._exact(name, xs)).max()
+            self.assertLessEqual(err, evaluator.max_error + 1e-9, name)
+
+    def test_evaluator_rebuilt_when_params_change(self):
+        first = curves.get_evaluator()
+        self.assertIs(curves.get_evaluator(), first)
+        config.SUITABILITY_PARAMS["cloud"]["x0"] = 20
+        second = curves.get_evaluator()
+        self.assertIsNot(second, first)
+        got = second.component("avg_cloud", np.array([20.0]))[0]
+        self.assertAlmostEqual(got, 50.0, delta=second.max_error)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
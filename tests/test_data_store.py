@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import csv
+import multiprocessing
+import sys
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import data_store
+
+ADEL_TZ = ZoneInfo("Australia/Adelaide")
+PATH_ATTRS = ("DATA_DIR", "HISTORY_PATH", "ARCHIVE_DIR", "SUMMARY_PATH", "LOCK_PATH", "INDEX_PATH")
+
+
+def scored_week(start: datetime, base_score: float):
+    return [
+        {"date": (start + timedelta(days=i)).date().isoformat(), "suitability_score": base_score + i}
+        for i in range(7)
+    ]
+
+
+class HistoryStoreTestCase(unittest.TestCase):
+    """points every data_store path at a scratch directory"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        self.originals = {a: getattr(data_store, a) for a in PATH_ATTRS}
+        data_store.DATA_DIR = root
+        data_store.HISTORY_PATH = root / "forecast_history.csv"
+        data_store.ARCHIVE_DIR = root / "archive"
+        data_store.SUMMARY_PATH = root / "forecast_summary.csv"
+        data_store.LOCK_PATH = root / "forecast_history.lock"
+        data_store.INDEX_PATH = root / "history_index.json"
+
+    def tearDown(self):
+        for attr, value in self.originals.items():
+            setattr(data_store, attr, value)
+        self.tmp.cleanup()
+
+
+class RetentionTests(HistoryStoreTestCase):
+    def test_compaction_keeps_hot_weeks_and_archives_the_rest(self):
+        first_monday = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        for week in range(6):
+            run = first_monday + timedelta(weeks=week)
+            data_store.append_forecast_history("Adelaide", run.isoformat(), scored_week(run, week * 10), "monday")
+        now = first_monday + timedelta(weeks=5)
+
+        archived = data_store.compact_history(now, hot_weeks=2)
+
+        self.assertEqual(archived, 4 * 7)
+        self.assertEqual(len(list(data_store.iter_history())), 2 * 7)
+        self.assertEqual(len(list(data_store.iter_history(include_archive=True))), 6 * 7)
+        self.assertTrue(data_store.monday_notified_this_week("Adelaide", now))
+        self.assertEqual(data_store.compact_history(now, hot_weeks=2), 0)
+
+    def test_compaction_after_a_crash_does_not_archive_twice(self):
+        first_monday = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        for week in range(3):
+            run = first_monday + timedelta(weeks=week)
+            data_store.append_forecast_history("Adelaide", run.isoformat(), scored_week(run, week * 10), "monday")
+        # a compaction that archived week one, then died before rewriting the hot file
+        week_one = [r for r in data_store.iter_history() if r["run_timestamp"] == first_monday.isoformat()]
+        data_store.ARCHIVE_DIR.mkdir(parents=True)
+        data_store._archive_locked("2025-09", week_one)
+
+        now = first_monday + timedelta(weeks=2)
+        self.assertEqual(data_store.compact_history(now, hot_weeks=2), 7)
+        archived = list(data_store.iter_history(include_archive=True))
+        self.assertEqual(len(archived), 3 * 7)
+        self.assertEqual(len({(r["run_timestamp"], r["forecast_date"]) for r in archived}), 3 * 7)
+        self.assertFalse(list(data_store.ARCHIVE_DIR.glob("*.tmp")))
+
+    def test_archived_nights_keep_their_summary(self):
+        first_monday = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        for week in range(4):
+            run = first_monday + timedelta(weeks=week)
+            data_store.append_forecast_history("Adelaide", run.isoformat(), scored_week(run, week * 10), "monday")
+        data_store.compact_history(first_monday + timedelta(weeks=3), hot_weeks=2)
+        self.assertEqual(float(data_store.read_summary("Adelaide", "2025-09-01")["first_score"]), 0.0)
+        self.assertEqual(float(data_store.read_summary("Adelaide", "2025-09-15")["first_score"]), 20.0)
+
+    def test_appends_rewrite_only_their_forecast_months(self):
+        run = datetime(2025, 9, 29, 19, 30, tzinfo=ADEL_TZ)
+        data_store.append_forecast_history("Adelaide", run.isoformat(), scored_week(run, 50), "monday")
+        september, october = data_store.summary_path("2025-09"), data_store.summary_path("2025-10")
+        self.assertEqual((september.exists(), october.exists()), (True, True))
+        before = september.stat().st_mtime_ns, september.stat().st_ino
+
+        later = run + timedelta(days=2)
+        data_store.append_forecast_history("Adelaide", later.isoformat(), [{"date": "2025-10-04", "suitability_score": 70.0}], None)
+        self.assertEqual((september.stat().st_mtime_ns, september.stat().st_ino), before)
+        self.assertEqual(int(data_store.read_summary("Adelaide", "2025-10-04")["revisions"]), 2)
+
+    def test_single_file_summary_is_split_by_month(self):
+        with data_store.SUMMARY_PATH.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=data_store.SUMMARY_FIELDS)
+            writer.writeheader()
+            writer.writerow({"location": "Adelaide", "forecast_date": "2025-08-30", "first_run": "2025-08-25T19:30:00+09:30",
+                             "first_score": "40", "last_run": "2025-08-27T19:30:00+09:30", "last_score": "55", "revisions": "2"})
+        self.assertEqual(data_store.read_summary("Adelaide", "2025-08-30")["last_score"], "55")  # readable before the split
+
+        run = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        data_store.append_forecast_history("Adelaide", run.isoformat(), scored_week(run, 0), "monday")
+        self.assertFalse(data_store.SUMMARY_PATH.exists())
+        self.assertEqual(data_store.read_summary("Adelaide", "2025-08-30")["last_score"], "55")
+
+    def test_summary_tracks_first_and_last_forecast(self):
+        monday = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        wednesday = monday + timedelta(days=2)
+        night = [{"date": "2025-09-06", "suitability_score": 40.0}]
+        data_store.append_forecast_history("Adelaide", monday.isoformat(), night, "monday")
+        data_store.append_forecast_history("Adelaide", wednesday.isoformat(), [dict(night[0], suitability_score=75.0)], "wednesday")
+
+        entry = data_store.read_summary("Adelaide", "2025-09-06")
+        self.assertEqual(entry["first_run"], monday.isoformat())
+        self.assertEqual(float(entry["first_score"]), 40.0)
+        self.assertEqual(entry["last_run"], wednesday.isoformat())
+        self.assertEqual(float(entry["last_score"]), 75.0)
+        self.assertEqual(int(entry["revisions"]), 2)
+
+
+class SchemaTests(HistoryStoreTestCase):
+    def test_sky_brightness_is_recorded(self):
+        run = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        night = {"date": "2025-09-06", "suitability_score": 70.0, "sky_brightness": 21.5}
+        data_store.append_forecast_history("Adelaide", run.isoformat(), [night, {"date": "2025-09-07"}], "monday")
+        rows = list(data_store.iter_history())
+        self.assertEqual([r["sky_brightness"] for r in rows], ["21.5", ""])  # off the raster stays empty
+
+    def test_a_hot_file_with_an_older_header_is_upgraded_on_append(self):
+        old_fields = [f for f in data_store.HISTORY_FIELDS if f != "sky_brightness"]
+        with data_store.HISTORY_PATH.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=old_fields)
+            writer.writeheader()
+            writer.writerow({"run_timestamp": "2025-08-25T19:30:00+09:30", "location": "Adelaide",
+                             "promise_window": "monday", "forecast_date": "2025-08-30", "suitability_score": "40"})
+
+        run = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        data_store.append_forecast_history("Adelaide", run.isoformat(), [{"date": "2025-09-06", "sky_brightness": 21.5}], "monday")
+        rows = list(data_store.iter_history())
+        self.assertEqual([(r["forecast_date"], r["sky_brightness"]) for r in rows], [("2025-08-30", ""), ("2025-09-06", "21.5")])
+        self.assertNotIn(None, rows[1])  # no spill-over columns
+
+
+class WindowIndexTests(HistoryStoreTestCase):
+    def test_monday_snapshot_is_served_from_the_index(self):
+        monday = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+        data_store.append_forecast_history("Adelaide", monday.isoformat(), scored_week(monday, 50), "monday")
+        data_store.append_forecast_history("Adelaide", (monday + timedelta(days=1)).isoformat(), scored_week(monday, 0), None)
+        wednesday = monday + timedelta(days=2)
+
+        snapshot = data_store.window_snapshot("Adelaide", wednesday, "monday")
+        self.assertEqual(float(snapshot["2025-09-05"]["suitability_score"]), 54.0)
+        self.assertIsNone(data_store.window_snapshot("Adelaide", wednesday + timedelta(weeks=1), "monday"))
+        self.assertIsNone(data_store.window_snapshot("Elsewhere", wednesday, "monday"))
+
+        data_store.HISTORY_PATH.unlink()  # the notify path no longer needs the CSV
+        self.assertTrue(data_store.monday_notified_this_week("Adelaide", wednesday))
+
+
+def _concurrent_writer(root: str, city: str, runs: int) -> None:
+    root_path = Path(root)
+    data_store.DATA_DIR = root_path
+    data_store.HISTORY_PATH = root_path / "forecast_history.csv"
+    data_store.SUMMARY_PATH = root_path / "forecast_summary.csv"
+    data_store.LOCK_PATH = root_path / "forecast_history.lock"
+    data_store.INDEX_PATH = root_path / "history_index.json"
+    start = datetime(2025, 9, 1, 19, 30, tzinfo=ADEL_TZ)
+    for i in range(runs):
+        run = start + timedelta(minutes=i)
+        with data_store.HistoryWriter() as history:
+            history.add(city, run.isoformat(), scored_week(run, i), "monday")
+            history.add(city, run.isoformat(), scored_week(run, i), "monday")  # second subscriber, same run
+
+
+class ConcurrentWriteTests(HistoryStoreTestCase):
+    def test_overlapping_writers_produce_one_header_and_whole_rows(self):
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_concurrent_writer, args=(self.tmp.name, f"Site{i}", 20)) for i in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+
+        with data_store.HISTORY_PATH.open("r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        self.assertEqual(sum(1 for line in lines if line.startswith("run_timestamp,")), 1)
+        rows = list(csv.DictReader(lines))
+        self.assertEqual(len(rows), 4 * 20 * 7)
+        self.assertTrue(all(len(r) == len(data_store.HISTORY_FIELDS) and None not in r for r in rows))
+        summary = data_store.read_summary("Site0", "2025-09-01")
+        self.assertEqual(int(summary["revisions"]), 20)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+try:
+    import astral.sun  # noqa: F401
+    # test_promise_flow installs a stand-in astral when the real one is missing
+    HAVE_ASTRAL = getattr(sys.modules["astral"], "__file__", None) is not None
+except ImportError:
+    HAVE_ASTRAL = False
+
+from src import ephemeris, metrics
+
+ADELAIDE = (-34.9285, 138.6007)
+PERTH = (-31.9523, 115.8613)
+START = date(2025, 3, 1)
+
+
+def minutes(text: str) -> int:
+    t = datetime.strptime(text, "%I:%M %p")
+    return t.hour * 60 + t.minute
+
+
+@unittest.skipUnless(HAVE_ASTRAL, "astral is not installed")
+class EphemerisTests(unittest.TestCase):
+    def setUp(self):
+        from src.moon_utils import get_moon_sun_times
+        self.astral = get_moon_sun_times
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_dir = ephemeris.DATA_DIR
+        ephemeris.DATA_DIR = Path(self.tmp.name)
+        ephemeris._tables.clear()
+        metrics.reset()
+
+    def tearDown(self):
+        ephemeris.DATA_DIR = self.original_dir
+        ephemeris._tables.clear()
+        metrics.reset()
+        self.tmp.cleanup()
+
+    def assertMatchesAstral(self, row: dict, expected: dict):
+        for field in ("sunrise", "sunset", "moonrise", "moonset"):
+            if expected[field] is None:
+                self.assertIsNone(row[field], field)
+            else:
+                self.assertLessEqual(abs(minutes(row[field]) - minutes(expected[field])), 1, field)
+        self.assertAlmostEqual(row["illumination"], expected["illumination"], delta=0.05)
+
+    def test_table_hit_matches_astral(self):
+        ephemeris.save_table(*ADELAIDE, START, ephemeris.build_table(*ADELAIDE, START, 14))
+        for offset in (0, 6, 13):
+            day = START + timedelta(days=offset)
+            row = ephemeris.get_astro(*ADELAIDE, day)
+            self.assertIn("dusk", row)  # only the table carries twilight
+            self.assertMatchesAstral(row, self.astral(*ADELAIDE, day))
+        self.assertEqual(metrics.CACHE.value(cache="ephemeris", result="hit"), 3)
+
+    def test_dates_outside_the_table_fall_back_to_astral(self):
+        ephemeris.save_table(*ADELAIDE, START, ephemeris.build_table(*ADELAIDE, START, 7))
+        for day in (START - timedelta(days=1), START + timedelta(days=7)):
+            self.assertIsNone(ephemeris.lookup(*ADELAIDE, day))
+            self.assertEqual(ephemeris.get_astro(*ADELAIDE, day), self.astral(*ADELAIDE, day))
+        self.assertIsNone(ephemeris.lookup(*PERTH, START))  # no table for this site at all
+        self.assertEqual(metrics.CACHE.value(cache="ephemeris", result="miss"), 2)
+
+    def test_tables_are_per_zone(self):
+        perth = "Australia/Perth"
+        ephemeris.save_table(*PERTH, START, ephemeris.build_table(*PERTH, START, 7, tz=perth), tz=perth)
+        day = START + timedelta(days=2)
+        self.assertIsNone(ephemeris.lookup(*PERTH, day))  # default zone: not this table
+        row = ephemeris.get_astro(*PERTH, day, tz=perth)
+        self.assertIn("dusk", row)
+        self.assertMatchesAstral(row, self.astral(*PERTH, day, tz=perth))
+        self.assertLess(minutes(row["sunrise"]), 7 * 60)  # Perth local time, not Adelaide's
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src.forecast_store import STORE_FIELDS, ForecastStore
+
+
+def night(day: str, score: float, cloud: float) -> dict:
+    return {"date": day, "suitability_score": score, "avg_cloud": cloud}
+
+
+class ForecastStoreTests(unittest.TestCase):
+    def test_ring_keeps_the_newest_revisions_in_order(self):
+        store = ForecastStore(budget_bytes=1 << 20, revisions=4)
+        for i in range(6):
+            store.add("Adelaide", f"2025-02-{10 + i:02d}T19:30:00+10:30", [night("2025-02-21", 50 + i, 40 - 5 * i)])
+        scores = store.revisions_of("Adelaide", "2025-02-21")
+        self.assertEqual(list(scores), [52, 53, 54, 55])
+        self.assertEqual(list(store.revisions_of("Adelaide", "2025-02-21", last=2)), [54, 55])
+
+    def test_repeat_of_latest_run_is_ignored(self):
+        store = ForecastStore(budget_bytes=1 << 20, revisions=4)
+        run = "2025-02-17T19:30:00+10:30"
+        store.add("Adelaide", run, [night("2025-02-21", 60, 20)])
+        self.assertEqual(store.add("Adelaide", run, [night("2025-02-21", 60, 20)]), 0)
+        self.assertEqual(len(store.revisions_of("Adelaide", "2025-02-21")), 1)
+
+    def test_memory_budget_bounds_nights_and_evicts_least_recent(self):
+        revisions = 8
+        per_night = revisions * (len(STORE_FIELDS) * 4 + 8)
+        store = ForecastStore(budget_bytes=3 * per_night, revisions=revisions)
+        self.assertEqual(store.capacity, 3)
+        for d in range(1, 6):
+            store.add("Adelaide", "2025-02-17T19:30:00+10:30", [night(f"2025-02-{d:02d}", 50, 20)])
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.evicted, 2)
+        self.assertNotIn(("Adelaide", "2025-02-01"), store)
+        self.assertIn(("Adelaide", "2025-02-05"), store)
+
+    def test_stability_and_cloud_trend(self):
+        store = ForecastStore(budget_bytes=1 << 20, revisions=8)
+        for i, (score, cloud) in enumerate([(40, 60), (55, 40), (70, 20), (85, 0)]):
+            store.add("Adelaide", f"2025-02-{17 + i}T19:30:00+10:30", [night("2025-02-21", score, cloud)])
+        s = store.stability("Adelaide", "2025-02-21")
+        self.assertEqual(s["revisions"], 4)
+        self.assertEqual(s["spread"], 45)
+        t = store.trend("Adelaide", "2025-02-21", "avg_cloud")
+        self.assertAlmostEqual(t["slope"], -20.0, places=4)
+        self.assertEqual(t["change"], -60)
+        self.assertIsNone(store.night_context("Adelaide", "2025-02-22"))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import leaderboard, main
+from src.forecast_store import ForecastStore
+
+MONDAY = datetime(2025, 2, 17, 19, 30, tzinfo=main.ADEL_TZ)
+WEDNESDAY = MONDAY + timedelta(days=2)
+FRI, SAT, SUN = (date(2025, 2, 21) + timedelta(days=i) for i in range(3))
+
+
+def weekend(fri: float, sat: float, sun: float) -> list:
+    return [{"date": d.isoformat(), "suitability_score": s, "avg_cloud": 10.0, "moon_presence": 0.0}
+            for d, s in ((FRI, fri), (SAT, sat), (SUN, sun))]
+
+
+class TopNightsTests(unittest.TestCase):
+    def test_keeps_the_best_k_across_sites(self):
+        candidates = [("A", {"date": FRI, "score": 40.0}), ("B", {"date": SAT, "score": 90.0}),
+                      ("A", {"date": SUN, "score": 75.0}), ("C", {"date": FRI, "score": 75.0}),
+                      ("C", {"date": SAT, "score": 10.0})]
+        ranked = leaderboard.top_nights(candidates, 3)
+        # ties on score go to the earlier night
+        self.assertEqual([(n["site"], n["date"]) for n in ranked], [("B", SAT), ("C", FRI), ("A", SUN)])
+        self.assertNotIn("site", candidates[1][1])  # inputs untouched
+
+    def test_fewer_candidates_than_k(self):
+        self.assertEqual(leaderboard.top_nights([], 3), [])
+        self.assertEqual(len(leaderboard.top_nights([("A", {"date": FRI, "score": 1.0})], 3)), 1)
+
+
+class NotifyLeaderboardTests(unittest.TestCase):
+    def setUp(self):
+        self.original = (main.monday_notified_this_week, main.monday_snapshot)
+        self.sent, self.generated = [], []
+        self.scored = {"Adelaide": weekend(50, 60, 70), "Clare": weekend(95, 20, 30), "Goolwa": weekend(10, 80, 15)}
+
+    def tearDown(self):
+        main.monday_notified_this_week, main.monday_snapshot = self.original
+
+    def notify(self, now):
+        def generate(city, rule_label, nights, threshold=60.0):
+            self.generated.append(nights)
+            return main.build_promise_message(city, rule_label, nights)
+
+        return main.notify_leaderboard(
+            self.scored, list(self.scored), "Ethan", "u1", now,
+            send=lambda key, message, user_name="user": self.sent.append(message),
+            generate=generate, store=ForecastStore(budget_bytes=64 * 1024),
+        )
+
+    def test_monday_sends_one_ranked_message(self):
+        self.assertEqual(self.notify(MONDAY), 3)
+        self.assertEqual(self.sent, ["Top sites weekend outlook — Clare Fri:95 · Goolwa Sat:80 · Adelaide Sun:70"])
+        self.assertEqual(len(self.generated), 1)
+
+    def test_wednesday_lists_only_materially_changed_sites(self):
+        main.monday_notified_this_week = lambda city, now: city != "Goolwa"
+        monday = {"Adelaide": weekend(50, 60, 70), "Clare": weekend(40, 20, 30)}
+        main.monday_snapshot = lambda city, now: {r["date"]: r for r in monday.get(city, [])}
+        self.notify(WEDNESDAY)
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(self.sent[0], "Top sites updated forecast — Clare Fri 40→95 ✓ · Clare Sun steady 30 · Clare Sat steady 20")
+        self.assertNotIn("Adelaide", self.sent[0])  # unchanged since Monday
+        self.assertNotIn("Goolwa", self.sent[0])    # no Monday notification
+        self.assertEqual(self.generated, [])        # delta, not a fresh outlook
+
+    def test_wednesday_without_a_monday_snapshot_sends_the_full_leaderboard(self):
+        main.monday_notified_this_week = lambda city, now: True
+        main.monday_snapshot = lambda city, now: None
+        self.assertEqual(self.notify(WEDNESDAY), 3)
+        self.assertEqual(self.sent, ["Top sites updated forecast — Clare Fri:95 · Goolwa Sat:80 · Adelaide Sun:70"])
+        self.assertEqual(len(self.generated), 1)
+        self.assertNotIn("new", self.sent[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
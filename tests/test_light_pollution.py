@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import config
+from src import light_pollution, utils
+
+
+class SkyRasterTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        # 4 x 5 cells of 0.5 deg from (-34, 138); row 0 is the northern edge
+        grid = np.arange(20, dtype=np.float32).reshape(4, 5) * 0.25 + 17.0
+        grid[3, 4] = -1.0  # nodata
+        self.path = light_pollution.write_raster(Path(self.tmp.name) / "sky.bin", grid, 138.0, -34.0, 0.5)
+        self.original_path = light_pollution.RASTER_PATH
+        light_pollution.RASTER_PATH = self.path
+        light_pollution._raster_path = None
+        self.original_params, self.original_weights = config.SUITABILITY_PARAMS, config.WEIGHTS
+
+    def tearDown(self):
+        light_pollution.RASTER_PATH = self.original_path
+        light_pollution._raster_path = light_pollution._raster = None
+        config.SUITABILITY_PARAMS, config.WEIGHTS = self.original_params, self.original_weights
+        self.tmp.cleanup()
+
+    def test_samples_cells_from_the_memory_map(self):
+        raster = light_pollution.get_raster()
+        self.assertIsInstance(raster.grid, np.memmap)
+        self.assertEqual(raster.sample(-34.1, 138.1), 17.0)
+        self.assertEqual(raster.sample(-35.2, 139.3), 17.0 + 0.25 * (2 * 5 + 2))
+        self.assertIsNone(raster.sample(-35.9, 140.4))   # nodata
+        self.assertIsNone(raster.sample(-33.9, 138.1))   # north of the raster
+        lats, lons = np.array([-34.1, -35.2, -40.0]), np.array([138.1, 139.3, 138.1])
+        np.testing.assert_array_equal(raster.sample_many(lats, lons), [17.0, 20.0, np.nan])
+
+    def test_site_lookup_is_cached(self):
+        light_pollution.site_brightness(-34.9285, 138.6007)
+        light_pollution.site_brightness(-34.9285, 138.6007)
+        info = light_pollution._cached_brightness.cache_info()
+        self.assertEqual((info.hits, info.misses), (1, 1))
+
+    def test_component_scores_only_when_configured(self):
+        night = {"date": "2025-02-21", "avg_cloud": 5.0, "min_cloud": 0.0, "max_cloud": 10.0,
+                 "moon_presence": 0.0, "moon_illumination": 0.0, "wind_speed_kph": 8.0, "humidity": 40.0,
+                 "visibility_km": 20.0, "dewpoint_risk": 2.0,
+                 "sky_brightness": light_pollution.site_brightness(-35.2, 139.3)}
+        self.assertNotIn("sky_brightness", utils.calculate_suitability_data(night))
+
+        config.SUITABILITY_PARAMS = dict(config.SUITABILITY_PARAMS, sky_brightness={"L": 100, "k": 2.0, "x0": 20.0})
+        config.WEIGHTS = dict(config.WEIGHTS, sky_brightness=0.1)
+        scores = utils.calculate_suitability_data(night)
+        self.assertAlmostEqual(scores["sky_brightness"], 50.0, places=3)   # SQM 20 is the curve midpoint
+        self.assertNotIn("sky_brightness", utils.calculate_suitability_data(dict(night, sky_brightness=None)))
+
+    def test_sites_off_the_raster_keep_the_full_weight(self):
+        config.SUITABILITY_PARAMS = dict(config.SUITABILITY_PARAMS, sky_brightness={"L": 100, "k": 2.0, "x0": 20.0})
+        config.WEIGHTS = {"avg_cloud": 0.6, "sky_brightness": 0.4}
+        inside = {"date": "2025-02-21", "avg_cloud": 80.0, "sky_brightness": 50.0}
+        self.assertAlmostEqual(utils.get_suitability(inside), 80.0 * 0.6 + 50.0 * 0.4)
+        outside = {"date": "2025-02-21", "avg_cloud": 80.0}
+        self.assertAlmostEqual(utils.get_suitability(outside), 80.0)  # not 80 * 0.6
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import message_builder
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeAnthropic:
+    """test double for anthropic.Anthropic: canned text and usage, advances a fake clock per call"""
+
+    def __init__(self, clock: FakeClock, text="Saturday looks great", latency_ms=0.0, fail=False):
+        self.requests = []
+        self.clock, self.text, self.latency_ms, self.fail = clock, text, latency_ms, fail
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **kwargs):
+        self.requests.append(kwargs)
+        self.clock.now += self.latency_ms / 1000.0
+        if self.fail:
+            raise RuntimeError("boom")
+        usage = SimpleNamespace(input_tokens=60, output_tokens=30,
+                                cache_creation_input_tokens=0, cache_read_input_tokens=400)
+        return SimpleNamespace(content=[SimpleNamespace(type="text", text=self.text)], usage=usage)
+
+
+NIGHTS = [
+    {"date": date(2025, 2, 21), "score": 40.0, "avg_cloud": 60.0, "raw": {}},
+    {"date": date(2025, 2, 22), "score": 85.0, "avg_cloud": 5.0,
+     "raw": {"score_low": 72.0, "score_high": 93.0, "moon_presence": 0.0, "wind_speed_kph": 8.0}},
+    {"date": date(2025, 2, 23), "score": 55.0, "avg_cloud": 30.0, "raw": {}},
+]
+
+
+class MessageBudgetTests(unittest.TestCase):
+    def setUp(self):
+        self.original_client, self.original_budget = message_builder._client, message_builder._budget
+        self.original_clock = message_builder._clock
+        self.clock = message_builder._clock = FakeClock()
+
+    def tearDown(self):
+        message_builder._client, message_builder._budget = self.original_client, self.original_budget
+        message_builder._clock = self.original_clock
+
+    def use(self, client, **budget):
+        message_builder._client = client
+        message_builder._budget = message_builder.MessageBudget(**budget)
+        return message_builder._budget
+
+    def generate(self):
+        return message_builder.generate_notification_message("Adelaide", "weekend outlook", NIGHTS, threshold=70.0)
+
+    def test_short_static_prompt_is_sent_uncached_with_a_minimal_payload(self):
+        client = FakeAnthropic(self.clock)
+        budget = self.use(client)
+        self.assertEqual(self.generate(), "Saturday looks great")
+
+        request = client.requests[0]
+        self.assertEqual(request["system"][0]["text"], message_builder.SYSTEM_PROMPT)
+        self.assertNotIn("cache_control", request["system"][0])  # too short for the model to cache
+        payload = request["messages"][0]["content"]
+        self.assertTrue(payload.startswith("threshold 70\n"))
+        self.assertIn("Sat 85 GOOD likely 72-93", payload)
+        self.assertLess(len(payload), 400)
+        self.assertLess(len(message_builder.SYSTEM_PROMPT), 3000)
+
+        call = budget.calls[0]
+        self.assertEqual((call["input"], call["output"], call["cache_read"]), (60, 30, 400))
+        self.assertGreater(call["cost_usd"], 0)
+
+    def test_a_prefix_long_enough_to_cache_is_marked(self):
+        original = message_builder.SYSTEM_PROMPT
+        message_builder.SYSTEM_PROMPT = "rules " * message_builder.DEFAULT_CACHE_MIN_TOKENS
+        try:
+            client = FakeAnthropic(self.clock)
+            self.use(client)
+            self.generate()
+        finally:
+            message_builder.SYSTEM_PROMPT = original
+        self.assertEqual(client.requests[0]["system"][0]["cache_control"], {"type": "ephemeral"})
+
+    def test_cost_budget_switches_to_template(self):
+        client = FakeAnthropic(self.clock)
+        budget = self.use(client, cost_budget_usd=0.001)  # one call costs ~0.0012
+        self.generate()
+        self.assertEqual(self.generate(), "Adelaide weekend outlook — Fri:40 · Sat:85 · Sun:55")
+        self.assertEqual(len(client.requests), 1)
+        self.assertEqual(budget.summary()["templates"], 1)
+
+    def test_slow_calls_switch_to_template(self):
+        client = FakeAnthropic(self.clock, latency_ms=12000)
+        self.use(client, latency_budget_ms=5000)
+        self.generate()
+        self.assertIn("Sat:85", self.generate())
+        self.assertEqual(len(client.requests), 1)
+
+    def test_slow_calls_age_out_and_the_model_is_tried_again(self):
+        client = FakeAnthropic(self.clock, latency_ms=12000)
+        budget = self.use(client, latency_budget_ms=5000)
+        self.generate()
+        client.latency_ms = 800  # the API recovers
+        replies = [self.generate() for _ in range(message_builder._LATENCY_WINDOW + 2)]
+        self.assertEqual(budget.templates, message_builder._LATENCY_WINDOW)  # until the slow call leaves the window
+        self.assertEqual(replies[-2:], ["Saturday looks great"] * 2)
+        self.assertEqual(len(client.requests), 3)
+
+    def test_failure_falls_back(self):
+        budget = self.use(FakeAnthropic(self.clock, fail=True))
+        self.assertIn("Sat:85", self.generate())
+        summary = budget.summary()
+        self.assertEqual((summary["ai_calls"], summary["templates"]), (0, 1))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
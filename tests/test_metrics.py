@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import multiprocessing
+import sys
+import tempfile
+import unittest
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import metrics
+
+
+def _concurrent_run(path: str, runs: int) -> None:
+    for _ in range(runs):
+        metrics.reset()
+        metrics.PUSHES.inc(outcome="sent")
+        metrics.write_textfile(Path(path))
+
+
+class MetricsTests(unittest.TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = Path(self.tmp.name) / "star_signal.prom"
+
+    def tearDown(self):
+        metrics.reset()
+        self.tmp.cleanup()
+
+    def test_exposition_format(self):
+        metrics.PUSHES.inc(outcome="sent")
+        metrics.FETCH_SECONDS.observe(0.3, provider="visualcrossing")
+        text = metrics.render()
+        self.assertIn("# TYPE star_signal_pushes_total counter\nstar_signal_pushes_total{outcome=\"sent\"} 1\n", text)
+        self.assertIn('star_signal_fetch_seconds_bucket{provider="visualcrossing",le="0.25"} 0', text)
+        self.assertIn('star_signal_fetch_seconds_bucket{provider="visualcrossing",le="0.5"} 1', text)
+        self.assertIn('star_signal_fetch_seconds_bucket{provider="visualcrossing",le="+Inf"} 1', text)
+        self.assertIn('star_signal_fetch_seconds_count{provider="visualcrossing"} 1', text)
+        self.assertNotIn("star_signal_nights_scored_total", text)  # nothing observed, nothing rendered
+        with self.assertRaises(ValueError):
+            metrics.PUSHES.inc(status="sent")
+
+    def test_textfile_counters_accumulate_across_runs(self):
+        metrics.MESSAGES.inc(kind="ai")
+        metrics.RUN_SECONDS.set(12.0, mode="promise")
+        metrics.write_textfile(self.path)
+
+        metrics.reset()  # next cron run: a fresh process
+        metrics.MESSAGES.inc(kind="ai")
+        metrics.MESSAGES.inc(kind="fallback")
+        metrics.RUN_SECONDS.set(3.0, mode="nowcast")
+        text = metrics.write_textfile(self.path).read_text(encoding="utf-8")
+        self.assertIn('star_signal_messages_total{kind="ai"} 2', text)
+        self.assertIn('star_signal_messages_total{kind="fallback"} 1', text)
+        self.assertIn('star_signal_run_seconds{mode="promise"} 12', text)  # kept: not set by this run
+        self.assertIn('star_signal_run_seconds{mode="nowcast"} 3', text)
+
+    def test_overlapping_runs_keep_every_increment(self):
+        ctx = multiprocessing.get_context("fork")
+        procs = [ctx.Process(target=_concurrent_run, args=(str(self.path), 10)) for _ in range(4)]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join()
+            self.assertEqual(p.exitcode, 0)
+        self.assertIn('star_signal_pushes_total{outcome="sent"} 40\n', self.path.read_text(encoding="utf-8"))
+
+    def test_serves_the_textfile_over_http(self):
+        self.path.write_text("star_signal_nights_scored_total 7\n", encoding="utf-8")
+        server = metrics.serve(0, path=self.path)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertEqual(response.read().decode("utf-8"), "star_signal_nights_scored_total 7\n")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import main, nowcast
+
+ASTRO = {"sunrise": "06:30 AM", "sunset": "07:30 PM", "moonrise": None, "moonset": None, "illumination": 0.0}
+
+
+def window_payload(start: datetime, end: datetime, cloud: float) -> dict:
+    """weatherapi-like payload holding only the requested hours"""
+    hours, t = [], start
+    while t <= end:
+        hours.append({"time": t.strftime("%Y-%m-%d %H:%M"), "temp_c": 14.0, "dewpoint_c": 6.0,
+                      "wind_kph": 8.0, "humidity": 50.0, "vis_km": 20.0, "cloud": cloud})
+        t += timedelta(hours=1)
+    day = start.date().isoformat()
+    return {"forecast": {"forecastday": [{
+        "date": day,
+        "day": {"mintemp_c": 5.0, "maxtemp_c": 20.0},
+        "astro": {"sunset": "07:30 PM", "moonrise": "No moonrise", "moonset": "No moonset", "moon_illumination": 0.0},
+        "hour": hours,
+    }]}}
+
+
+class NowcastTests(unittest.TestCase):
+    def setUp(self):
+        self.original_astro = nowcast.get_astro
+        self.original_snapshot = nowcast.window_snapshot
+        nowcast.get_astro = lambda lat, lon, day, tz=None: ASTRO
+        self.snapshots = {}
+        nowcast.window_snapshot = lambda city, now, window: self.snapshots.get(window)
+        self.now = datetime(2025, 2, 21, 17, 0, tzinfo=main.ADEL_TZ)  # Friday evening
+        self.tonight = self.now.date().isoformat()
+        self.requests = []
+        self.zones = []
+        self.sent = []
+
+    def tearDown(self):
+        nowcast.get_astro = self.original_astro
+        nowcast.window_snapshot = self.original_snapshot
+
+    def fetch(self, cloud):
+        def _fetch(lat, lon, start, end, tz=None):
+            self.requests.append((start, end))
+            self.zones.append(tz)
+            return window_payload(start, end, cloud)
+        return _fetch
+
+    def run_nowcast(self, cloud):
+        return nowcast.run_nowcast(
+            self.now, {"Ethan": "u1", "Sam": "u2"}, {"Adelaide": "-34.9285,138.6007"},
+            fetch=self.fetch(cloud),
+            send=lambda key, message, user_name="user": self.sent.append((user_name, message)),
+        )
+
+    def test_requests_only_the_observation_window(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "90"}}
+        self.run_nowcast(cloud=5.0)
+        self.assertEqual(self.requests, [(datetime(2025, 2, 21, 20, 0), datetime(2025, 2, 22, 1, 0))])
+
+    def test_go_pushed_to_every_subscriber_when_score_crosses_up(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "40"}}
+        counts = self.run_nowcast(cloud=0.0)
+        self.assertEqual(counts["crossed"], 1)
+        self.assertEqual(len(self.requests), 1)  # one fetch per location, not per subscriber
+        self.assertEqual([u for u, _ in self.sent], ["Ethan", "Sam"])
+        self.assertIn("Adelaide tonight — GO · score 40→", self.sent[0][1])
+
+    def test_no_go_uses_latest_recorded_score(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "20"}}
+        self.snapshots["wednesday"] = {self.tonight: {"suitability_score": "85"}}
+        self.run_nowcast(cloud=100.0)
+        self.assertEqual(len(self.sent), 2)
+        self.assertIn("NO-GO · score 85→", self.sent[0][1])
+
+    def test_nothing_sent_without_a_crossing(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "20"}}
+        counts = self.run_nowcast(cloud=100.0)
+        self.assertEqual(counts["refreshed"], 1)
+        self.assertEqual(self.sent, [])
+
+    def test_unselected_night_is_not_fetched(self):
+        counts = self.run_nowcast(cloud=0.0)
+        self.assertEqual(counts["refreshed"], 0)
+        self.assertEqual(self.requests, [])
+
+    def test_one_push_per_user_across_their_sites_and_zones(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "40"}}
+        nowcast.run_nowcast(
+            self.now, {"Ethan": "u1", "Sam": "u2"},
+            {"Adelaide": "-34.9285,138.6007", "Perth": "-31.9523,115.8613,Australia/Perth"},
+            fetch=self.fetch(0.0),
+            send=lambda key, message, user_name="user": self.sent.append((user_name, message)),
+            subscriptions={"Ethan": ["Adelaide", "Perth"], "Sam": ["Perth"]},
+        )
+        self.assertEqual(len(self.requests), 2)
+        self.assertEqual([u for u, _ in self.sent], ["Ethan", "Sam"])
+        self.assertEqual([line.split()[0] for line in self.sent[0][1].splitlines()], ["Adelaide", "Perth"])
+        self.assertTrue(self.sent[1][1].startswith("Perth tonight — GO"))
+
+    def test_windows_are_fetched_in_the_site_zone(self):
+        self.snapshots["monday"] = {self.tonight: {"suitability_score": "90"}}
+        nowcast.run_nowcast(
+            self.now, {"Ethan": "u1"}, {"Perth": "-31.9523,115.8613,Australia/Perth"},
+            fetch=self.fetch(5.0), send=lambda *a, **k: None, only_zones=["Australia/Perth"],
+        )
+        self.assertEqual(self.zones, ["Australia/Perth"])
+
+    def test_fetch_window_converts_in_the_given_zone(self):
+        original = nowcast.fetch_visualcrossing_raw, nowcast._vc_to_weatherapi_like
+        converted = []
+        nowcast.fetch_visualcrossing_raw = lambda lat, lon, **kw: {"timezone": "Australia/Adelaide", "days": []}
+        nowcast._vc_to_weatherapi_like = lambda raw, lat, lon, tz=None: converted.append(tz) or {}
+        try:
+            start = datetime(2025, 2, 21, 20, 0)
+            nowcast.fetch_window(-31.9523, 115.8613, start, start + timedelta(hours=5), tz="Australia/Perth")
+        finally:
+            nowcast.fetch_visualcrossing_raw, nowcast._vc_to_weatherapi_like = original
+        self.assertEqual(converted, ["Australia/Perth"])
+
+    def test_offline_nowcast_runs_end_to_end(self):
+        original = main._offline_send
+        pushed = []
+        main._offline_send = lambda key, message, user_name="user": pushed.append(message)
+        self.snapshots["monday"] = {"2025-10-31": {"suitability_score": "100"}}  # tonight was selected
+        try:
+            main.main(["--offline", "--nowcast", "--now", "2025-10-31T17:00"])
+        finally:
+            main._offline_send = original
+        self.assertEqual(len(pushed), len(main.config.USERS))
+        self.assertIn("Adelaide tonight — NO-GO · score 100→", pushed[0])  # test.json scores that night low
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import contextlib
+import io
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import profiling, utils
+from src.providers import OfflineProvider
+
+
+class StageProfilerTests(unittest.TestCase):
+    def test_profiled_offline_stages_write_stats_stacks_and_summary(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        out_dir = Path(tmp.name) / "run"
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            with profiling.StageProfiler(out_dir, profile=True, sample_interval=0.0005) as profiler:
+                with profiling.stage("main"):
+                    for _ in range(5):
+                        with profiling.stage("fetch"):
+                            data = OfflineProvider().fetch(-34.9285, 138.6007)
+                        with profiling.stage("process"):
+                            utils.process_weather_data(data)
+            profiler.write(top=5)
+
+        for name in ("main", "fetch", "process"):
+            self.assertTrue((out_dir / f"{name}.prof").stat().st_size > 0)
+            self.assertIn("cumulative", (out_dir / f"{name}.txt").read_text(encoding="utf-8"))
+        self.assertEqual(profiler.summary()["fetch"]["count"], 5)
+
+        lines = (out_dir / "stacks.collapsed").read_text(encoding="utf-8").splitlines()
+        self.assertTrue(lines)
+        for line in lines:
+            # "frame;frame;... count": the count follows the last space
+            stack, count = line.rsplit(" ", 1)
+            self.assertTrue(count.isdigit(), line)
+            self.assertTrue(all(stack.split(";")), line)
+        self.assertTrue(any(line.startswith("stage:main;stage:fetch;") for line in lines))
+
+        printed = stdout.getvalue()
+        self.assertIn("[profile] top 5 hotspots by own time:", printed)
+        self.assertEqual(len(re.findall(r"^\[profile\] +[\d.]+ms own .* calls  \[\w+\] ", printed, re.M)), 5)
+
+    def test_stage_is_a_no_op_without_an_active_profiler(self):
+        self.assertIsNone(profiling.active())
+        with profiling.stage("fetch"):
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -102,6 +102,7 @@ class PromiseNotificationHarness(unittest.TestCase):
         self.original_send = main.notifs.send_push_notification
         self.original_append = main.append_forecast_history
         self.original_monday_check = main.monday_notified_this_week
+        self.original_monday_snapshot = main.monday_snapshot
 
         from src import data_store
         self.data_store = data_store
@@ -109,6 +110,8 @@ class PromiseNotificationHarness(unittest.TestCase):
 
         # default: Monday was NOT notified (tests that need it set self._monday_notified = True)
         self._monday_notified = False
+        # Monday's recorded nights for the Wednesday diff (None = not indexed, send full message)
+        self._monday_snapshot = None
 
         def fake_send(user_key, message, user_name="user"):
             self.notifications.append({"user": user_name, "key": user_key, "message": message})
@@ -137,11 +140,16 @@ class PromiseNotificationHarness(unittest.TestCase):
         main.append_forecast_history = fake_append
         data_store.append_forecast_history = fake_append
         main.monday_notified_this_week = fake_monday_check
+        main.monday_snapshot = lambda city, now: self._monday_snapshot
+        self.original_get_store = main.get_store
+        main.get_store = lambda: main.ForecastStore(budget_bytes=64 * 1024)
 
     def tearDown(self):
         main.notifs.send_push_notification = self.original_send
         main.append_forecast_history = self.original_append
         main.monday_notified_this_week = self.original_monday_check
+        main.monday_snapshot = self.original_monday_snapshot
+        main.get_store = self.original_get_store
         main.generate_notification_message = self.original_generate_message
         self.data_store.append_forecast_history = self.original_append_module
 
@@ -206,6 +214,61 @@ class PromiseNotificationHarness(unittest.TestCase):
         scored_days = build_weekend_dataset(run_time, score=78.0, avg_cloud=15.0)
         self.run_scenario("Wednesday follow-up (Monday not sent)", run_time, scored_days, 0)
 
+    def _snapshot(self, run_time, scores):
+        """Monday snapshot for the upcoming weekend with the given Fri/Sat/Sun scores."""
+        return {
+            d.isoformat(): {"suitability_score": str(score), "avg_cloud": "15.0"}
+            for d, score in zip(main.upcoming_weekend_dates(run_time), scores)
+        }
+
+    def test_wednesday_suppressed_when_nothing_material_changed(self):
+        """Wednesday sends nothing when scores moved less than DIFF_SCORE_DELTA and none crossed the threshold."""
+        self._monday_notified = True
+        run_time = datetime(2025, 2, 19, 19, 30, tzinfo=main.ADEL_TZ)
+        self._monday_snapshot = self._snapshot(run_time, (80.0, 75.0, 82.0))
+        scored_days = build_weekend_dataset(run_time, score=78.0, avg_cloud=15.0)
+        self.run_scenario("Wednesday follow-up (no change)", run_time, scored_days, 0)
+
+    def test_wednesday_sends_delta_when_a_night_changed(self):
+        """A material score change produces a compact before→after delta message."""
+        self._monday_notified = True
+        run_time = datetime(2025, 2, 19, 19, 30, tzinfo=main.ADEL_TZ)
+        self._monday_snapshot = self._snapshot(run_time, (40.0, 76.0, 79.0))
+        scored_days = build_weekend_dataset(run_time, score=78.0, avg_cloud=15.0)
+        notes = self.run_scenario("Wednesday follow-up (Friday improved)", run_time, scored_days, 3)
+        self.assertIn("updated forecast", notes[0]["message"])
+        self.assertIn("Fri 40→78", notes[0]["message"])
+        self.assertIn("Sat steady 78", notes[0]["message"])
+
+    def _store_with(self, city, runs):
+        """populated forecast store: runs is [(run_time, score)], as run_pipeline records them"""
+        store = main.ForecastStore(budget_bytes=64 * 1024)
+        weekend_of = runs[-1][0]
+        for run_time, score in runs:
+            store.add(city, run_time.isoformat(), build_weekend_dataset(weekend_of, score=score, avg_cloud=15.0))
+        main.get_store = lambda: store
+
+    def test_wednesday_crossing_is_not_hidden_by_its_own_revision(self):
+        """66→74 across a threshold of 70: this run's revision must not widen the noise band that gates it."""
+        self._monday_notified = True
+        monday = datetime(2025, 2, 17, 19, 30, tzinfo=main.ADEL_TZ)
+        run_time = datetime(2025, 2, 19, 19, 30, tzinfo=main.ADEL_TZ)
+        self._monday_snapshot = self._snapshot(run_time, (66.0, 66.0, 66.0))
+        self._store_with("Adelaide", [(monday, 66.0), (run_time, 74.0)])  # added before notify, as in run_pipeline
+        scored_days = build_weekend_dataset(run_time, score=74.0, avg_cloud=15.0)
+        notes = self.run_scenario("Wednesday crossing (one prior revision)", run_time, scored_days, 3)
+        self.assertIn("Fri 66→74 ✓", notes[0]["message"])
+
+    def test_wednesday_crossing_inside_prior_noise_is_suppressed(self):
+        """with enough noisy earlier revisions, a crossing that lands inside their std is not material."""
+        self._monday_notified = True
+        run_time = datetime(2025, 2, 19, 19, 30, tzinfo=main.ADEL_TZ)
+        priors = [(run_time - timedelta(days=d), s) for d, s in ((4, 55.0), (3, 85.0), (2, 66.0))]
+        self._monday_snapshot = self._snapshot(run_time, (66.0, 66.0, 66.0))
+        self._store_with("Adelaide", priors + [(run_time, 74.0)])
+        scored_days = build_weekend_dataset(run_time, score=74.0, avg_cloud=15.0)
+        self.run_scenario("Wednesday crossing (noisy history)", run_time, scored_days, 0)
+
     def test_outside_schedule_no_window(self):
         """Runs on Tuesday or any off-schedule time send nothing."""
         run_time = datetime(2025, 2, 18, 19, 30, tzinfo=main.ADEL_TZ)  # Tuesday
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import config
+from src import provider_vc, providers
+from src.providers import ReplayProvider, SyntheticProvider, VisualCrossingProvider
+
+ADELAIDE = (-34.9285, 138.6007)
+
+
+class ReplayTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.original_fetch = providers.fetch_visualcrossing_raw
+        self.requests = []
+
+    def tearDown(self):
+        providers.fetch_visualcrossing_raw = self.original_fetch
+        self.tmp.cleanup()
+
+    def record(self, start: date, lat: float = ADELAIDE[0], lon: float = ADELAIDE[1]) -> dict:
+        """one live fetch, served by the synthetic generator, recorded under the replay root"""
+        def fake_raw(lat, lon, days=7, resolution_minutes=60):
+            self.requests.append((lat, lon, days))
+            return SyntheticProvider(start=start).raw(lat, lon, days, resolution_minutes)
+
+        providers.fetch_visualcrossing_raw = fake_raw
+        return VisualCrossingProvider(record=True, replay_root=self.root).fetch(lat, lon, days=7)
+
+    def test_recorded_payload_replays_identically(self):
+        live = self.record(date(2025, 2, 17))
+        self.assertTrue((self.root / "-34.9285_138.6007" / "2025-02-17.json").exists())
+        self.assertEqual(ReplayProvider(root=self.root).fetch(*ADELAIDE, days=7), live)
+        self.assertEqual(len(self.requests), 1)  # replay never goes to the network
+
+    def test_replay_truncates_to_the_requested_days(self):
+        self.record(date(2025, 2, 17))
+        days = ReplayProvider(root=self.root).fetch(*ADELAIDE, days=3)["forecast"]["forecastday"]
+        self.assertEqual([d["date"] for d in days], ["2025-02-17", "2025-02-18", "2025-02-19"])
+
+    def test_as_of_picks_the_latest_recording_not_after_it(self):
+        self.record(date(2025, 2, 10))
+        self.record(date(2025, 2, 17))
+
+        def first_day(provider):
+            return provider.fetch(*ADELAIDE, days=1)["forecast"]["forecastday"][0]["date"]
+
+        self.assertEqual(first_day(ReplayProvider(root=self.root)), "2025-02-17")
+        self.assertEqual(first_day(ReplayProvider(root=self.root, as_of=date(2025, 2, 15))), "2025-02-10")
+        self.assertEqual(first_day(ReplayProvider(root=self.root, as_of=date(2025, 2, 17))), "2025-02-17")
+        with self.assertRaises(FileNotFoundError):
+            ReplayProvider(root=self.root, as_of=date(2025, 2, 1)).fetch(*ADELAIDE)
+
+    def test_recordings_are_keyed_by_site(self):
+        self.record(date(2025, 2, 17))
+        with self.assertRaises(FileNotFoundError):
+            ReplayProvider(root=self.root).fetch(-31.9523, 115.8613)
+
+    def test_nothing_is_recorded_unless_asked(self):
+        providers.fetch_visualcrossing_raw = lambda lat, lon, days=7, resolution_minutes=60: SyntheticProvider().raw(lat, lon, days)
+        VisualCrossingProvider(record=False, replay_root=self.root).fetch(*ADELAIDE)
+        self.assertEqual(list(self.root.iterdir()), [])
+
+
+class SyntheticTests(unittest.TestCase):
+    def test_honours_days_and_resolution(self):
+        provider = SyntheticProvider(start=date(2025, 2, 17))
+        days = provider.fetch(*ADELAIDE, days=3, resolution_minutes=15)["forecast"]["forecastday"]
+        self.assertEqual(len(days), 3)
+        self.assertEqual(len(days[0]["hour"]), 24 * 4)
+        self.assertEqual([h["time"][-5:] for h in days[0]["hour"][:5]], ["00:00", "00:15", "00:30", "00:45", "01:00"])
+        hourly = provider.fetch(*ADELAIDE, days=2)["forecast"]["forecastday"]
+        self.assertEqual([len(d["hour"]) for d in hourly], [24, 24])
+
+    def test_is_deterministic_per_site(self):
+        a = SyntheticProvider(start=date(2025, 2, 17)).raw(*ADELAIDE)
+        self.assertEqual(a, SyntheticProvider(start=date(2025, 2, 17)).raw(*ADELAIDE))
+        self.assertNotEqual(a, SyntheticProvider(start=date(2025, 2, 17)).raw(-31.9523, 115.8613))
+
+
+class GetProviderTests(unittest.TestCase):
+    def setUp(self):
+        self.original_offline = provider_vc.OFFLINE_TESTING
+        self.had_setting = hasattr(config, "FORECAST_PROVIDER")
+        self.original_setting = getattr(config, "FORECAST_PROVIDER", None)
+
+    def tearDown(self):
+        provider_vc.OFFLINE_TESTING = self.original_offline
+        if self.had_setting:
+            config.FORECAST_PROVIDER = self.original_setting
+        elif hasattr(config, "FORECAST_PROVIDER"):
+            del config.FORECAST_PROVIDER
+
+    def test_resolves_names_and_passes_options(self):
+        self.assertIsInstance(providers.get_provider("synthetic", seed=3), SyntheticProvider)
+        self.assertEqual(providers.get_provider("synthetic", seed=3).seed, 3)
+        self.assertEqual(providers.get_provider("replay", as_of=date(2025, 2, 17)).as_of, date(2025, 2, 17))
+        self.assertEqual(providers.get_provider("offline").name, "offline")
+
+    def test_default_follows_config_then_offline_testing(self):
+        config.FORECAST_PROVIDER = "synthetic"
+        self.assertEqual(providers.get_provider().name, "synthetic")
+        config.FORECAST_PROVIDER = None
+        provider_vc.OFFLINE_TESTING = True
+        self.assertEqual(providers.get_provider().name, "offline")
+        provider_vc.OFFLINE_TESTING = False
+        self.assertEqual(providers.get_provider(record=False).name, "visualcrossing")
+
+    def test_unknown_name_lists_the_choices(self):
+        with self.assertRaises(ValueError) as ctx:
+            providers.get_provider("weatherapi")
+        self.assertIn("'weatherapi'", str(ctx.exception))
+        self.assertIn("synthetic", str(ctx.exception))
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
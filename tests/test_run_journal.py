@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import main, run_journal
+from src.data_store import HistoryWriter
+from src.forecast_store import ForecastStore
+from src.providers import SyntheticProvider
+
+NOW = datetime(2025, 2, 17, 19, 30, tzinfo=main.ADEL_TZ)  # Monday window
+USERS = {"Ethan": "u1", "Sam": "u2"}
+LOCATIONS = {"Adelaide": "-34.9285,138.6007", "Clare": "-33.8330,138.6110"}
+
+
+class CountingProvider(SyntheticProvider):
+    def __init__(self):
+        super().__init__(start=NOW.date())
+        self.fetches = 0
+
+    def fetch(self, *args, **kwargs):
+        self.fetches += 1
+        return super().fetch(*args, **kwargs)
+
+
+class MemoryHistory(HistoryWriter):
+    def __init__(self, on_flush=None):
+        super().__init__(on_flush)
+        self.written = []
+
+    def flush(self) -> int:
+        count = len(self.rows)
+        self.written.extend(self.rows)
+        if self.on_flush is not None and self.rows:
+            self.on_flush([r["location"] for r in self.rows])
+        self.rows = []
+        return count
+
+
+class RunJournalTests(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_dir = run_journal.JOURNAL_DIR
+        run_journal.JOURNAL_DIR = Path(self.tmp.name)
+        self.sent, self.generated = [], []
+
+    def tearDown(self):
+        run_journal.JOURNAL_DIR = self.original_dir
+        self.tmp.cleanup()
+
+    def generate(self, city, rule_label, nights, threshold=60.0):
+        self.generated.append(city)
+        return main.build_promise_message(city, rule_label, nights)
+
+    def run_once(self, provider, fail_for=None):
+        journal = run_journal.open_journal(NOW, "monday")
+        history = MemoryHistory(on_flush=journal.history_written)
+
+        def send(user_key, message, user_name="user"):
+            if user_name == fail_for:
+                raise RuntimeError("pushover timeout")
+            self.sent.append((user_name, message))
+            return True
+
+        try:
+            with history:
+                main.run_pipeline(journal.now, USERS, LOCATIONS, provider=provider, history=history,
+                                  send=send, generate=self.generate, store=ForecastStore(), journal=journal)
+        finally:
+            journal.close()
+        return history
+
+    def test_rerun_resumes_without_duplicate_work_or_side_effects(self):
+        provider = CountingProvider()
+        with self.assertRaises(RuntimeError):
+            self.run_once(provider, fail_for="Sam")
+        self.assertEqual(provider.fetches, 2)
+        self.assertEqual(len(self.sent), 1)  # Ethan's leaderboard for Adelaide + Clare
+
+        second = self.run_once(provider)
+        self.assertEqual(provider.fetches, 2)                          # nothing refetched
+        self.assertEqual([u for u, _ in self.sent], ["Ethan", "Sam"])  # only Sam's push added
+        self.assertEqual(len(self.generated), 2)                       # Sam's message reused, not regenerated
+        self.assertEqual(second.written, [])                           # history already on disk
+
+        third = self.run_once(provider)
+        self.assertEqual((len(self.sent), len(self.generated), third.written), (2, 2, []))
+
+    def test_only_one_process_holds_a_run(self):
+        if run_journal.fcntl is None:
+            self.skipTest("no flock")
+        held = run_journal.open_journal(NOW, "monday")
+        try:
+            with self.assertRaises(run_journal.JournalBusy):
+                run_journal.RunJournal(held.dir, NOW)
+        finally:
+            held.close()
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
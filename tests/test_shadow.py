@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import data_store, main, shadow
+
+
+class ShadowRunTests(unittest.TestCase):
+    def setUp(self):
+        self.original_send = main.notifs.send_push_notification
+        self.original_write = data_store.write_history_rows
+        self.original_index = data_store.window_snapshot, data_store.monday_notified_this_week
+
+        def forbidden(*args, **kwargs):
+            raise AssertionError("shadow run reached a real side effect or production state")
+
+        self.forbidden = forbidden
+        main.notifs.send_push_notification = forbidden
+        data_store.write_history_rows = forbidden
+        data_store.window_snapshot = data_store.monday_notified_this_week = forbidden
+        main.window_snapshot = main.monday_notified_this_week = forbidden
+
+    def tearDown(self):
+        main.notifs.send_push_notification = self.original_send
+        data_store.write_history_rows = self.original_write
+        data_store.window_snapshot, data_store.monday_notified_this_week = self.original_index
+        main.window_snapshot, main.monday_notified_this_week = self.original_index
+
+    def test_monday_fleet_records_every_push_and_nothing_is_sent(self):
+        now = datetime(2025, 2, 17, 19, 30, tzinfo=main.ADEL_TZ)  # Monday window
+        report = shadow.run_shadow(now, n_users=12, n_locations=5, subscriptions_per_user=2)
+        _, _, subscriptions = shadow.simulated_fleet(12, 5, 2)
+        used = {city for cities in subscriptions.values() for city in cities}
+
+        self.assertEqual(report["counts"]["locations"], len(used))  # each location fetched once
+        self.assertEqual(report["counts"]["pairs"], 24)
+        # two sites per user: one leaderboard push and one generated message each
+        self.assertEqual(report["pushes_recorded"], 12)
+        self.assertEqual(report["messages_generated"], 12)
+        self.assertEqual(report["history_rows_recorded"], len(used) * 7)
+        for stage in ("fetch", "process", "score", "message", "push"):
+            self.assertIn(stage, report["stages"])
+
+    def test_wednesday_fleet_never_reads_the_real_index(self):
+        now = datetime(2025, 2, 19, 19, 30, tzinfo=main.ADEL_TZ)  # Wednesday window
+        report = shadow.run_shadow(now, n_users=12, n_locations=5, subscriptions_per_user=2)
+        # no Monday baseline in the stub index: every user gets the full leaderboard
+        self.assertEqual(report["pushes_recorded"], 12)
+        self.assertEqual(report["messages_generated"], 12)
+        self.assertIs(main.monday_notified_this_week, self.forbidden)  # stub index removed afterwards
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import requests
+
+from src import transport
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def _reply(self):
+        server = self.server
+        server.clients.append(self.client_address)
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        status = server.statuses.pop(0) if server.statuses else 200
+        body = b"ok"
+        self.send_response(status)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+@unittest.skipUnless(hasattr(requests, "Session"), "real requests not available")
+class TransportTests(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.clients, self.server.statuses = [], []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/"
+        self.host = f"127.0.0.1:{self.server.server_address[1]}"
+        self.original_backoff = transport.DEFAULT_BACKOFF_S
+        transport.DEFAULT_BACKOFF_S = 0.0
+        transport.close()
+
+    def tearDown(self):
+        transport.close()
+        transport.DEFAULT_BACKOFF_S = self.original_backoff
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_requests_to_a_host_reuse_one_pooled_connection(self):
+        for _ in range(3):
+            self.assertEqual(transport.get(self.url, params={"q": 1}).status_code, 200)
+        transport.post(self.url, data={"m": "hi"})
+        self.assertEqual(len(set(self.server.clients)), 1)  # same client socket throughout
+        self.assertIs(transport.session_for(self.url), transport.session_for(self.url + "other"))
+        m = transport.metrics()[self.host]
+        self.assertEqual((m["requests"], m["errors"], m["status"]), (4, 0, {200: 4}))
+
+    def test_get_retries_server_errors_but_post_does_not(self):
+        self.server.statuses = [503, 503]
+        self.assertEqual(transport.get(self.url).status_code, 200)
+        self.assertEqual(transport.metrics()[self.host]["retries"], 2)
+
+        self.server.statuses = [503]
+        self.assertEqual(transport.post(self.url, data={"m": "hi"}).status_code, 503)
+        self.assertEqual(len(self.server.clients), 4)  # 3 GET attempts + 1 POST
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
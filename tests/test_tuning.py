@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import config
+from src import tuning, utils
+
+
+class EvaluateTests(unittest.TestCase):
+    def test_matches_brute_force_confusion_counts(self):
+        rng = np.random.default_rng(7)
+        matrix = rng.uniform(0, 100, size=(300, 4))
+        labels = rng.uniform(size=300) < 0.3
+        weights = tuning.weight_grid({"a": 0.4, "b": 0.3, "c": 0.2, "d": 0.1}, "abcd", (0.5, 1.0, 2.0))
+        thresholds = np.arange(30.0, 80.0, 5.0)
+
+        metrics = tuning.evaluate(matrix, labels, weights, thresholds)
+
+        for wi in (0, len(weights) // 2, len(weights) - 1):
+            scores = matrix @ weights[wi]
+            for ti, t in enumerate(thresholds):
+                pred = scores >= t
+                tp = np.sum(pred & labels)
+                tn = np.sum(~pred & ~labels)
+                self.assertAlmostEqual(metrics["accuracy"][wi, ti], (tp + tn) / len(labels))
+                expected_recall = tp / labels.sum()
+                self.assertAlmostEqual(metrics["recall"][wi, ti], expected_recall)
+
+    def test_missing_sky_brightness_is_renormalised_like_get_suitability(self):
+        original = config.SUITABILITY_PARAMS, config.WEIGHTS
+        config.SUITABILITY_PARAMS = dict(config.SUITABILITY_PARAMS, sky_brightness={"L": 100, "k": 2.0, "x0": 20.0})
+        config.WEIGHTS = {"avg_cloud": 0.6, "sky_brightness": 0.4}
+        tmp = tempfile.TemporaryDirectory()
+        try:
+            path = Path(tmp.name) / "history.csv"
+            path.write_text(
+                "run_timestamp,location,forecast_date,avg_cloud,sky_brightness\n"
+                "2025-09-01T19:30:00+09:30,Adelaide,2025-09-06,10,20\n"
+                "2025-09-01T19:30:00+09:30,Outback,2025-09-06,10,\n",
+                encoding="utf-8",
+            )
+            keys, columns = tuning.load_history(path)
+            names = ["avg_cloud", "sky_brightness"]
+            missing = tuning.missing_matrix(columns, names)
+            self.assertEqual(missing.tolist(), [[False, False], [False, True]])
+
+            matrix = tuning.component_matrix(columns, names)
+            weights = np.array([[0.6, 0.4]])
+            expected = []
+            for row, (loc, _) in zip(matrix, keys):
+                s = {"date": "2025-09-06", "avg_cloud": row[0]}
+                if loc == "Adelaide":
+                    s["sky_brightness"] = row[1]
+                expected.append(utils.get_suitability(s))
+            thresholds = np.sort(np.array(expected)) - 1e-6
+            labels = np.array([True, True])
+            metrics = tuning.evaluate(matrix, labels, weights, thresholds, missing)
+            # thresholds just under / over each get_suitability total pin both nights' scores
+            self.assertEqual(metrics["recall"][0].tolist(), [1.0, 0.5])
+            shifted = tuning.evaluate(matrix, labels, weights, thresholds + 2e-6, missing)
+            self.assertEqual(shifted["recall"][0].tolist(), [0.5, 0.0])
+        finally:
+            config.SUITABILITY_PARAMS, config.WEIGHTS = original
+            tmp.cleanup()
+
+    def test_revisions_are_ordered_by_instant_not_string(self):
+        tmp = tempfile.TemporaryDirectory()
+        try:
+            path = Path(tmp.name) / "history.csv"
+            # 20:00+09:30 (10:30Z) sorts after 19:00+08:00 (11:00Z) as a string but ran first
+            path.write_text(
+                "run_timestamp,location,forecast_date,avg_cloud\n"
+                "2025-09-01T20:00:00+09:30,Adelaide,2025-09-06,10\n"
+                "2025-09-01T19:00:00+08:00,Adelaide,2025-09-06,80\n",
+                encoding="utf-8",
+            )
+            _, last = tuning.load_history(path, revision="last")
+            _, first = tuning.load_history(path, revision="first")
+        finally:
+            tmp.cleanup()
+        self.assertEqual(last["avg_cloud"].tolist(), [80.0])
+        self.assertEqual(first["avg_cloud"].tolist(), [10.0])
+
+    def test_rank_prefers_f1_then_accuracy(self):
+        metrics = {
+            "f1": np.array([[0.5, 0.9], [0.9, 0.1]]),
+            "accuracy": np.array([[0.9, 0.7], [0.8, 0.9]]),
+        }
+        self.assertEqual(tuning.rank(metrics, 2), [(1, 0), (0, 1)])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
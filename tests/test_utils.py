@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import sys
+import unittest
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import main, provider_vc, utils
+from src.providers import SyntheticProvider
+
+ASTRO = {"sunrise": "06:30 AM", "sunset": "07:30 PM", "moonrise": None, "moonset": None, "illumination": 0.0}
+
+
+def vc_payload(start: date, days: int, minutes: int = 60, cloud=lambda day, hour: 10.0) -> dict:
+    """raw Visual Crossing timeline; sub-hourly samples nested under each hour"""
+    def sample(day, hour, minute):
+        return {"datetime": f"{hour:02d}:{minute:02d}:00", "temp": 14.0, "humidity": 50.0, "dew": 6.0,
+                "windspeed": 8.0, "visibility": 20.0, "cloudcover": cloud(day, hour)}
+
+    out = []
+    for d in range(days):
+        hours = []
+        for h in range(24):
+            hour = sample(d, h, 0)
+            if minutes < 60:
+                hour["minutes"] = [sample(d, h, m) for m in range(0, 60, minutes)]
+            hours.append(hour)
+        out.append({"datetime": (start + timedelta(days=d)).isoformat(), "tempmin": 5.0, "tempmax": 20.0, "hours": hours})
+    return {"timezone": "Australia/Adelaide", "days": out}
+
+
+class ProcessWeatherTests(unittest.TestCase):
+    """sunset 19:30 -> window 20:00-01:00 (WINDOW_HOURS = 5, end exclusive)"""
+
+    def setUp(self):
+        self.original_astro = provider_vc.get_astro
+        self.astro = dict(ASTRO)
+        provider_vc.get_astro = lambda lat, lon, day, tz=None: self.astro
+
+    def tearDown(self):
+        provider_vc.get_astro = self.original_astro
+
+    def process(self, raw: dict):
+        return utils.process_weather_data(provider_vc._vc_to_weatherapi_like(raw, -34.9285, 138.6007))
+
+    def test_window_crosses_midnight_into_the_next_days_data(self):
+        raw = vc_payload(date(2025, 2, 21), 2, cloud=lambda day, hour: 10.0 if day == 0 else 90.0)
+        night = self.process(raw)[0]
+        # 20, 21, 22, 23 from the first day at 10%, 00 from the second at 90%
+        self.assertEqual((night["min_cloud"], night["max_cloud"]), (10.0, 90.0))
+        self.assertAlmostEqual(night["avg_cloud"], (4 * 10.0 + 90.0) / 5)
+
+    def test_quarter_hour_samples_are_flattened_into_the_window(self):
+        raw = vc_payload(date(2025, 2, 21), 2, minutes=15, cloud=lambda day, hour: 10.0 if day == 0 else 90.0)
+        converted = provider_vc._vc_to_weatherapi_like(raw, -34.9285, 138.6007)
+        self.assertEqual([h["time"] for h in converted["forecast"]["forecastday"][0]["hour"][:3]],
+                         ["2025-02-21 00:00", "2025-02-21 00:15", "2025-02-21 00:30"])
+        night = self.process(raw)[0]
+        # 16 quarter hours before midnight, 4 after
+        self.assertAlmostEqual(night["avg_cloud"], (16 * 10.0 + 4 * 90.0) / 20)
+
+    def test_moon_rising_mid_window(self):
+        self.astro.update(moonrise="10:15 PM", moonset="09:00 AM")  # sets the next morning
+        night = self.process(vc_payload(date(2025, 2, 21), 2))[0]
+        self.assertAlmostEqual(night["moon_presence"], 165 / 300 * 100)  # 22:15-01:00
+
+    def test_moon_setting_mid_window(self):
+        self.astro.update(moonset="11:40 PM")  # risen before the window opens
+        night = self.process(vc_payload(date(2025, 2, 21), 2))[0]
+        self.assertAlmostEqual(night["moon_presence"], 220 / 300 * 100)  # 20:00-23:40
+
+    def test_moon_up_and_down_inside_the_window(self):
+        self.astro.update(moonrise="08:30 PM", moonset="09:45 PM")
+        night = self.process(vc_payload(date(2025, 2, 21), 2))[0]
+        self.assertAlmostEqual(night["moon_presence"], 75 / 300 * 100)  # 20:30-21:45
+
+
+class HorizonTests(unittest.TestCase):
+    def test_fifteen_day_quarter_hour_horizon(self):
+        start = date(2025, 2, 17)
+        data = SyntheticProvider(start=start).fetch(-34.9285, 138.6007, days=15, resolution_minutes=15)
+        nights = utils.process_weather_data(data)
+        self.assertEqual([n["date"] for n in nights], [(start + timedelta(days=d)).isoformat() for d in range(15)])
+
+    def test_days_outside_the_horizon_are_rejected(self):
+        for days in (0, 16):
+            with self.assertRaises(ValueError):
+                main.build_and_score(-34.9285, 138.6007, days=days, provider=SyntheticProvider())
+            with self.assertRaises(ValueError):
+                provider_vc.fetch_visualcrossing_raw(-34.9285, 138.6007, days=days)
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)
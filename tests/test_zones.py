@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from src import main, run_journal, zones
+from src.data_store import HistoryWriter
+from src.forecast_store import ForecastStore
+from src.providers import SyntheticProvider
+
+NOW = datetime(2025, 2, 17, 19, 30, tzinfo=main.ADEL_TZ)  # Monday window in Adelaide, 17:00 in Perth
+LOCATIONS = {
+    "Adelaide": "-34.9285,138.6007",
+    "Perth": "-31.9523,115.8613,Australia/Perth",
+    "Clare": "-33.8330,138.6110",
+}
+
+
+class MemoryHistory(HistoryWriter):
+    def flush(self) -> int:
+        count = len(self.rows)
+        self.rows = []
+        return count
+
+
+class ZoneTests(unittest.TestCase):
+    def test_zone_objects_are_built_once(self):
+        self.assertIs(zones.zone("Australia/Perth"), zones.zone("Australia/Perth"))
+
+    def test_location_zone_from_coords_or_default(self):
+        self.assertEqual(zones.parse_location("Perth", LOCATIONS["Perth"]), (-31.9523, 115.8613, "Australia/Perth"))
+        self.assertEqual(zones.parse_location("Clare", LOCATIONS["Clare"])[2], zones.default_tz())
+
+    def test_batches_keep_first_seen_order(self):
+        batches = zones.batch_by_zone(["Adelaide", "Perth", "Clare", "Adelaide"], LOCATIONS)
+        self.assertEqual(batches, {zones.default_tz(): ["Adelaide", "Clare"], "Australia/Perth": ["Perth"]})
+
+    def test_one_push_per_user_across_zones_once_their_windows_open(self):
+        sent = []
+        history = MemoryHistory()
+        tmp = tempfile.TemporaryDirectory()
+        original_dir, run_journal.JOURNAL_DIR = run_journal.JOURNAL_DIR, Path(tmp.name)
+        opened = []
+
+        def journal_for(tz, local_now, label):
+            opened.append(run_journal.open_journal(local_now, label, scope=None if tz == zones.default_tz() else tz))
+            return opened[-1]
+
+        def run(now, **kwargs):
+            counts = main.run_pipeline(
+                now, {"Ethan": "u1"}, LOCATIONS,
+                provider=SyntheticProvider(start=NOW.date()),
+                history=history,
+                send=lambda key, message, user_name="user": sent.append(message) or True,
+                generate=lambda city, label, nights, threshold=60.0: main.build_promise_message(city, label, nights),
+                store=ForecastStore(budget_bytes=64 * 1024),
+                journal_for=journal_for,
+                **kwargs,
+            )
+            while opened:
+                opened.pop().close()
+            return counts
+
+        try:
+            # 19:30 in Adelaide, 17:00 in Perth: Adelaide and Clare are scored, the push waits for Perth
+            self.assertEqual(run(NOW)["locations"], 2)
+            self.assertEqual(sent, [])
+            self.assertNotIn("Perth", {r["location"] for r in history.rows})
+
+            # the same cron line at 19:30 Perth time: one leaderboard ranks all three sites
+            run(NOW.replace(hour=22))
+            self.assertEqual(len(sent), 1)
+            self.assertTrue(sent[0].startswith("Top sites weekend outlook"))
+            perth = [r for r in history.rows if r["location"] == "Perth"]
+            self.assertTrue(perth and all(r["run_timestamp"].endswith("+08:00") for r in perth))
+            self.assertTrue(all(r["promise_window"] == "monday" for r in perth))
+
+            # after Adelaide's midnight only Perth is open; the leaderboard is not sent again
+            run(datetime(2025, 2, 17, 21, 45, tzinfo=zones.zone("Australia/Perth")))
+            self.assertEqual(len(sent), 1)
+        finally:
+            run_journal.JOURNAL_DIR = original_dir
+            tmp.cleanup()
+
+    def test_zones_left_out_by_only_zones_are_logged(self):
+        with self.assertLogs(level="WARNING") as logs:
+            counts = main.run_pipeline(
+                NOW, {"Ethan": "u1"}, LOCATIONS, provider=SyntheticProvider(start=NOW.date()),
+                send=lambda *a, **k: None, generate=lambda *a, **k: "", store=ForecastStore(budget_bytes=64 * 1024),
+                only_zones=["Australia/Perth"],
+            )
+        self.assertEqual(counts["locations"], 0)  # Perth's window is not open yet
+        self.assertIn(zones.default_tz(), logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main(verbosity=2)